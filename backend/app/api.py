@@ -1,4 +1,4 @@
-from routers import availability, schedule, assignment
+from routers import availability, schedule, assignment, spatial, coverage
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware            
 
@@ -10,7 +10,16 @@ from threading import Thread
 from config.settings import CORS_ORIGINS, supabase, logger
 
 from utils.helpers import get_iso_time
-from services.assessments import classify_seniors
+from services.assessments import classify_seniors, update_clearing_fingerprint
+from services.model_registry import risk_model_registry
+from services.explanations import explanation_cache
+from services.allocation import allocation_cache
+from services.spatial_index import senior_index, volunteer_index, cluster_index
+from services.availability_index import availability_index
+from services.availability_slots import slots_cache
+from services.coverage import coverage_grid
+from services.registry import senior_registry, volunteer_registry, cluster_registry, constituency_registry
+from seniorModel.encoding import FEATURES
 app = FastAPI(title="AIC Senior Care MVP")
 
 app.add_middleware(
@@ -19,6 +28,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Seniors-Rescored", "X-Seniors-Skipped", "X-Seniors-Failed"],
 )
 
 # Flag to track if initialization has run
@@ -55,11 +65,21 @@ def run_classification_background():
 #     thread.start()
 #     logger.info("Scheduled background classification to run after startup")
 
+@app.on_event("startup")
+def warm_model_registry():
+    """Load the risk model once at startup so the first /assess doesn't pay for unpickling"""
+    try:
+        risk_model_registry.get()
+    except Exception as e:
+        logger.warning(f"Risk model not loaded at startup: {str(e)}")
+
 # # Include routers
 
 app.include_router(availability.router)
 app.include_router(schedule.router)
 app.include_router(assignment.router)
+app.include_router(spatial.router)
+app.include_router(coverage.router)
 
 @app.get("/")
 def health():
@@ -132,10 +152,11 @@ def update_wellbeing(data: dict):
         
         logger.info(f"Updating wellbeing for senior {sid} to {overall_wellbeing}")
         
-        response = supabase.table("seniors").update({
+        # Also clears the feature fingerprint, forcing a rescore once the intervention is reset
+        response = update_clearing_fingerprint(sid, {
             "overall_wellbeing": overall_wellbeing,
             "has_dl_intervened": True  # Set intervention flag when manually updated
-        }).eq("uid", sid).execute()
+        })
         
         logger.info(f"Supabase response: {response}")
         logger.info(f"Updated rows: {len(response.data) if response.data else 0}")
@@ -143,6 +164,8 @@ def update_wellbeing(data: dict):
         success = response.data is not None and len(response.data) > 0
         
         if success:
+            senior_index.upsert(response.data)
+            senior_registry.upsert(response.data)
             logger.info(f"Successfully updated wellbeing for senior {sid} and set DL intervention flag")
             return {"success": True, "message": "Wellbeing updated successfully", "senior_id": sid}
         else:
@@ -237,6 +260,9 @@ def confirm_visit(data: dict):
         
         if not senior_update.data:
             logger.warning(f"Failed to update last_visit for senior {sid}, but assignment was marked as visited")
+        else:
+            senior_index.upsert(senior_update.data)
+            senior_registry.upsert(senior_update.data)
         
         logger.info(f"Successfully confirmed visit for assignment {aid}, senior {sid}")
         return {
@@ -275,6 +301,8 @@ def reset_dl_intervention(data: dict):
         success = response.data is not None and len(response.data) > 0
         
         if success:
+            senior_index.upsert(response.data)
+            senior_registry.upsert(response.data)
             logger.info(f"Successfully reset DL intervention flag for senior {sid}")
             return {"success": True, "message": "DL intervention flag reset successfully", "senior_id": sid}
         else:
@@ -351,8 +379,13 @@ def update_senior_field(data: dict):
         success = response.data is not None and len(response.data) > 0
         
         if success:
+            senior_index.upsert(response.data)
+            senior_registry.upsert(response.data)
             field_names = ", ".join(update_data.keys())
             logger.info(f"Successfully updated {field_names} for senior {sid}")
+            # Rescore right away when a model feature changed, unless a DL has overridden the wellbeing
+            if set(update_data) & set(FEATURES) and not response.data[0].get("has_dl_intervened"):
+                classify_seniors({"seniors": response.data})
             return {"success": True, "message": f"Fields updated successfully", "senior_id": sid}
         else:
             logger.error(f"Failed to update fields - no rows affected for senior {sid}")
@@ -380,5 +413,32 @@ def debug_tables():
     
     return tables_info
 
+@app.get("/debug/model")
+def debug_model():
+    """Version, load time and memory footprint of the cached risk model"""
+    return {**risk_model_registry.stats(), "explanation_cache": explanation_cache.stats()}
+
+@app.get("/debug/spatial")
+def debug_spatial():
+    """Size, age and pending updates of the in-memory spatial and availability indexes"""
+    return {**{index.table: index.stats() for index in (senior_index, volunteer_index, cluster_index, availability_index)},
+            "coverage": coverage_grid.stats()}
+
+@app.get("/debug/registry")
+def debug_registry():
+    """Size, age and updates of the in-memory entity registries"""
+    return {registry.table: registry.stats()
+            for registry in (senior_registry, volunteer_registry, cluster_registry, constituency_registry)}
+
+@app.get("/debug/allocation")
+def debug_allocation():
+    """Hits, misses and size of the /allocate result cache"""
+    return allocation_cache.stats()
+
+@app.get("/debug/slots")
+def debug_slots():
+    """Hits, misses and size of the /get_slots response cache"""
+    return slots_cache.stats()
+
 if __name__ == "__main__":
     uvicorn.run("api:app", port=8000, reload=True)
\ No newline at end of file
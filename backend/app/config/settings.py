@@ -28,6 +28,17 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Directory where /allocate results are persisted across restarts (unset: cached in memory only)
+ALLOCATION_CACHE_DIR = os.getenv("ALLOCATION_CACHE_DIR")
+
+# Outgoing mail for schedule notifications; point SMTP_HOST/SMTP_PORT at a local stand-in
+# (with SMTP_STARTTLS=false and no APP_EMAIL) to test without a real mail server
+SMTP_HOST = os.getenv("SMTP_HOST", "smtp.gmail.com")
+SMTP_PORT = int(os.getenv("SMTP_PORT", "587"))
+SMTP_STARTTLS = os.getenv("SMTP_STARTTLS", "true").lower() != "false"
+SMTP_USER = os.getenv("APP_EMAIL")
+SMTP_PASSWORD = os.getenv("APP_PASSWORD")
+
 # CORS origins
 CORS_ORIGINS = [
     "http://localhost:3000",
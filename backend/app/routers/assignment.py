@@ -1,132 +1,108 @@
-from fastapi import APIRouter # type: ignore
+from fastapi import APIRouter, Header, Response # type: ignore
 from config.settings import logger, supabase
-from utils.helpers import cluster_density, kmeans_clusters, distance
+from services.clustering import save_seeds
+from services.allocation import (allocate, allocate_by_constituency, allocation_cache, allocation_key,
+                                 compact_result, expand_result, compact_response)
 from services.assessments import classify_seniors
+from services.explanations import explain_seniors
+from utils.serialization import dumps, compress
 
 import json  # for safer coords parsing
 
 router = APIRouter(tags=["assignment"])
 
 @router.put("/assess")
-def assess_seniors(data: dict):
+def assess_seniors(data: dict, response: Response):
     district = data.get("district", None)
     #logger.info(f"Received data: {data}")
     #logger.info(f"Assessing seniors in district: {district}")
     if district == 'All' or district == '':
-        response = supabase.table("seniors").select("*").eq("has_dl_intervened", False).execute()
+        seniors_response = supabase.table("seniors").select("*").eq("has_dl_intervened", False).execute()
     else:
-        response = supabase.table("seniors").select("*").eq("constituency_name", district).eq("has_dl_intervened", False).execute()
-    result = classify_seniors({"seniors": response.data})
+        seniors_response = supabase.table("seniors").select("*").eq("constituency_name", district).eq("has_dl_intervened", False).execute()
+    stats = {}
+    result = classify_seniors({"seniors": seniors_response.data}, stats=stats)
+    # Body stays the changes dict; rescore and failure counts go in headers
+    response.headers["X-Seniors-Rescored"] = str(stats.get("rescored", 0))
+    response.headers["X-Seniors-Skipped"] = str(stats.get("skipped", 0))
+    response.headers["X-Seniors-Failed"] = str(stats.get("failed", 0))
     return result if result is not None else {}
 
+@router.post("/explain")
+def explain_wellbeing(data: dict):
+    """
+    Explain the AI wellbeing classification of seniors
+    Expected format: {"uids": ["uid1", ...]} or {"district": "Yishun"} ("All" for every senior),
+    optionally "top_n" (factors per direction, default 3)
+    """
+    try:
+        uids = data.get("uids")
+        district = data.get("district")
+        top_n = int(data.get("top_n", 3))
+
+        if uids:
+            response = supabase.table("seniors").select("*").in_("uid", uids).execute()
+        elif district == 'All':
+            response = supabase.table("seniors").select("*").execute()
+        elif district:
+            response = supabase.table("seniors").select("*").eq("constituency_name", district).execute()
+        else:
+            return {"error": "uids or district is required"}
+
+        explanations = explain_seniors(response.data or [], top_n=top_n)
+        return {"explanations": explanations}
+
+    except Exception as e:
+        logger.error(f"Error explaining seniors: {str(e)}", exc_info=True)
+        return {"error": f"Internal server error: {str(e)}"}
+
 @router.post("/allocate")
-def allocate_volunteers(data: dict):
+def allocate_volunteers(data: dict, response: Response, accept_encoding: str = Header(None)):
+    """
+    Cluster seniors and assign volunteers to clusters.
+    "by_constituency": true allocates each constituency separately across a
+    process pool ("workers", default one per core) and merges the results.
+    Identical requests are answered from allocation_cache ("cache": false skips
+    it) without reading or replacing the persisted warm-start seed.
+    "format": "compact" returns uids, labels and per-cluster arrays instead of
+    nested senior dicts, compressed (brotli or gzip, per Accept-Encoding) unless
+    "compress" is false.
+    """
     volunteers = data.get("volunteers", [])
     seniors = data.get("seniors", [])
     if len(seniors) == 0:
         return {"assignments": [], "clusters": [], "cluster_density": {}, "seniors": []}
-    
-    # Calculate optimal number of clusters based on volunteer-to-senior ratio
-    # Use 1:3 ratio (1 volunteer per 3 seniors) as optimal target
-    target_ratio = 3  # seniors per volunteer
-    recommended_clusters = max(1, len(seniors) // (target_ratio * max(1, len(volunteers))))
-    min_clusters = max(1, len(seniors) // 6)  # max 6 seniors per cluster
-    max_clusters = len(seniors) // 2  # min 2 seniors per cluster
-    n_clusters = max(min_clusters, min(recommended_clusters, max_clusters))
-    
-    # Step 1: K-means clustering of seniors
-    labels, centroids = kmeans_clusters([s['coords'] for s in seniors], n_clusters)
-    
-    # Step 2: Assign seniors to clusters
-    clusters = {i: [] for i in range(n_clusters)}
-    for idx, senior in enumerate(seniors):
-        cluster_id = int(labels[idx])
-        clusters[cluster_id].append(senior)
-        senior['cluster'] = cluster_id
-    
-    # Step 3: Calculate cluster density and radius
-    cluster_density_map = {}
-    cluster_radius_map = {}
-    volunteers_per_cluster = {i: 0 for i in range(n_clusters)}  # Track volunteers per cluster
-    
-    for cluster_id, cluster_seniors in clusters.items():
-        density = cluster_density(cluster_seniors)
-        cluster_density_map[int(cluster_id)] = float(density)
-        
-        if cluster_seniors:
-            centroid_coords = {'lat': float(centroids[cluster_id][0]), 'lng': float(centroids[cluster_id][1])}
-            max_distance = 0
-            
-            for senior in cluster_seniors:
-                dist = distance(senior['coords'], centroid_coords)
-                max_distance = max(max_distance, dist)
-            
-            # Add a small buffer (10% extra) to ensure all seniors are visually within the circle
-            radius = max_distance * 1.1
-            # Set minimum radius for visual clarity (e.g., 200 meters)
-            radius = max(radius, 0.2)  # 0.2 km = 200 meters
+
+    key = allocation_key(seniors, volunteers, data) if data.get("cache", True) else None
+    entry = allocation_cache.get(key) if key else None
+    response.headers["X-Allocation-Cache"] = "hit" if entry is not None else "miss"
+    if entry is not None:
+        result, centroids, radius = expand_result(entry, seniors)
+    else:
+        if data.get("by_constituency"):
+            result, centroids, radius, seeds = allocate_by_constituency(seniors, volunteers, data,
+                                                                        workers=data.get("workers"))
         else:
-            radius = 0.2  # default minimum radius
-            
-        cluster_radius_map[int(cluster_id)] = float(radius)
-    
-    # Step 4: Assign volunteers to clusters with workload balancing
-    assignments = []
-    for vol in volunteers:
-        vol_coords = vol.get('coords')
-        if not vol_coords:
-            continue
-        
-        best_cluster = None
-        min_weighted_dist = float('inf')
-        
-        for cluster_id, cluster_seniors in clusters.items():
-            if not cluster_seniors:  # Skip empty clusters
-                continue
-                
-            centroid = {'lat': float(centroids[cluster_id][0]), 'lng': float(centroids[cluster_id][1])}
-            base_dist = distance(vol_coords, centroid)
-            
-            # Workload factor: increases with more volunteers assigned
-            workload_factor = 1 + (volunteers_per_cluster[cluster_id] / max(1, len(cluster_seniors)))
-            # Density factor: decreases with higher density
-            density_factor = 1 / max(0.1, cluster_density_map[cluster_id])
-            
-            weighted_dist = base_dist * workload_factor * density_factor
-            
-            if vol.get('prefers_outside', False):
-                weighted_dist *= 0.8
-                
-            if weighted_dist < min_weighted_dist:
-                min_weighted_dist = weighted_dist
-                best_cluster = cluster_id
-        
-        if best_cluster is not None:
-            volunteers_per_cluster[best_cluster] += 1
-            assignments.append({
-                "volunteer": vol['vid'],
-                "cluster": best_cluster,
-                "weighted_distance": round(min_weighted_dist, 4)
-            })
-    
-    # Rest of the function remains the same
-    clusters_output = []
-    for cluster_id, cluster_seniors in clusters.items():
-        clusters_output.append({
-            "id": cluster_id,
-            "center": {"lat": float(centroids[cluster_id][0]), "lng": float(centroids[cluster_id][1])},
-            "radius": cluster_radius_map[cluster_id],
-            "seniors": cluster_seniors,
-            "senior_count": len(cluster_seniors),
-            "volunteer_count": volunteers_per_cluster[cluster_id]  # Added this field
-        })
-    
-    return {
-        "assignments": assignments,
-        "clusters": clusters_output,
-        "cluster_density": cluster_density_map,
-        "cluster_radius": cluster_radius_map
-    }
+            result, centroids, radius, seeds = allocate(seniors, volunteers, data)
+        if key:
+            allocation_cache.put(key, compact_result(result, seniors, centroids, radius))
+        try:
+            # The fitted clusters seed the next run's; empty ones would seed nothing
+            occupied = [cluster["senior_count"] > 0 for cluster in result["clusters"][:len(seeds)]]
+            save_seeds(seeds[occupied])
+        except Exception as e:
+            logger.warning(f"Could not persist cluster centroids: {str(e)}")
+
+    if data.get("format") == "compact":
+        body = dumps(compact_response(result, seniors, centroids, radius))
+        headers = {"X-Allocation-Cache": response.headers["X-Allocation-Cache"], "Vary": "Accept-Encoding"}
+        if data.get("compress", True):
+            body, encoding = compress(body, accept_encoding)
+            if encoding:
+                headers["Content-Encoding"] = encoding
+        return Response(content=body, media_type="application/json", headers=headers)
+
+    return result
 
 @router.put("/acknowledgements")
 def update_acknowledgements(aid: dict[str, str]):
@@ -1,47 +1,91 @@
-from fastapi import APIRouter # type: ignore
+from fastapi import APIRouter, Header, Query, Response # type: ignore
 from config.settings import logger, supabase
-from datetime import datetime
+import hashlib
+from datetime import date, datetime
+from services.availability_index import availability_index
+from services.availability_slots import replace_slots, slots_cache
+from services.spatial_index import cluster_index, volunteer_index
+from utils.geo import parse_coords, KM_PER_DEG
+from utils.serialization import dumps
 
 router = APIRouter(tags=["availability"])
 
 
 
-@router.get("/get_slots/{email}")
-def get_slots(email: str):
-    """Fetch volunteer availability slots"""
-    try:
-        if not email:
-            return {"error": "email is required"}
+def _fetch_slots(email, date_from, date_to):
+    """(ETag, rows) of a volunteer's availabilities dated date_from to date_to, as stored"""
+    query = supabase.table("availabilities").select("date, start_t, end_t").eq("volunteer_email", email)
+    if date_from:
+        query = query.gte("date", date_from)
+    if date_to:
+        query = query.lte("date", date_to)
+    records = query.order("date").order("start_t").order("end_t").execute().data or []
+    # Derived from the rows alone, so every worker gives the same rows the same tag
+    etag = f'"{hashlib.sha256(dumps([email, records])).hexdigest()[:32]}"'
+    return etag, records
 
-        response = supabase.table("availabilities").select("*").eq("volunteer_email", email).execute()
-        if not response.data:
-            logger.info(f"No availability slots found for volunteer {email}")
-            return {"email": email, "slots": []}
 
-        slots = []
-        for record in response.data:
-            date_str = record.get("date")
-            start_time_str = record.get("start_t")
-            end_time_str = record.get("end_t")
+def _render_slots(email, records):
+    """JSON body of a volunteer's slots"""
+    slots = []
+    for record in records:
+        date_str = record.get("date")
+        start_time_str = record.get("start_t")
+        end_time_str = record.get("end_t")
 
-            if not date_str or not start_time_str or not end_time_str:
-                logger.warning(f"Incomplete slot data in record: {record}")
-                continue
+        if not date_str or not start_time_str or not end_time_str:
+            logger.warning(f"Incomplete slot data in record: {record}")
+            continue
+
+        try:
+            start_dt = datetime.fromisoformat(f"{date_str}T{start_time_str}+08:00")
+            end_dt = datetime.fromisoformat(f"{date_str}T{end_time_str}+08:00")
+            slots.append({
+                "date": date_str,
+                "start_time": start_dt.isoformat(),
+                "end_time": end_dt.isoformat()
+            })
+        except ValueError as ve:
+            logger.error(f"Error parsing datetime for record {record}: {ve}")
+            continue
+
+    logger.info(f"Retrieved {len(slots)} slots for volunteer {email}")
+    return dumps({"email": email, "slots": slots})
 
-            try:
-                start_dt = datetime.fromisoformat(f"{date_str}T{start_time_str}+08:00")
-                end_dt = datetime.fromisoformat(f"{date_str}T{end_time_str}+08:00")
-                slots.append({
-                    "date": date_str,
-                    "start_time": start_dt.isoformat(),
-                    "end_time": end_dt.isoformat()
-                })
-            except ValueError as ve:
-                logger.error(f"Error parsing datetime for record {record}: {ve}")
-                continue
 
-        logger.info(f"Retrieved {len(slots)} slots for volunteer {email}")
-        return {"email": email, "slots": slots}
+def _etag_matches(if_none_match, etag):
+    tags = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+    return "*" in tags or etag in tags
+
+
+@router.get("/get_slots/{email}")
+def get_slots(email: str, date_from: str = Query(None, alias="from"), date_to: str = Query(None, alias="to"),
+              if_none_match: str = Header(None)):
+    """
+    Fetch volunteer availability slots, optionally only those dated "from" to "to"
+    (YYYY-MM-DD, inclusive). Responses carry an ETag hashed from the stored rows;
+    a matching If-None-Match gets an empty 304, and unchanged rows are served
+    from the rendered body cached under their ETag.
+    """
+    try:
+        if not email:
+            return {"error": "email is required"}
+        for value in (date_from, date_to):
+            if value:
+                try:
+                    date.fromisoformat(value)
+                except ValueError:
+                    return {"error": f"Invalid date {value}, expected YYYY-MM-DD"}
+
+        etag, records = _fetch_slots(email, date_from, date_to)
+        headers = {"ETag": etag, "Cache-Control": "no-cache"}
+        if if_none_match and _etag_matches(if_none_match, etag):
+            return Response(status_code=304, headers=headers)
+        body = slots_cache.get(etag)
+        if body is None:
+            body = _render_slots(email, records)
+            slots_cache.put(etag, body)
+        return Response(content=body, media_type="application/json", headers=headers)
 
     except Exception as e:
         logger.error(f"Error in get_slots: {str(e)}", exc_info=True)
@@ -99,53 +143,74 @@ def upload_slots(data: dict):
             except ValueError as e:
                 return {"error": f"Slot {i}: Invalid datetime format - {str(e)}"}
         
-        # Delete existing slots for the same email and dates
+        # Diff against the stored rows and apply only the changes in one bulk write
         try:
-            deleted_count = 0
+            counts = replace_slots(email, dates_to_clear, [
+                {"date": slot["date"], "start_t": slot["start_time_only"], "end_t": slot["end_time_only"]}
+                for slot in processed_slots])
+            logger.info(f"Replaced availability of volunteer {email} on {len(dates_to_clear)} dates: "
+                        f"{counts['deleted']} deleted, {counts['inserted']} inserted, {counts['unchanged']} unchanged")
+
+            # Every submitted date now holds exactly its new slots, so its bitset is rebuilt from them
             for date_str in dates_to_clear:
-                delete_response = supabase.table("availabilities").delete().eq("volunteer_email", email).eq("date", date_str).execute()
-                if delete_response.data:
-                    deleted_count += len(delete_response.data)
-            
-            logger.info(f"Deleted {deleted_count} existing slots for volunteer {email} on dates: {list(dates_to_clear)}")
-            
-        except Exception as delete_error:
-            logger.error(f"Error deleting existing slots: {str(delete_error)}")
-            return {"error": f"Failed to delete existing slots: {str(delete_error)}"}
-        
-        # Insert each slot as a separate row in availabilities table
-        try:
-            inserted_rows = []
-            
-            for slot in processed_slots:
-                # Insert individual availability record matching your table schema
-                response = supabase.table("availabilities").insert({
-                    "volunteer_email": email,  # Changed from volunteer_id to email to match your table
-                    "date": slot["date"],
-                    "start_t": slot["start_time_only"],  # Now just the time portion (e.g., "11:00:00")
-                    "end_t": slot["end_time_only"]  # Now just the time portion (e.g., "13:00:00")
-                }).execute()
-                
-                if response.data:
-                    inserted_rows.extend(response.data)
-                else:
-                    logger.warning(f"Failed to insert slot: {slot}")
-            
-            logger.info(f"Inserted {len(inserted_rows)} availability slots for volunteer {email}")
+                availability_index.set_day(email, date_str, [
+                    (slot["start_time_only"], slot["end_time_only"])
+                    for slot in processed_slots if slot["date"] == date_str])
             
             return {
                 "success": True,
                 "email": email,
-                "deleted_slots": deleted_count,
-                "slots_uploaded": len(inserted_rows),
+                "deleted_slots": counts["deleted"],
+                "slots_uploaded": len(processed_slots),
                 "slots": processed_slots,
-                "inserted_records": len(inserted_rows)
+                "inserted_records": counts["inserted"],
+                "unchanged_slots": counts["unchanged"]
             }
             
         except Exception as db_error:
             logger.error(f"Database error: {str(db_error)}")
-            return {"error": f"Failed to insert availability slots: {str(db_error)}"}
+            return {"error": f"Failed to save availability slots: {str(db_error)}"}
         
     except Exception as e:
         logger.error(f"Error in upload_slots: {str(e)}")
-        return {"error": "Internal server error"}
\ No newline at end of file
+        return {"error": "Internal server error"}
+
+
+@router.post("/free_volunteers")
+def free_volunteers(data: dict):
+    """
+    Volunteers available for a whole interval, from the availability bitset index
+    Expected format: {"date": "2025-01-07", "start_time": "14:00", "end_time": "16:00"},
+    optionally "cluster" (id) to only consider volunteers within that cluster's radius
+    (or "radius_km" of its centroid)
+    """
+    try:
+        date_str = data.get("date")
+        start_time = data.get("start_time")
+        end_time = data.get("end_time")
+        if not date_str or not start_time or not end_time:
+            return {"error": "date, start_time and end_time are required"}
+
+        emails = None
+        if data.get("cluster") is not None:
+            cluster = cluster_index.get(data["cluster"])
+            centroid = parse_coords(cluster.get("centroid")) if cluster else None
+            if centroid is None:
+                return {"error": f"Cluster {data['cluster']} not found"}
+            radius_km = data.get("radius_km") or float(cluster.get("radius") or 0) * KM_PER_DEG
+            nearby = volunteer_index.within(centroid["lat"], centroid["lng"], float(radius_km))
+            emails = [row["email"] for row, _ in nearby if row.get("email")]
+
+        free = availability_index.free(date_str, start_time, end_time, emails)
+        partial = availability_index.overlap(date_str, start_time, end_time, emails)
+        for email in free:
+            partial.pop(email, None)
+        logger.info(f"{len(free)} volunteers free on {date_str} {start_time}-{end_time}, {len(partial)} partly")
+        return {"date": date_str, "start_time": start_time, "end_time": end_time,
+                "free": free, "partial_minutes": partial}
+
+    except ValueError as ve:
+        return {"error": f"Invalid date or time: {str(ve)}"}
+    except Exception as e:
+        logger.error(f"Error in free_volunteers: {str(e)}", exc_info=True)
+        return {"error": "Internal server error"}
@@ -0,0 +1,46 @@
+from fastapi import APIRouter, Query # type: ignore
+from config.settings import logger
+from datetime import date, datetime, timedelta
+from services.availability_index import BUCKET_MINUTES
+from services.coverage import coverage_grid
+from services.scheduling import schedule_week
+
+router = APIRouter(tags=["coverage"])
+
+MAX_DAYS = 31
+
+
+@router.get("/coverage")
+def coverage(date_from: str = Query(None, alias="from"), date_to: str = Query(None, alias="to"),
+             constituency: list[str] = Query(None)):
+    """
+    Volunteer availability per constituency, day and BUCKET_MINUTES bucket, for a heatmap
+    of where and when supply is short. "available" counts the volunteers free for each
+    whole bucket; "per_senior" divides that by the constituency's seniors due a visit.
+    Defaults to the current schedule week; repeat ?constituency= to pick constituencies.
+    """
+    try:
+        today = datetime.now().date()
+        try:
+            week_start, week_end = schedule_week(today)
+            start = date.fromisoformat(date_from) if date_from else week_start
+            end = date.fromisoformat(date_to) if date_to else (start + timedelta(days=6) if date_from else week_end)
+        except ValueError as ve:
+            return {"error": f"Invalid date, expected YYYY-MM-DD: {str(ve)}"}
+        if end < start or (end - start).days >= MAX_DAYS:
+            return {"error": f"to must be on or after from, at most {MAX_DAYS} days apart"}
+
+        days = [(start + timedelta(days=i)).isoformat() for i in range((end - start).days + 1)]
+        rows = coverage_grid.coverage(days, set(constituency) if constituency else None, today)
+        logger.info(f"Coverage for {len(rows)} constituencies from {days[0]} to {days[-1]}")
+        return {
+            "from": days[0],
+            "to": days[-1],
+            "days": days,
+            "bucket_minutes": BUCKET_MINUTES,
+            "constituencies": rows,
+        }
+
+    except Exception as e:
+        logger.error(f"Error in coverage: {str(e)}", exc_info=True)
+        return {"error": f"Internal server error: {str(e)}"}
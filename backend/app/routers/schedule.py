@@ -1,60 +1,71 @@
 from fastapi import APIRouter # type: ignore
 
-from datetime import datetime, timedelta
+from datetime import datetime
 
 from config.settings import logger, supabase
-import smtplib
-from email.mime.text import MIMEText
-from email.mime.multipart import MIMEMultipart
-from collections import defaultdict
-import json  # for safer coords parsing
-import os
+from services.clustering import save_clusters
+from services.notifications import send_schedule_emails
+from services.scheduling import build_schedule, insert_assignments, schedule_week
+from services.registry import senior_registry
+from services.spatial_index import senior_index, volunteer_index
 
 
 router = APIRouter(tags=["schedule"])
 
-def send_schedule_notifications(schedules, volunteers, seniors):
+@router.post("/schedule")
+def run_schedule(data: dict):
     """
-    Sends formatted weekly schedules to volunteers via email.
+    Schedule this week's visits (next week's on Sundays), like the run-scheduler edge function.
+    Seniors and volunteers come from the in-memory indexes; eligible seniors are clustered,
+    volunteers with availability that week assigned to clusters, and one visit per senior
+    matched to their free hours and inserted into assignments in bulk.
+    Optional: "date" (YYYY-MM-DD, defaults to today), "dry_run" (return the visits without
+    writing them), "notify" (email each volunteer their visits) and the /allocate options
+    ("solver", "split", ...).
     """
-    # Group schedules by volunteer
-    schedules_by_volunteer = defaultdict(list)
-    for s in schedules:
-        schedules_by_volunteer[s['volunteer']].append(s)
-
-    for vol_id, vol_schedules in schedules_by_volunteer.items():
-        volunteer = next((v for v in volunteers if v['vid'] == vol_id), None)
-        if not volunteer:
-            continue
-
-        email = volunteer['email']
-        name = volunteer.get('name', f"Volunteer {vol_id}")
-
-        # Build email body
-        message_body = [f"Hello {name},\n\nHere is your schedule for the week:\n"]
-        for s in sorted(vol_schedules, key=lambda x: (x['date'], x['start_time'])):
-            senior = next((sen for sen in seniors if sen['uid'] == s['senior']), {})
-            senior_name = senior.get('name', f"Senior {s['senior']}")
-            message_body.append(
-                f"- {s['date']} {s['start_time']}–{s['end_time']}: Visit {senior_name} (Cluster {s['cluster']})"
-            )
-
-        message_body.append("\nThank you for volunteering!\nHelpers of Tomorrow Team")
-        body = "\n".join(message_body)
-
-        # Construct email
-        msg = MIMEMultipart()
-        msg['From'] = "noreply@helpersoftomorrow.org"
-        msg['To'] = email
-        msg['Subject'] = "Your Weekly Volunteer Schedule"
-        msg.attach(MIMEText(body, "plain"))
-
-        # Send email (example with Gmail SMTP, replace with your mail server)
-        try:
-            with smtplib.SMTP("smtp.gmail.com", 587) as server:
-                server.starttls()
-                server.login(os.getenv("APP_EMAIL"), os.getenv("APP_PASSWORD"))
-                server.sendmail(msg['From'], email, msg.as_string())
-            logger.info(f"✅ Schedule email sent to {email}")
-        except Exception as e:
-            logger.warning(f"❌ Failed to send email to {email}: {e}")
\ No newline at end of file
+    try:
+        today = datetime.strptime(data["date"], "%Y-%m-%d").date() if data.get("date") else datetime.now().date()
+        week_start, week_end = schedule_week(today)
+
+        availabilities = (supabase.table("availabilities").select("date, start_t, end_t, volunteer_email")
+                          .gte("date", week_start.isoformat()).lte("date", week_end.isoformat()).execute()).data or []
+        logger.info(f"Found {len(availabilities)} availability slots for {week_start} to {week_end}")
+
+        stats = {}
+        schedules, result, centroids, radius, seeds = build_schedule(
+            senior_index.rows(), volunteer_index.rows(), availabilities, data, today, stats=stats)
+
+        written = 0
+        notifications = None
+        if not data.get("dry_run") and result is not None:
+            save_clusters(centroids, radius, seeds)
+            senior_registry.assign("cluster", {s["uid"]: c["id"] for c in result["clusters"] for s in c["seniors"]})
+            written = insert_assignments(schedules)
+            logger.info(f"Inserted {written} assignments")
+            if data.get("notify"):
+                notifications = send_schedule_notifications(schedules)
+
+        body = {
+            "message": "Schedules generated successfully",
+            "week_start": week_start.isoformat(),
+            "week_end": week_end.isoformat(),
+            "clustersCount": stats["clusters"],
+            "schedulesCreated": written,
+            **{k: v for k, v in stats.items() if k != "clusters"},
+        }
+        if data.get("dry_run"):
+            body["schedules"] = schedules
+        if notifications is not None:
+            body["emails"] = {k: v for k, v in notifications.items() if k != "batches"}
+        return body
+
+    except Exception as e:
+        logger.error(f"Error running scheduler: {str(e)}", exc_info=True)
+        return {"error": f"Internal server error: {str(e)}"}
+
+def send_schedule_notifications(schedules, volunteers=None, seniors=None):
+    """
+    Sends formatted weekly schedules to volunteers via email, over a pool of
+    persistent SMTP connections (services.notifications). Returns the send stats.
+    """
+    return send_schedule_emails(schedules, volunteers, seniors)
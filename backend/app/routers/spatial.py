@@ -0,0 +1,76 @@
+from fastapi import APIRouter # type: ignore
+from config.settings import logger
+from services.spatial_index import senior_index, volunteer_index, cluster_index
+from utils.geo import parse_coords
+
+router = APIRouter(tags=["spatial"])
+
+INDEXES = {"seniors": senior_index, "volunteers": volunteer_index, "clusters": cluster_index}
+MAX_RADIUS_KM = 50
+MAX_K = 500
+
+
+def _origin(lat, lng, uid, vid):
+    """Query point from explicit coordinates or from a senior (uid) / volunteer (vid)"""
+    if lat is not None and lng is not None:
+        return lat, lng
+    row = senior_index.get(uid) if uid else volunteer_index.get(vid) if vid else None
+    coords = parse_coords(row.get("coords")) if row else None
+    if coords is None:
+        return None
+    return coords["lat"], coords["lng"]
+
+
+def _with_distance(hits):
+    return [{**row, "distance_km": round(d, 4)} for row, d in hits]
+
+
+@router.get("/nearby/{kind}")
+def nearby(kind: str, lat: float = None, lng: float = None, radius_km: float = 1.0,
+           uid: str = None, vid: str = None):
+    """
+    Seniors, volunteers or clusters within radius_km of a point, nearest first.
+    The point is lat/lng, or the coords of senior `uid` or volunteer `vid`,
+    e.g. /nearby/seniors?vid=...&radius_km=1
+    """
+    try:
+        index = INDEXES.get(kind)
+        if index is None:
+            return {"error": f"kind must be one of {list(INDEXES)}"}
+        if not 0 < radius_km <= MAX_RADIUS_KM:
+            return {"error": f"radius_km must be between 0 and {MAX_RADIUS_KM}"}
+        origin = _origin(lat, lng, uid, vid)
+        if origin is None:
+            return {"error": "lat and lng, or the uid/vid of a senior/volunteer with coords, are required"}
+
+        hits = index.within(origin[0], origin[1], radius_km)
+        return {kind: _with_distance(hits), "center": {"lat": origin[0], "lng": origin[1]}, "radius_km": radius_km}
+
+    except Exception as e:
+        logger.error(f"Error in nearby {kind} query: {str(e)}", exc_info=True)
+        return {"error": f"Internal server error: {str(e)}"}
+
+
+@router.get("/nearest/{kind}")
+def nearest(kind: str, lat: float = None, lng: float = None, k: int = 5,
+            uid: str = None, vid: str = None):
+    """
+    The k seniors, volunteers or clusters nearest to a point (lat/lng, senior uid or
+    volunteer vid), e.g. /nearest/clusters?lat=1.35&lng=103.8&k=1
+    """
+    try:
+        index = INDEXES.get(kind)
+        if index is None:
+            return {"error": f"kind must be one of {list(INDEXES)}"}
+        if not 0 < k <= MAX_K:
+            return {"error": f"k must be between 1 and {MAX_K}"}
+        origin = _origin(lat, lng, uid, vid)
+        if origin is None:
+            return {"error": "lat and lng, or the uid/vid of a senior/volunteer with coords, are required"}
+
+        hits = index.nearest(origin[0], origin[1], k)
+        return {kind: _with_distance(hits), "center": {"lat": origin[0], "lng": origin[1]}}
+
+    except Exception as e:
+        logger.error(f"Error in nearest {kind} query: {str(e)}", exc_info=True)
+        return {"error": f"Internal server error: {str(e)}"}
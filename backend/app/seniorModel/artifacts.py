@@ -0,0 +1,13 @@
+import os
+
+
+def explainer_path(model_path):
+    """
+    Where the SHAP explainer part of a model artifact lives.
+
+    The predictor part (model, flat forest, encoder) is what every API worker
+    loads; the explainer is saved next to it so unpickling the predictor never
+    imports shap/numba/llvmlite.
+    """
+    root, ext = os.path.splitext(model_path)
+    return f"{root}_explainer{ext or '.pkl'}"
@@ -0,0 +1,214 @@
+import hashlib
+import json
+import os
+import shutil
+import time
+
+import numpy as np
+import pandas as pd
+
+from seniorModel.encoding import FeatureEncoder, LOW_HIGH_MAPPING
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data')
+CACHE_DIR = os.path.join(DATA_DIR, '.cache')
+TARGET = 'overall_wellbeing'
+
+# Bump when the on-disk layout changes so old caches are rebuilt
+FORMAT_VERSION = 1
+CSV_CHUNK_ROWS = 200_000
+
+
+class EncodedDataset:
+    """
+    A training CSV after encoding: X is (rows, features) float32, y the int64 target
+    (or None). Opened from the cache, both are read-only memory maps.
+    """
+
+    def __init__(self, X, y, manifest):
+        self.X = X
+        self.y = y
+        self.manifest = manifest
+
+    @property
+    def feature_names(self):
+        return self.manifest['feature_names']
+
+    @property
+    def encoder(self):
+        return FeatureEncoder.from_dict(self.manifest['encoder'])
+
+    def __len__(self):
+        return self.manifest['rows']
+
+
+def _file_digest(path):
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            h.update(block)
+    return h.hexdigest()
+
+
+def cache_path(csv_path, cache_dir=CACHE_DIR):
+    """Directory holding the encoded copy of a CSV"""
+    return os.path.join(cache_dir, os.path.splitext(os.path.basename(csv_path))[0])
+
+
+def _read_manifest(directory):
+    try:
+        with open(os.path.join(directory, 'manifest.json')) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _write_manifest(directory, manifest):
+    tmp = os.path.join(directory, 'manifest.json.tmp')
+    with open(tmp, 'w') as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp, os.path.join(directory, 'manifest.json'))
+
+
+def _is_fresh(manifest, csv_path, encoder, column_map, target):
+    """Whether a cache manifest still describes csv_path encoded the same way"""
+    if (manifest is None or manifest.get('format') != FORMAT_VERSION
+            or manifest['encoder'] != encoder.to_dict()
+            or manifest['column_map'] != (column_map or {})
+            or manifest['target'] != target):
+        return False
+    st = os.stat(csv_path)
+    source = manifest['source']
+    if source['size'] == st.st_size and source['mtime_ns'] == st.st_mtime_ns:
+        return True
+    # Touched (checkout, copy) but maybe not changed: compare contents
+    return source['size'] == st.st_size and source['sha256'] == _file_digest(csv_path)
+
+
+def _column_summary(X, feature_names, categories):
+    """Per-column stats kept in the manifest, so nobody has to rescan the data to describe it"""
+    summary = {}
+    for j, name in enumerate(feature_names):
+        col = X[:, j]
+        valid = col[~np.isnan(col)]
+        summary[name] = {
+            'missing': int(len(col) - len(valid)),
+            'min': float(valid.min()) if len(valid) else None,
+            'max': float(valid.max()) if len(valid) else None,
+            'mean': float(valid.mean()) if len(valid) else None,
+        }
+        if name in categories:
+            summary[name]['categories'] = categories[name]
+    return summary
+
+
+def build_dataset(csv_path, encoder=None, column_map=None, target=TARGET, cache_dir=CACHE_DIR):
+    """
+    Parse and encode a CSV once into X.npy / y.npy plus a manifest.json describing
+    the source file, schema, encoder and column stats. The CSV is read in chunks
+    and only the needed columns are parsed.
+    """
+    encoder = encoder or FeatureEncoder()
+    column_map = column_map or {}
+    source_names = {v: k for k, v in column_map.items()}
+    feature_cols = [source_names.get(name, name) for name in encoder.feature_names]
+    usecols = feature_cols + ([target] if target else [])
+
+    start = time.perf_counter()
+    X_parts, y_parts = [], []
+    categories = {}
+    for chunk in pd.read_csv(csv_path, usecols=usecols, chunksize=CSV_CHUNK_ROWS):
+        chunk = chunk.rename(columns=column_map)
+        X_parts.append(encoder.transform_frame(chunk))
+        if target:
+            y_parts.append(encoder.encode_target(chunk[target].tolist()))
+        for name in encoder.mappings:
+            if name in chunk:
+                for label, count in chunk[name].value_counts().items():
+                    counts = categories.setdefault(name, {})
+                    counts[str(label)] = counts.get(str(label), 0) + int(count)
+
+    n_features = len(encoder.feature_names)
+    X = np.concatenate(X_parts) if X_parts else np.empty((0, n_features), dtype=np.float32)
+    y = (np.concatenate(y_parts) if y_parts else np.empty(0, dtype=np.int64)) if target else None
+
+    st = os.stat(csv_path)
+    manifest = {
+        'format': FORMAT_VERSION,
+        'source': {
+            'path': os.path.abspath(csv_path),
+            'size': st.st_size,
+            'mtime_ns': st.st_mtime_ns,
+            'sha256': _file_digest(csv_path),
+        },
+        'rows': int(len(X)),
+        'feature_names': list(encoder.feature_names),
+        'column_map': column_map,
+        'encoder': encoder.to_dict(),
+        'target': target,
+        'target_mapping': LOW_HIGH_MAPPING if target else None,
+        'arrays': {
+            'X': {'file': 'X.npy', 'dtype': str(X.dtype), 'shape': list(X.shape)},
+            **({'y': {'file': 'y.npy', 'dtype': str(y.dtype), 'shape': list(y.shape)}} if target else {}),
+        },
+        'summary': _column_summary(X, encoder.feature_names, categories),
+        'target_counts': ({str(k): int(v) for k, v in zip(*np.unique(y, return_counts=True))}
+                          if target else None),
+        'build_seconds': round(time.perf_counter() - start, 3),
+        'built_at': time.time(),
+    }
+
+    # Build next to the cache and swap it in, so readers never see a half-written dataset
+    directory = cache_path(csv_path, cache_dir)
+    tmp_dir = f"{directory}.tmp-{os.getpid()}"
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    os.makedirs(tmp_dir)
+    np.save(os.path.join(tmp_dir, 'X.npy'), X)
+    if target:
+        np.save(os.path.join(tmp_dir, 'y.npy'), y)
+    _write_manifest(tmp_dir, manifest)
+    shutil.rmtree(directory, ignore_errors=True)
+    os.replace(tmp_dir, directory)
+    return manifest
+
+
+def open_dataset(csv_path, encoder=None, column_map=None, target=TARGET, cache_dir=CACHE_DIR, rebuild=False):
+    """
+    Encoded dataset for csv_path, memory-mapped from the cache.
+
+    The cache is rebuilt only when the CSV's contents, the encoder or the column
+    mapping changed (or rebuild=True). column_map renames source headers to
+    feature names, e.g. {'Age': 'age'}.
+    """
+    encoder = encoder or FeatureEncoder()
+    directory = cache_path(csv_path, cache_dir)
+    manifest = _read_manifest(directory)
+
+    if rebuild or not _is_fresh(manifest, csv_path, encoder, column_map, target):
+        manifest = build_dataset(csv_path, encoder, column_map, target, cache_dir)
+    else:
+        st = os.stat(csv_path)
+        if manifest['source']['mtime_ns'] != st.st_mtime_ns:
+            # Same contents under a new mtime: remember it so the next open skips the hash
+            manifest['source']['mtime_ns'] = st.st_mtime_ns
+            _write_manifest(directory, manifest)
+
+    X = np.load(os.path.join(directory, 'X.npy'), mmap_mode='r')
+    y = np.load(os.path.join(directory, 'y.npy'), mmap_mode='r') if target else None
+    return EncodedDataset(X, y, manifest)
+
+
+def describe(manifest):
+    """Printable summary of a dataset from its manifest"""
+    lines = [f"Dataset shape: ({manifest['rows']}, {len(manifest['feature_names'])})",
+             f"Source: {manifest['source']['path']} (sha256 {manifest['source']['sha256'][:12]})"]
+    for name, stats in manifest['summary'].items():
+        lines.append(f"\n{name}:")
+        lines.append(f"  Missing values: {stats['missing']}")
+        if 'categories' in stats:
+            lines.append(f"  Categories: {stats['categories']}")
+        if stats['min'] is not None:
+            lines.append(f"  Range: {stats['min']:.2f} to {stats['max']:.2f}")
+            lines.append(f"  Mean: {stats['mean']:.2f}")
+    if manifest['target_counts']:
+        lines.append(f"\nTarget distribution ({manifest['target']}): {manifest['target_counts']}")
+    return "\n".join(lines)
@@ -0,0 +1,96 @@
+import numpy as np
+from itertools import chain
+from operator import itemgetter
+
+FEATURES = ['age', 'physical', 'mental', 'dl_intervention', 'rece_gov_sup',
+            'community', 'making_ends_meet', 'living_situation']
+
+# Target encoding (overall_wellbeing); also used for the community feature
+LOW_HIGH_MAPPING = {'Low': 1, 'Medium': 2, 'High': 3}
+YES_MAPPING = {'Yes': 1, 'No': 0}
+MAKING_ENDS_MEET_MAPPING = {'Struggling': 1, 'Manageable': 2, 'Comfortable': 3}
+LIVING_SITUATION_MAPPING = {'Alone': 1, 'With Spouse': 2, 'With Family': 3, 'Assisted Living': 4}
+
+CATEGORY_MAPPINGS = {
+    'dl_intervention': YES_MAPPING,
+    'rece_gov_sup': YES_MAPPING,
+    'community': LOW_HIGH_MAPPING,
+    'making_ends_meet': MAKING_ENDS_MEET_MAPPING,
+    'living_situation': LIVING_SITUATION_MAPPING,
+}
+
+
+class FeatureEncoder:
+    """
+    Turns senior records into the float32 feature matrix the risk model is trained on.
+
+    Categorical labels ('Yes', 'Struggling', ...) are looked up in per-column tables
+    built once at construction; values that are already numeric (how the seniors
+    table stores them) pass through unchanged, and nulls become NaN. No DataFrame is built per call.
+    The encoder is stored in the model artifact as a plain dict (to_dict/from_dict)
+    so training and serving always agree on the encoding.
+    """
+
+    def __init__(self, feature_names=None, mappings=None):
+        self.feature_names = list(feature_names or FEATURES)
+        self.mappings = {col: dict(mapping) for col, mapping in (mappings or CATEGORY_MAPPINGS).items()}
+        self._compile()
+
+    def _compile(self):
+        # dict.get bound methods per column, so encoding is a C-level map() per column
+        self._lookups = [self.mappings[col].get if col in self.mappings else None
+                         for col in self.feature_names]
+        if len(self.feature_names) == 1:
+            name = self.feature_names[0]
+            self._getter = lambda record: (record[name],)
+        else:
+            self._getter = itemgetter(*self.feature_names)
+
+    def transform(self, records):
+        """Encode a list of senior dicts into a C-contiguous (n, n_features) float32 array"""
+        try:
+            flat = list(chain.from_iterable(map(self._getter, records)))
+        except KeyError as e:
+            raise ValueError(f"Senior record is missing feature {e}") from None
+        return self._encode_flat(flat, len(records))
+
+    def transform_frame(self, df):
+        """Encode a DataFrame (e.g. the training CSV) with the same tables as transform()"""
+        return self._encode_flat(df[self.feature_names].to_numpy(dtype=object).ravel().tolist(), len(df))
+
+    def encode_target(self, values):
+        """Encode overall_wellbeing labels (Low/Medium/High) to 1/2/3"""
+        lookup = LOW_HIGH_MAPPING.get
+        return np.fromiter(map(lookup, values, values), dtype=np.int64, count=len(values))
+
+    def _encode_flat(self, flat, n):
+        """Row-major flat list of raw values -> (n, k) float32, labels replaced column by column in place"""
+        k = len(self.feature_names)
+        for j, lookup in enumerate(self._lookups):
+            if lookup is not None:
+                column = flat[j::k]
+                flat[j::k] = map(lookup, column, column)
+        try:
+            return np.fromiter(flat, dtype=np.float32, count=n * k).reshape(n, k)
+        except (TypeError, ValueError):
+            pass
+        # Null features become NaN, as they did in a DataFrame; both forests route NaN as missing
+        flat = [np.nan if value is None else value for value in flat]
+        try:
+            return np.fromiter(flat, dtype=np.float32, count=n * k).reshape(n, k)
+        except (TypeError, ValueError):
+            pass
+        # Slow path only to name the offending column
+        for j, col in enumerate(self.feature_names):
+            try:
+                np.fromiter(flat[j::k], dtype=np.float32, count=n)
+            except (TypeError, ValueError) as e:
+                raise ValueError(f"Cannot encode feature '{col}': {str(e)}") from None
+        raise ValueError("Cannot encode senior features")
+
+    def to_dict(self):
+        return {"feature_names": list(self.feature_names), "mappings": self.mappings}
+
+    @classmethod
+    def from_dict(cls, spec):
+        return cls(spec["feature_names"], spec["mappings"])
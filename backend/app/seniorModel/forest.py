@@ -0,0 +1,154 @@
+import numpy as np
+
+# Rows evaluated per block; bounds the (rows x trees) node index matrix
+BLOCK_ROWS = 4096
+# Rows of the fixed check verify_export() runs when given no data
+CHECK_ROWS = 512
+
+
+class FlatForest:
+    """
+    A fitted RandomForestClassifier exported to flat NumPy arrays.
+
+    All trees' nodes are concatenated into one set of arrays and `roots` holds
+    each tree's first node. Leaves point to themselves, so a batch is evaluated
+    by stepping every (row, tree) pair one level per iteration for max_depth
+    iterations, with no per-call sklearn validation or joblib dispatch.
+    Probabilities are accumulated tree by tree in the same order sklearn uses,
+    so predict/predict_proba match RandomForestClassifier exactly.
+    """
+
+    def __init__(self, feature, threshold, children_left, children_right, missing_go_to_left,
+                 value, roots, classes, max_depth):
+        self.feature = np.ascontiguousarray(feature, dtype=np.intp)
+        self.threshold = np.ascontiguousarray(threshold, dtype=np.float64)
+        self.children_left = np.ascontiguousarray(children_left, dtype=np.intp)
+        self.children_right = np.ascontiguousarray(children_right, dtype=np.intp)
+        self.missing_go_to_left = np.ascontiguousarray(missing_go_to_left, dtype=bool)
+        self.value = np.ascontiguousarray(value, dtype=np.float64)
+        self.roots = np.ascontiguousarray(roots, dtype=np.intp)
+        self.classes = np.asarray(classes)
+        self.max_depth = int(max_depth)
+        self._children = np.column_stack([self.children_right, self.children_left]).ravel()
+        self._has_missing = bool(self.missing_go_to_left.any())
+        self._is_leaf = self.children_left == np.arange(len(self.children_left))
+
+    @classmethod
+    def from_sklearn(cls, model):
+        """Export a fitted RandomForestClassifier (single output)"""
+        features, thresholds, lefts, rights, missing, values, roots = [], [], [], [], [], [], []
+        offset = 0
+        max_depth = 0
+        for estimator in model.estimators_:
+            tree = estimator.tree_
+            n = tree.node_count
+            node_ids = np.arange(n)
+            is_leaf = tree.children_left == -1
+
+            left = np.where(is_leaf, node_ids, tree.children_left) + offset
+            right = np.where(is_leaf, node_ids, tree.children_right) + offset
+            # Leaf features are -2 in sklearn; any valid column works since leaves loop to themselves
+            feature = np.where(is_leaf, 0, tree.feature)
+
+            value = tree.value[:, 0, :estimator.n_classes_].astype(np.float64)
+            normalizer = value.sum(axis=1, keepdims=True)
+            # sklearn >= 1.4 already stores class fractions; older versions store counts
+            if not np.allclose(normalizer[normalizer > 0], 1.0):
+                normalizer[normalizer == 0.0] = 1.0
+                value = value / normalizer
+
+            features.append(feature)
+            thresholds.append(tree.threshold)
+            lefts.append(left)
+            rights.append(right)
+            missing.append(getattr(tree, 'missing_go_to_left', np.zeros(n, dtype=np.uint8)).astype(bool))
+            values.append(value)
+            roots.append(offset)
+            offset += n
+            max_depth = max(max_depth, tree.max_depth)
+
+        return cls(
+            np.concatenate(features), np.concatenate(thresholds),
+            np.concatenate(lefts), np.concatenate(rights), np.concatenate(missing),
+            np.concatenate(values), np.array(roots), model.classes_, max_depth
+        )
+
+    @property
+    def n_trees(self):
+        return len(self.roots)
+
+    def apply(self, X):
+        """Leaf node index reached by every row in every tree, shape (n_rows, n_trees)"""
+        X = np.ascontiguousarray(X, dtype=np.float32)
+        n, n_features = X.shape
+        flat_X = X.ravel()
+        # One slot per (row, tree) pair; only pairs not yet on a leaf are stepped
+        nodes = np.tile(self.roots, n)
+        row_offsets = np.repeat(np.arange(n, dtype=np.intp) * n_features, self.n_trees)
+        active = np.flatnonzero(~self._is_leaf.take(nodes))
+        while active.size:
+            current = nodes.take(active)
+            x = flat_X.take(row_offsets.take(active) + self.feature.take(current))
+            go_left = x <= self.threshold.take(current)
+            if self._has_missing:
+                go_left |= np.isnan(x) & self.missing_go_to_left.take(current)
+            # children holds (right, left) pairs, so one gather picks the branch
+            current = self._children.take(2 * current + go_left)
+            nodes[active] = current
+            active = active[~self._is_leaf.take(current)]
+        return nodes.reshape(n, self.n_trees)
+
+    def predict_proba(self, X):
+        X = np.asarray(X, dtype=np.float32)
+        proba = np.empty((X.shape[0], len(self.classes)), dtype=np.float64)
+        for start in range(0, X.shape[0], BLOCK_ROWS):
+            leaves = self.apply(X[start:start + BLOCK_ROWS])
+            # Summing over the tree axis adds trees in order, like sklearn's accumulation
+            block = self.value.take(leaves, axis=0).sum(axis=1)
+            block /= self.n_trees
+            proba[start:start + BLOCK_ROWS] = block
+        return proba
+
+    def predict(self, X):
+        return self.classes.take(np.argmax(self.predict_proba(X), axis=1), axis=0)
+
+    def to_dict(self):
+        """Plain dict of arrays, stored in the model artifact"""
+        return {
+            "feature": self.feature,
+            "threshold": self.threshold,
+            "children_left": self.children_left,
+            "children_right": self.children_right,
+            "missing_go_to_left": self.missing_go_to_left,
+            "value": self.value,
+            "roots": self.roots,
+            "classes": self.classes,
+            "max_depth": self.max_depth,
+        }
+
+    @classmethod
+    def from_dict(cls, spec):
+        return cls(**spec)
+
+
+def verify_export(forest, model, X=None):
+    """
+    Raise ValueError unless `forest` reproduces model.predict_proba exactly on X.
+    Without X, on CHECK_ROWS fixed rows: half drawn around each feature's split
+    thresholds, half exactly on them, with every seventh value missing (NaN).
+    """
+    if X is None:
+        rng = np.random.default_rng(0)
+        n_features = model.n_features_in_
+        X = np.empty((CHECK_ROWS, n_features), dtype=np.float32)
+        half = CHECK_ROWS // 2
+        for j in range(n_features):
+            splits = forest.threshold[~forest._is_leaf & (forest.feature == j)]
+            if not len(splits):
+                splits = np.zeros(1)
+            X[:half, j] = rng.uniform(splits.min() - 1, splits.max() + 1, half)
+            X[half:, j] = rng.choice(splits, CHECK_ROWS - half)
+        X.ravel()[::7] = np.nan
+    X = np.ascontiguousarray(X, dtype=np.float32)
+    if not np.array_equal(forest.predict_proba(X), model.predict_proba(X)):
+        raise ValueError("Flat forest export does not reproduce the model's probabilities")
@@ -1,12 +1,30 @@
 import pandas as pd
 import numpy as np
 from sklearn.ensemble import RandomForestClassifier
-from sklearn.model_selection import train_test_split, cross_val_score, GridSearchCV
+from sklearn.model_selection import train_test_split, GridSearchCV, RandomizedSearchCV, StratifiedKFold
+from sklearn.experimental import enable_halving_search_cv  # noqa: F401 (enables HalvingGridSearchCV)
+from sklearn.model_selection import HalvingGridSearchCV
+from scipy.stats import randint
 from sklearn.preprocessing import LabelEncoder, StandardScaler
 from sklearn.metrics import classification_report, confusion_matrix, accuracy_score
 import shap
 import joblib
 import os
+import sys
+import json
+import time
+import uuid
+import argparse
+
+# Make the app root importable when this file is run as a script from its own directory
+APP_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+if APP_DIR not in sys.path:
+    sys.path.insert(0, APP_DIR)
+
+from seniorModel.encoding import FeatureEncoder
+from seniorModel.forest import FlatForest, verify_export
+from seniorModel.artifacts import explainer_path
+from seniorModel.dataset import open_dataset, describe
 
 def analyze_dataset(df):
     """
@@ -22,7 +40,7 @@ def analyze_dataset(df):
         print(f"  Missing values: {df[col].isnull().sum()}")
         print(f"  Unique values: {df[col].nunique()}")
         
-        if df[col].dtype == 'object':
+        if not pd.api.types.is_numeric_dtype(df[col]):
             print(f"  Sample values: {df[col].dropna().unique()[:10]}")
         else:
             print(f"  Range: {df[col].min():.2f} to {df[col].max():.2f}")
@@ -55,54 +73,87 @@ def load_and_prepare_data(file_path=None):
     
     return df
 
+# Hyperparameter space shared by every search strategy
+PARAM_GRID = {
+    'n_estimators': [100, 200, 300],
+    'max_depth': [None, 10, 20, 30],
+    'min_samples_split': [2, 5, 10],
+    'min_samples_leaf': [1, 2, 4]
+}
+
+SEARCH_STRATEGIES = ('grid', 'halving', 'random')
+
+def build_search(strategy, folds, n_iter=20, n_jobs=-1, random_state=42):
+    """Hyperparameter search object for a strategy, scoring accuracy on the given folds"""
+    rf = RandomForestClassifier(random_state=random_state)
+    if strategy == 'grid':
+        # Exhaustive: every combination of PARAM_GRID
+        return GridSearchCV(rf, PARAM_GRID, cv=folds, scoring='accuracy', n_jobs=n_jobs)
+    if strategy == 'halving':
+        # Successive halving with the forest size as the resource: all candidates start
+        # small and only the best third survive to each larger forest
+        grid = {k: v for k, v in PARAM_GRID.items() if k != 'n_estimators'}
+        return HalvingGridSearchCV(
+            rf, grid, cv=folds, scoring='accuracy', n_jobs=n_jobs, factor=3,
+            resource='n_estimators', min_resources=30, max_resources=max(PARAM_GRID['n_estimators']),
+            random_state=random_state
+        )
+    if strategy == 'random':
+        # Fixed budget of n_iter candidates sampled from the same ranges
+        distributions = {
+            'n_estimators': randint(min(PARAM_GRID['n_estimators']), max(PARAM_GRID['n_estimators']) + 1),
+            'max_depth': PARAM_GRID['max_depth'],
+            'min_samples_split': randint(2, 11),
+            'min_samples_leaf': randint(1, 5)
+        }
+        return RandomizedSearchCV(rf, distributions, n_iter=n_iter, cv=folds, scoring='accuracy',
+                                  n_jobs=n_jobs, random_state=random_state)
+    raise ValueError(f"Unknown search strategy '{strategy}', expected one of {SEARCH_STRATEGIES}")
+
 class SeniorRiskAssessment:
     def __init__(self):
         self.model = None
         self.label_encoder = LabelEncoder()
-        self.feature_encoders = {}  # Store encoders for categorical features
         self.feature_names = None
         self.explainer = None
+        self.encoder = FeatureEncoder()
+        self.search_summary = None
+        self._folds = {}
 
-        
     def prepare_features(self, df):
         """Prepare features for training"""
         # Separate features and target
         feature_cols = [col for col in df.columns if col != 'overall_wellbeing']
-        X = df[feature_cols].copy()
-        y = df['overall_wellbeing'].copy()
-        
+
         # Store feature names
-        self.feature_names = list(X.columns)
-        
-        # Encode target variable (Low=0, Medium=1, High=2 for risk priority)
-        # y_encoded = self.label_encoder.fit_transform(y)
-
-        # encoding target value (overall_wellbeing)
-        low_high_mapping = {'Low': 1, 'Medium': 2, 'High': 3}
-        y_encoded = y.map(low_high_mapping).values
-
-        # encoding categorical variables (features)
-        yes_mapping = {'Yes': 1, 'No': 0}
-        meeting_ends_mapping = {'Struggling': 1, 'Manageable': 2, 'Comfortable': 3}
-        living_situation_mapping = {'Alone': 1, 'With Spouse': 2, 'With Family': 3, 'Assisted Living': 4}
-        for col in X.select_dtypes(include=['object']).columns:
-            if col == 'making_ends_meet':
-                X[col] = X[col].map(meeting_ends_mapping)
-            elif col == 'living_situation':
-                X[col] = X[col].map(living_situation_mapping)
-            elif col == 'community':
-                X[col] = X[col].map(low_high_mapping)
-            elif col == "dl_intervention" or col == 'rece_gov_sup':
-                X[col] = X[col].map(yes_mapping)
-            else:
-                continue
+        self.feature_names = feature_cols
+        self.encoder = FeatureEncoder(feature_cols)
+
+        # Encode target (Low=1, Medium=2, High=3) and categorical features with the
+        # same compiled encoder classify_seniors uses at serving time
+        y_encoded = self.encoder.encode_target(df['overall_wellbeing'].tolist())
+        X = pd.DataFrame(self.encoder.transform_frame(df), columns=feature_cols, index=df.index)
 
         print("Feature columns:", self.feature_names)
 
         return X, y_encoded
+
+    def prepare_dataset(self, dataset):
+        """Use an encoded dataset (seniorModel.dataset) as-is: no parsing or encoding"""
+        self.feature_names = list(dataset.feature_names)
+        self.encoder = dataset.encoder
+        print("Feature columns:", self.feature_names)
+        return dataset.X, dataset.y
     
-    def train_model(self, X, y, test_size=0.2, random_state=42):
-        """Train the Random Forest model with hyperparameter tuning"""
+    def train_model(self, X, y, test_size=0.2, random_state=42, search='grid', n_iter=20, cv=5, n_jobs=-1):
+        """
+        Train the Random Forest model with hyperparameter tuning.
+
+        search selects the strategy (see SEARCH_STRATEGIES): 'grid' is the exhaustive
+        search, 'halving' races the grid on growing forest sizes, 'random' samples
+        n_iter candidates. All strategies score the same stratified fold indices.
+        A summary of the run is kept in self.search_summary.
+        """
         # Split the data
         X_train, X_test, y_train, y_test = train_test_split(
             X, y, test_size=test_size, random_state=random_state, stratify=y
@@ -110,41 +161,56 @@ class SeniorRiskAssessment:
         
         print(f"Training set size: {X_train.shape}")
         print(f"Test set size: {X_test.shape}")
-        
+
+        # Fit on plain float32 arrays: classify_seniors predicts on the encoder's
+        # matrix, so the model must not remember DataFrame column names
+        X_train_arr = np.ascontiguousarray(X_train, dtype=np.float32)
+        X_test_arr = np.ascontiguousarray(X_test, dtype=np.float32)
+
+        # Fold indices are computed once and reused by every search on this split
+        fold_key = (len(y_train), cv, random_state)
+        if fold_key not in self._folds:
+            splitter = StratifiedKFold(n_splits=cv, shuffle=True, random_state=random_state)
+            self._folds[fold_key] = list(splitter.split(X_train_arr, y_train))
+        folds = self._folds[fold_key]
+
         # Hyperparameter tuning
-        param_grid = {
-            'n_estimators': [100, 200, 300],
-            'max_depth': [None, 10, 20, 30],
-            'min_samples_split': [2, 5, 10],
-            'min_samples_leaf': [1, 2, 4]
-        }
-        
-        rf = RandomForestClassifier(random_state=random_state)
-        
-        # Grid search with cross-validation
-        print("Performing hyperparameter tuning...")
-        grid_search = GridSearchCV(rf, param_grid, cv=5, scoring='accuracy', n_jobs=-1)
-        grid_search.fit(X_train, y_train)
+        print(f"Performing hyperparameter tuning ({search} search)...")
+        search_cv = build_search(search, folds, n_iter=n_iter, n_jobs=n_jobs, random_state=random_state)
+        start = time.perf_counter()
+        search_cv.fit(X_train_arr, y_train)
+        search_seconds = time.perf_counter() - start
         
         # Use best model
-        self.model = grid_search.best_estimator_
-        print(f"Best parameters: {grid_search.best_params_}")
+        self.model = search_cv.best_estimator_
+        print(f"Best parameters: {search_cv.best_params_}")
         
         # Evaluate model
-        train_score = self.model.score(X_train, y_train)
-        test_score = self.model.score(X_test, y_test)
+        train_score = self.model.score(X_train_arr, y_train)
+        test_score = self.model.score(X_test_arr, y_test)
         
         print(f"Training accuracy: {train_score:.4f}")
         print(f"Test accuracy: {test_score:.4f}")
         
-        # Cross-validation
-        cv_scores = cross_val_score(self.model, X_train, y_train, cv=5)
-        print(f"Cross-validation accuracy: {cv_scores.mean():.4f} (+/- {cv_scores.std() * 2:.4f})")
+        # Cross-validation score of the best candidate, on the same folds the search used
+        cv_std = search_cv.cv_results_['std_test_score'][search_cv.best_index_]
+        print(f"Cross-validation accuracy: {search_cv.best_score_:.4f} (+/- {cv_std * 2:.4f})")
         
         # Detailed evaluation
-        y_pred = self.model.predict(X_test)
+        y_pred = self.model.predict(X_test_arr)
         print("\nClassification Report:")
         print(classification_report(y_test, y_pred, target_names=['Low', 'Medium', 'High']))
+
+        self.search_summary = {
+            'strategy': search,
+            # Halving re-evaluates survivors, so fits are counted from cv_results_
+            'candidates': int(getattr(search_cv, 'n_candidates_', [len(search_cv.cv_results_['params'])])[0]),
+            'fits': len(search_cv.cv_results_['params']) * len(folds),
+            'search_seconds': round(search_seconds, 2),
+            'cv_accuracy': round(float(search_cv.best_score_), 4),
+            'test_accuracy': round(float(test_score), 4),
+            'best_params': search_cv.best_params_,
+        }
         
         return X_train, X_test, y_train, y_test
     
@@ -152,7 +218,7 @@ class SeniorRiskAssessment:
         """Setup SHAP explainer"""
         print("Setting up SHAP explainer...")
         self.explainer = shap.TreeExplainer(self.model)
-        self.shap_values = self.explainer.shap_values(X_train)
+        self.shap_values = self.explainer.shap_values(np.ascontiguousarray(X_train, dtype=np.float32))
         print("SHAP explainer ready!")
     
     def explain_prediction(self, sample_data, return_explanation=False):
@@ -178,12 +244,11 @@ class SeniorRiskAssessment:
         # print("Raw prediction:", prediction)
         prediction_proba = self.model.predict_proba(sample_processed)[0]
         class_mapping = {1: "Low", 2: "Medium", 3: "High"}
-        predicted_class = class_mapping[prediction - 1]
+        predicted_class = class_mapping[int(prediction)]
         # predicted_class = self.label_encoder.inverse_transform([prediction])[0]
         
         # Get SHAP values
         shap_values = self.explainer.shap_values(sample_processed)[0]
-        print("shap_values:", shap_values)
         # print(shap_values[0].shape)  # Should be (1, num_features)
 
         # Create explanation
@@ -203,11 +268,10 @@ class SeniorRiskAssessment:
         
         for i, feature in enumerate(self.feature_names):
             explanation['feature_importance'][feature] = {
-                'value': float(sample_processed.iloc[0, i]),
+                'value': float(sample_processed[0, i]),
                 'shap_value': float(shap_values[i][prediction-1]),
                 'impact': 'Decrease Risk' if shap_values[i][prediction-1] > 0 else 'Increase Risk'
             }
-        print("Explanation: ", explanation)
         # Sort by absolute SHAP value
         explanation['pos_factors'] = sorted(
             explanation['feature_importance'].items(),
@@ -221,8 +285,6 @@ class SeniorRiskAssessment:
             reverse=False
         )[:5]
 
-        print("Top Risk Factors: ", explanation['pos_factors'])
-
         if return_explanation:
             return explanation
         else:
@@ -230,33 +292,7 @@ class SeniorRiskAssessment:
     
     def _preprocess_input(self, sample_df):
         """Apply the same preprocessing used during training"""
-        processed_df = sample_df.copy()
-        #print("Before processing\n")
-        #print(processed_df)
-
-        low_high_mapping = {'Low': 1, 'Medium': 2, 'High': 3}
-
-        # encoding categorical variables (features)
-        yes_mapping = {'Yes': 1, 'No': 0}
-        meeting_ends_mapping = {'Struggling': 1, 'Manageable': 2, 'Comfortable': 3}
-        living_situation_mapping = {'Alone': 1, 'With Spouse': 2, 'With Family': 3, 'Assisted Living': 4}
-        for col in processed_df.select_dtypes(include=['object']).columns:
-            if col == 'making_ends_meet':
-                processed_df[col] = processed_df[col].map(meeting_ends_mapping)
-            elif col == 'living_situation':
-                processed_df[col] = processed_df[col].map(living_situation_mapping)
-            elif col == 'community':
-                processed_df[col] = processed_df[col].map(low_high_mapping)
-            elif col == "dl_intervention" or col == 'rece_gov_sup':
-                processed_df[col] = processed_df[col].map(yes_mapping)
-            else:
-                continue
-        # Select and order features correctly
-        processed_df = processed_df[self.feature_names]
-
-        #print("\nAfter processing\n")
-        #print(processed_df)
-        return processed_df
+        return self.encoder.transform_frame(sample_df)
     
     def _print_explanation(self, explanation, sample_data):
         """Print human-readable explanation"""
@@ -283,16 +319,35 @@ class SeniorRiskAssessment:
             print(f"  {i}. {feature}: {info['value']:.2f} {impact_symbol}")
             print(f"     Impact: {info['impact']} (SHAP: {info['shap_value']:.3f})\n")
 
-    def save_model(self, filepath):
-        """Save the trained model"""
+    def save_model(self, filepath, X_check=None):
+        """
+        Save the trained model, together with its flat-array export used for serving.
+        The export must reproduce the model's probabilities on a fixed check set
+        (including missing values) and, if given, on X_check.
+
+        The SHAP explainer goes to a separate file (see seniorModel.artifacts) tagged
+        with the same model_id, so loading the predictor doesn't import shap.
+        """
+        forest = FlatForest.from_sklearn(self.model)
+        verify_export(forest, self.model)
+        if X_check is not None:
+            verify_export(forest, self.model, X_check)
+
+        model_id = uuid.uuid4().hex
         model_data = {
+            'model_id': model_id,
             'model': self.model,
+            'forest': forest.to_dict(),
             'label_encoder': self.label_encoder,
             'feature_names': self.feature_names,
-            'explainer': self.explainer
+            'feature_encoder': self.encoder.to_dict()
         }
         joblib.dump(model_data, filepath)
         print(f"Model saved to {filepath}")
+
+        if self.explainer is not None:
+            joblib.dump({'model_id': model_id, 'explainer': self.explainer}, explainer_path(filepath))
+            print(f"Explainer saved to {explainer_path(filepath)}")
     
     def load_model(self, filepath):
         """Load a saved model"""
@@ -300,26 +355,65 @@ class SeniorRiskAssessment:
         self.model = model_data['model']
         self.label_encoder = model_data['label_encoder']
         self.feature_names = model_data['feature_names']
-        self.explainer = model_data['explainer']
+        self.encoder = (FeatureEncoder.from_dict(model_data['feature_encoder'])
+                        if 'feature_encoder' in model_data else FeatureEncoder(self.feature_names))
+        self.explainer = model_data.get('explainer')  # artifacts saved before the split
+        if self.explainer is None and os.path.exists(explainer_path(filepath)):
+            explainer_data = joblib.load(explainer_path(filepath))
+            if explainer_data.get('model_id') == model_data.get('model_id'):
+                self.explainer = explainer_data['explainer']
         print(f"Model loaded from {filepath}")
 
 def main():
     """Main function demonstrating the complete workflow"""
+    current_dir = os.path.dirname(os.path.abspath(__file__))
+    data_dir = os.path.join(os.path.dirname(current_dir), 'data')
+
+    parser = argparse.ArgumentParser(description="Train the senior wellbeing risk model")
+    parser.add_argument('--data', default=os.path.join(data_dir, 'v3_seniors_wellbeing_dataset.csv'),
+                        help="training dataset CSV")
+    parser.add_argument('--search', choices=SEARCH_STRATEGIES, default='grid',
+                        help="hyperparameter search strategy for the saved model")
+    parser.add_argument('--n-iter', type=int, default=20, help="candidates sampled by --search random")
+    parser.add_argument('--cv', type=int, default=5, help="cross-validation folds")
+    parser.add_argument('--n-jobs', type=int, default=-1)
+    parser.add_argument('--compare', action='store_true',
+                        help="run every search strategy on the same folds and print wall time vs accuracy")
+    parser.add_argument('--report', help="write the search report as JSON to this path")
+    parser.add_argument('--rebuild-cache', action='store_true',
+                        help="re-encode the dataset even if its cached copy is up to date")
+    parser.add_argument('--output', default='senior_risk_model.pkl', help="where to save the model")
+    args = parser.parse_args()
     
     print("=== SENIOR RISK ASSESSMENT MODEL TUTORIAL ===\n")
     
     # 1. Load and prepare data
     print("1. Loading and preparing data...")
-    current_dir = os.path.dirname(os.path.abspath(__file__))
-    parent_dir = os.path.dirname(current_dir)
-    data_dir = os.path.join(parent_dir, 'data')
-    df = load_and_prepare_data(os.path.join(data_dir, 'v3_seniors_wellbeing_dataset.csv'))  # Replace with your actual data file
+    # Parsed and encoded once per CSV version, then memory-mapped from seniorModel/data/.cache
+    dataset = open_dataset(args.data, rebuild=args.rebuild_cache)
+    print(describe(dataset.manifest))
+    risk_model = SeniorRiskAssessment()
+    X, y = risk_model.prepare_dataset(dataset)
 
     # 2. Initialize and train model
     print("\n2. Training Random Forest model...")
-    risk_model = SeniorRiskAssessment()
-    X, y = risk_model.prepare_features(df)
-    X_train, X_test, y_train, y_test = risk_model.train_model(X, y)
+    # With --compare the chosen strategy runs last so its model is the one kept
+    strategies = [s for s in SEARCH_STRATEGIES if s != args.search] if args.compare else []
+    report = []
+    for strategy in strategies + [args.search]:
+        X_train, X_test, y_train, y_test = risk_model.train_model(
+            X, y, search=strategy, n_iter=args.n_iter, cv=args.cv, n_jobs=args.n_jobs
+        )
+        report.append(risk_model.search_summary)
+
+    print("\nSearch report:")
+    print(f"{'strategy':<10} {'candidates':>10} {'fits':>6} {'wall s':>8} {'cv acc':>8} {'test acc':>9}")
+    for row in report:
+        print(f"{row['strategy']:<10} {row['candidates']:>10} {row['fits']:>6} {row['search_seconds']:>8.1f} "
+              f"{row['cv_accuracy']:>8.4f} {row['test_accuracy']:>9.4f}")
+    if args.report:
+        with open(args.report, 'w') as f:
+            json.dump(report, f, indent=2, default=str)
     
     # 3. Setup SHAP explainer
     print("\n3. Setting up SHAP explainer...")
@@ -330,24 +424,11 @@ def main():
     # sample_senior = X_test.iloc[0]  # Take first test sample
     # risk_model.explain_prediction(sample_senior)
 
-    # Get original data row instead of processed data
-    sample_senior_idx = X_test.index[0]
-    # print("sample senior idx: ", sample_senior_idx)
-
-    sample_senior_original = df.loc[sample_senior_idx]
-    # print("sample senior original:\n", sample_senior_original)
-
-    # Remove target column and use original features
-    feature_cols = [col for col in df.columns if col != 'overall_wellbeing']
-    sample_features = sample_senior_original[feature_cols]
-    # print("sample features:\n", sample_features)
-
-    # This will now work with the updated explain_prediction method
-    risk_model.explain_prediction(sample_features)
-    'Alone' 'With Family' 'Assisted Living' 'With Spouse'
+    # Encoded values pass through the encoder unchanged, so a test row can be explained directly
+    risk_model.explain_prediction(X_test[0])
     # 5. Save model for production use
     print("\n5. Saving model...")
-    risk_model.save_model('senior_risk_model.pkl')
+    risk_model.save_model(args.output, X_check=X_test)
     
     # # 6. Demonstrate API usage
     # print("\n6. Demonstrating API usage for backend integration...")
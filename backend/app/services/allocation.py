@@ -0,0 +1,580 @@
+import hashlib
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from scipy.optimize import linear_sum_assignment
+from scipy.sparse import csr_matrix
+from scipy.sparse.csgraph import min_weight_full_bipartite_matching
+from scipy.spatial import cKDTree
+
+from config.settings import supabase, logger, ALLOCATION_CACHE_DIR
+from services.clustering import fit_clusters, split_clusters, load_centroids, MAX_CLUSTER_SIZE
+from services.spatial_index import PointTree
+from services.registry import constituency_registry
+from utils.cache import LRUCache, PersistentLRUCache
+from utils.geo import (haversine_km, haversine_pairs_km, coords_array, cluster_counts, cluster_bbox_density,
+                       cluster_max_radius_km, unit_vectors, chord_to_km, KM_PER_DEG)
+
+# Seniors one volunteer is expected to cover
+TARGET_RATIO = 3
+# Sparse clusters get up to this many times the volunteers their senior count alone would give
+MAX_SPREAD_FACTOR = 2.0
+# Cost multiplier for volunteers placed beyond a cluster's capacity
+OVERFLOW_PENALTY = 2.0
+# When volunteers outnumber total capacity, each cluster can take this many times
+# its even share of the surplus
+OVERFLOW_SHARE = 2
+# Cost discount for the most skilled volunteer (skill 3) in an all-high-risk cluster
+SKILL_WEIGHT = 0.3
+PREFERS_OUTSIDE_DISCOUNT = 0.8
+# Above this many volunteer x slot cells, only each volunteer's nearest clusters are considered
+DENSE_MAX_CELLS = 4_000_000
+CANDIDATE_CLUSTERS = 12
+# Nearest clusters (by distance alone) the cheapest candidates are chosen from
+CANDIDATE_POOL = 48
+
+MIN_RADIUS_KM = 0.2  # 200 meters
+# Densities below 0.1 seniors per square degree are treated as 0.1
+MIN_DENSITY_PER_KM2 = 0.1 / KM_PER_DEG ** 2
+# Allocation results kept for identical requests; each holds every senior's label
+ALLOCATION_CACHE_SIZE = 64
+ALLOCATION_CACHE_TTL = 3600
+# Request fields that change the result (besides the seniors and volunteers themselves)
+ALLOCATION_OPTIONS = ("incremental", "split", "max_cluster_size", "max_radius_km", "solver", "by_constituency")
+
+# Shards smaller than this are allocated in the calling process rather than shipped to a worker
+MIN_SHARD_FOR_POOL = 500
+
+
+def cluster_capacity(sizes, density):
+    """
+    Volunteers each cluster should get: one per TARGET_RATIO seniors, scaled up
+    (by at most MAX_SPREAD_FACTOR) for clusters sparser than the median, where
+    the same seniors take longer to reach.
+    """
+    sizes = np.asarray(sizes)
+    populated = sizes > 0
+    if not populated.any():
+        return np.zeros(len(sizes), dtype=np.int64)
+    median_density = np.median(density[populated])
+    spread = np.clip(np.sqrt(median_density / np.maximum(density, 1e-12)), 1.0, MAX_SPREAD_FACTOR)
+    capacity = np.ceil(sizes / TARGET_RATIO * spread).astype(np.int64)
+    return np.where(populated, np.maximum(capacity, 1), 0)
+
+
+def _slots(sizes, capacity, n_volunteers):
+    """
+    One column per (cluster, k-th volunteer). Every cluster gets its capacity plus
+    OVERFLOW_SHARE times an even share of any volunteers left over once all
+    capacity is used, plus one spare.
+    """
+    populated = np.flatnonzero(sizes > 0)
+    excess = max(0, n_volunteers - int(capacity.sum()))
+    overflow = OVERFLOW_SHARE * -(-excess // len(populated)) + 1 if excess else 0
+    counts = np.zeros(len(sizes), dtype=np.int64)
+    counts[populated] = np.minimum(capacity[populated] + overflow, n_volunteers)
+    slot_cluster = np.repeat(np.arange(len(sizes)), counts)
+    # Position of each slot within its cluster: 0, 1, ... counts[c]-1
+    slot_rank = np.arange(len(slot_cluster)) - np.repeat(np.cumsum(counts) - counts, counts)
+    return slot_cluster, slot_rank
+
+
+def _slot_multiplier(slot_cluster, slot_rank, sizes, capacity, density_factor):
+    # The greedy allocator's workload factor for the k-th volunteer in a cluster,
+    # times its density factor, with the overflow penalty past capacity
+    workload = 1 + slot_rank / np.maximum(1, sizes[slot_cluster])
+    overflow = np.where(slot_rank >= capacity[slot_cluster], OVERFLOW_PENALTY, 1.0)
+    return workload * density_factor[slot_cluster] * overflow
+
+
+def greedy_assignments(vol_coords, centroids, sizes, density_factor, prefers_outside=None):
+    """
+    The original one-at-a-time allocation: each volunteer, in input order, takes
+    the cluster minimising distance_km × workload factor × density factor, where
+    the workload factor grows with every volunteer already placed there.
+    Returns (cluster index, weighted distance) per volunteer.
+    """
+    n_volunteers = len(vol_coords)
+    chosen = np.full(n_volunteers, -1)
+    weighted = np.full(n_volunteers, np.inf)
+    sizes = np.asarray(sizes)
+    # A KD-tree over the centroids finds each volunteer's best cluster from its nearest few
+    centroid_tree = PointTree(centroids)
+    # Per-cluster multiplier on distance; empty clusters are never picked
+    weights = np.where(sizes > 0, density_factor, np.inf).astype(np.float64)
+    # Weights only grow, so the starting minimum bounds them for every query
+    min_weight = float(weights.min()) if len(weights) else np.inf
+    placed = np.zeros(len(sizes), dtype=np.int64)
+    for i in range(n_volunteers):
+        best, best_dist = centroid_tree.nearest_weighted(vol_coords[i], weights, min_weight=min_weight)
+        if best is None or not np.isfinite(best_dist):
+            continue
+        if prefers_outside is not None and prefers_outside[i]:
+            best_dist *= PREFERS_OUTSIDE_DISCOUNT
+        chosen[i], weighted[i] = best, best_dist
+        placed[best] += 1
+        weights[best] = density_factor[best] * (1 + placed[best] / max(1, sizes[best]))
+    return chosen, weighted
+
+
+def solve_assignments(vol_coords, centroids, sizes, density_factor, capacity,
+                      skills=None, prefers_outside=None, high_risk_share=None):
+    """
+    Minimum total cost assignment of volunteers to clusters.
+
+    Cost of the k-th volunteer in cluster c is distance_km × density factor × the
+    greedy workload factor (1 + k / seniors in c), doubled past the cluster's
+    capacity. Skilled volunteers are cheaper in clusters with many high-risk
+    seniors, and volunteers who prefer being outside have their distances
+    discounted. Unlike the greedy pass, the result doesn't depend on volunteer
+    order. Returns (cluster index, weighted distance) per volunteer; the weighted
+    distance uses the greedy definition so the two stay comparable.
+    """
+    n_volunteers = len(vol_coords)
+    sizes = np.asarray(sizes)
+    centroids = np.asarray(centroids, dtype=np.float64)
+    if n_volunteers == 0 or not (sizes > 0).any():
+        return np.full(n_volunteers, -1), np.full(n_volunteers, np.inf)
+
+    vol_factor = np.ones(n_volunteers)
+    if prefers_outside is not None:
+        vol_factor = np.where(prefers_outside, PREFERS_OUTSIDE_DISCOUNT, 1.0)
+    skill_level = high_risk = None
+    if skills is not None and high_risk_share is not None:
+        # skill 1..3 -> 0..1, scaled by the cluster's share of high-risk seniors
+        skill_level = (np.clip(np.asarray(skills, dtype=np.float64), 1, 3) - 1) / 2
+        high_risk = np.asarray(high_risk_share, dtype=np.float64)
+
+    def pair_cost(vol, cluster, dist):
+        """Cost before slot multipliers of volunteer vol in cluster, at distance dist (same shapes)"""
+        cost = dist * vol_factor[vol]
+        if skill_level is not None:
+            cost = cost * (1 - SKILL_WEIGHT * skill_level[vol] * high_risk[cluster])
+        return cost
+
+    slot_cluster, slot_rank = _slots(sizes, capacity, n_volunteers)
+    slot_mult = _slot_multiplier(slot_cluster, slot_rank, sizes, capacity, density_factor)
+
+    if n_volunteers * len(slot_cluster) <= DENSE_MAX_CELLS:
+        dist = haversine_km(vol_coords, centroids)
+        vol, cluster = np.indices(dist.shape)
+        cluster_cost = pair_cost(vol, cluster, dist)
+        rows, cols = linear_sum_assignment(cluster_cost[:, slot_cluster] * slot_mult[None, :])
+    else:
+        rows, cols = _sparse_match(vol_coords, centroids, sizes, pair_cost, density_factor, slot_cluster, slot_mult)
+
+    chosen = np.full(n_volunteers, -1)
+    chosen[rows] = slot_cluster[cols]
+    rank = np.zeros(n_volunteers)
+    rank[rows] = slot_rank[cols]
+    picked = np.maximum(chosen, 0)
+    workload = 1 + rank / np.maximum(1, sizes[picked])
+    weighted = haversine_pairs_km(vol_coords, centroids[picked]) * workload * density_factor[picked] * vol_factor
+    return chosen, np.where(chosen >= 0, weighted, np.inf)
+
+
+def _sparse_match(vol_coords, centroids, sizes, pair_cost, density_factor, slot_cluster, slot_mult):
+    """
+    Same matching restricted to each volunteer's CANDIDATE_CLUSTERS cheapest clusters,
+    picked from its CANDIDATE_POOL nearest populated ones with a KD-tree, so no
+    volunteer x cluster matrix is built. If that leaves some volunteer unmatched
+    the candidate lists are doubled until every populated cluster is a candidate.
+    """
+    n_volunteers = len(vol_coords)
+    populated = np.flatnonzero(np.asarray(sizes) > 0)
+    tree = cKDTree(unit_vectors(centroids[populated]))
+    vol_vectors = unit_vectors(vol_coords)
+    # Slots are grouped by cluster: where each cluster's slots start and how many it has
+    starts = np.searchsorted(slot_cluster, np.arange(len(centroids)))
+    counts = np.searchsorted(slot_cluster, np.arange(len(centroids)), side="right") - starts
+    m = CANDIDATE_CLUSTERS
+    while True:
+        pool = min(len(populated), max(m, CANDIDATE_POOL))
+        keep = min(m, pool)
+        chord, near = tree.query(vol_vectors, k=pool)
+        near = populated[near.reshape(n_volunteers, pool)]
+        volunteer = np.repeat(np.arange(n_volunteers), pool).reshape(n_volunteers, pool)
+        cost = pair_cost(volunteer, near, chord_to_km(chord.reshape(n_volunteers, pool)))
+        if keep < pool:
+            best = np.argpartition(cost * density_factor[near], keep - 1, axis=1)[:, :keep]
+            near = np.take_along_axis(near, best, axis=1)
+            cost = np.take_along_axis(cost, best, axis=1)
+        candidates, cost = near.ravel(), cost.ravel()
+        volunteer = np.repeat(np.arange(n_volunteers), keep)
+        # Expand every (volunteer, candidate) pair to all the candidate's slots
+        per_pair = counts[candidates]
+        rows = np.repeat(volunteer, per_pair)
+        cols = np.repeat(starts[candidates], per_pair) + (
+            np.arange(per_pair.sum()) - np.repeat(np.cumsum(per_pair) - per_pair, per_pair))
+        # Zero-cost edges would be dropped from the sparse matrix
+        values = np.maximum(np.repeat(cost, per_pair) * slot_mult[cols], 1e-12)
+        graph = csr_matrix((values, (rows, cols)), shape=(n_volunteers, len(slot_cluster)))
+        try:
+            return min_weight_full_bipartite_matching(graph)
+        except ValueError:
+            if keep >= len(populated):
+                raise
+            m *= 2
+
+
+def cluster_count(n_seniors, n_volunteers):
+    """Initial number of clusters from the volunteer-to-senior ratio"""
+    # Use 1:3 ratio (1 volunteer per 3 seniors) as optimal target
+    recommended_clusters = max(1, n_seniors // (TARGET_RATIO * max(1, n_volunteers)))
+    min_clusters = max(1, n_seniors // 6)  # max 6 seniors per cluster
+    max_clusters = n_seniors // 2  # min 2 seniors per cluster
+    return max(min_clusters, min(recommended_clusters, max_clusters))
+
+
+def _lap(timings, step, started):
+    """Add the seconds since `started` to timings[step] (if timings is a dict); returns the time now"""
+    now = time.perf_counter()
+    if timings is not None:
+        timings[step] = timings.get(step, 0.0) + now - started
+    return now
+
+
+def allocate(seniors, volunteers, options, seed=None, timings=None):
+    """
+    Cluster seniors and assign volunteers to the clusters (the /allocate body).
+
+    options are the request fields: incremental, split, max_cluster_size,
+    max_radius_km, solver. seed overrides the persisted centroids as the warm
+    start. If `timings` is a dict, the seconds spent in each step are added to
+    it. Sets each senior's "cluster" and returns (response, centroids, radius_km,
+    seeds): seeds are the fitted centroids before splitting, clusters 0..len-1,
+    to persist as the next run's warm start.
+    """
+    started = time.perf_counter()
+    n_clusters = cluster_count(len(seniors), len(volunteers))
+
+    # Step 1: K-means clustering of seniors, warm-started from the persisted centroids
+    # unless the caller asks for a full refit ("incremental": false)
+    senior_coords = coords_array(seniors)
+    labels, centroids = fit_clusters(senior_coords, n_clusters, incremental=options.get("incremental", True),
+                                     seed=seed)
+    # Splits keep the fitted ids 0..n-1 and add new ones after them
+    seeds = centroids
+    started = _lap(timings, "fit", started)
+
+    # Step 1b: Split clusters that are too big or too wide ("max_cluster_size", "max_radius_km";
+    # "split": false keeps the fitted clusters as they are), so the final count follows the data
+    if options.get("split", True):
+        labels, centroids, split_stats = split_clusters(
+            senior_coords, labels, centroids,
+            max_size=options.get("max_cluster_size", MAX_CLUSTER_SIZE),
+            max_radius_km=options.get("max_radius_km"))
+        n_clusters = len(centroids)
+        logger.info(f"Split into {n_clusters} clusters ({split_stats['splits']} splits in {split_stats['rounds']} rounds)")
+    started = _lap(timings, "split", started)
+
+    # Step 2: Assign seniors to clusters
+    clusters = {i: [] for i in range(n_clusters)}
+    for idx, senior in enumerate(seniors):
+        cluster_id = int(labels[idx])
+        clusters[cluster_id].append(senior)
+        senior['cluster'] = cluster_id
+    started = _lap(timings, "group", started)
+
+    # Step 3: Calculate cluster density (seniors per km²) and radius (km)
+    sizes = cluster_counts(labels, n_clusters)
+    density = cluster_bbox_density(senior_coords, labels, n_clusters)
+    # Add a small buffer (10% extra) to ensure all seniors are visually within the circle,
+    # with a minimum radius of 200 meters for visual clarity
+    radius = np.maximum(cluster_max_radius_km(senior_coords, labels, centroids) * 1.1, MIN_RADIUS_KM)
+    cluster_density_map = {i: float(density[i]) for i in range(n_clusters)}
+    cluster_radius_map = {i: float(radius[i]) for i in range(n_clusters)}
+    started = _lap(timings, "density_radius", started)
+
+    # Step 4: Assign volunteers to clusters with workload balancing. The default solver
+    # matches all volunteers at once against per-cluster capacity; "solver": "greedy"
+    # keeps the original one-volunteer-at-a-time pass
+    located = [vol for vol in volunteers if vol.get('coords')]
+    vol_coords = coords_array(located)
+    prefers_outside = np.array([bool(vol.get('prefers_outside', False)) for vol in located])
+    # Density factor: decreases with higher density
+    density_factor = 1 / np.maximum(MIN_DENSITY_PER_KM2, density)
+    capacity = cluster_capacity(sizes, density)
+
+    if options.get("solver", "optimal") == "greedy":
+        chosen, weighted = greedy_assignments(vol_coords, centroids, sizes, density_factor, prefers_outside)
+    else:
+        skills = np.array([vol.get('skill') or 1 for vol in located], dtype=np.float64)
+        high_risk = np.bincount(labels, weights=[s.get('overall_wellbeing') == 1 for s in seniors],
+                                minlength=n_clusters)
+        chosen, weighted = solve_assignments(vol_coords, centroids, sizes, density_factor, capacity,
+                                             skills=skills, prefers_outside=prefers_outside,
+                                             high_risk_share=high_risk / np.maximum(1, sizes))
+
+    assignments = [
+        {"volunteer": vol['vid'], "cluster": int(cluster), "weighted_distance": round(float(dist), 4)}
+        for vol, cluster, dist in zip(located, chosen, weighted)
+        if cluster >= 0
+    ]
+    volunteers_per_cluster = np.bincount(chosen[chosen >= 0], minlength=n_clusters)  # Track volunteers per cluster
+    started = _lap(timings, "assign_volunteers", started)
+
+    clusters_output = []
+    for cluster_id, cluster_seniors in clusters.items():
+        clusters_output.append({
+            "id": cluster_id,
+            "center": {"lat": float(centroids[cluster_id][0]), "lng": float(centroids[cluster_id][1])},
+            "radius": cluster_radius_map[cluster_id],
+            "seniors": cluster_seniors,
+            "senior_count": len(cluster_seniors),
+            "volunteer_count": int(volunteers_per_cluster[cluster_id]),
+            "capacity": int(capacity[cluster_id])
+        })
+
+    result = {
+        "assignments": assignments,
+        "clusters": clusters_output,
+        "cluster_density": cluster_density_map,
+        "cluster_radius": cluster_radius_map
+    }
+    _lap(timings, "output", started)
+    return result, centroids, radius, seeds
+
+
+def load_constituency_centres():
+    """{name: (lat, lng)} from the constituency registry ({} if it can't be read)"""
+    try:
+        records = constituency_registry.records()
+    except Exception as e:
+        logger.warning(f"Could not load constituency centres: {str(e)}")
+        return {}
+    return {
+        record.name: (float(record.centre_lat), float(record.centre_long))
+        for record in records
+        if record.get("centre_lat") is not None and record.get("centre_long") is not None
+    }
+
+
+def _shard(seniors, volunteers, centres):
+    """
+    Group seniors by constituency_name, and each volunteer with the shard whose
+    centre (the constituency table's, else the mean of its seniors) is nearest.
+    Returns shard names in order, and per shard its seniors and volunteers.
+    """
+    by_name = {}
+    for senior in seniors:
+        by_name.setdefault(senior.get("constituency_name") or "", []).append(senior)
+    names = sorted(by_name)
+    shard_centres = np.array([
+        centres[name] if name in centres else coords_array(by_name[name]).mean(axis=0)
+        for name in names
+    ])
+    shard_volunteers = [[] for _ in names]
+    located = [vol for vol in volunteers if vol.get('coords')]
+    if located:
+        _, nearest = cKDTree(unit_vectors(shard_centres)).query(unit_vectors(coords_array(located)))
+        for vol, shard in zip(located, np.atleast_1d(nearest)):
+            shard_volunteers[int(shard)].append(vol)
+    return names, [by_name[name] for name in names], shard_volunteers
+
+
+def _shard_seeds(seed, seniors_by_shard):
+    """
+    Split persisted centroids between shards as warm-start seeds. Each goes to
+    the shard holding most of the seniors nearest to it (its nearest senior's
+    shard if no senior is). Returns per shard (centroids, their ids), or None
+    where a shard gets no seed.
+    """
+    if seed is None:
+        return [None] * len(seniors_by_shard)
+    n_shards = len(seniors_by_shard)
+    coords = unit_vectors(np.vstack([coords_array(s) for s in seniors_by_shard]))
+    owner = np.repeat(np.arange(n_shards), [len(s) for s in seniors_by_shard])
+    _, nearest_seed = cKDTree(unit_vectors(seed)).query(coords)
+    votes = np.bincount(nearest_seed * n_shards + owner, minlength=len(seed) * n_shards).reshape(len(seed), n_shards)
+    _, nearest_senior = cKDTree(coords).query(unit_vectors(seed))
+    owner_of_seed = np.where(votes.any(axis=1), votes.argmax(axis=1), owner[np.atleast_1d(nearest_senior)])
+    return [(seed[owner_of_seed == i], np.flatnonzero(owner_of_seed == i)) if (owner_of_seed == i).any() else None
+            for i in range(n_shards)]
+
+
+def _allocate_shard(args):
+    """
+    allocate() for one shard. Returns the response without the senior lists,
+    plus the shard's labels, so the caller can regroup its own senior dicts
+    (a worker process only has copies) and less is sent back from the pool.
+    """
+    seniors, volunteers, options, seed = args
+    # Shards never read cluster_seeds themselves; their seed comes from the caller
+    options = {**options, "incremental": seed is not None}
+    result, centroids, radius, seeds = allocate(seniors, volunteers, options, seed=None if seed is None else seed[0])
+    labels = np.array([senior["cluster"] for senior in seniors], dtype=np.int64)
+    clusters = [{key: value for key, value in cluster.items() if key != "seniors"} for cluster in result["clusters"]]
+    return {**result, "clusters": clusters}, centroids, radius, labels, seeds
+
+
+def _global_ids(shapes, seeds):
+    """
+    Global cluster ids per shard from its (fitted, total) cluster counts, 0..K-1
+    overall. Every shard's fitted clusters come first, 0..P-1, so together they
+    persist as the seed; a warm-started shard's keep their persisted ids, the
+    rest take fresh ones, and any id left at P or above is moved into a gap left
+    by a dropped one. Clusters added by splitting are numbered from P.
+    """
+    fresh = sum(len(seed[1]) for seed in seeds if seed is not None)
+    fitted_ids = []
+    for (fitted, _), seed in zip(shapes, seeds):
+        kept = [] if seed is None else list(seed[1][:fitted])
+        fitted_ids.append(kept + list(range(fresh, fresh + fitted - len(kept))))
+        fresh += fitted - len(kept)
+    n_fitted = sum(fitted for fitted, _ in shapes)
+    used = np.array([i for shard_ids in fitted_ids for i in shard_ids], dtype=np.int64)
+    gaps = np.setdiff1d(np.arange(n_fitted), used)
+    overflow = np.sort(used[used >= n_fitted])
+    remap = dict(zip(overflow.tolist(), gaps.tolist()))
+    ids = []
+    split_id = n_fitted
+    for (fitted, total), shard_ids in zip(shapes, fitted_ids):
+        ids.append(np.array([remap.get(i, i) for i in shard_ids] + list(range(split_id, split_id + total - fitted)),
+                            dtype=np.int64))
+        split_id += total - fitted
+    return ids
+
+
+def allocate_by_constituency(seniors, volunteers, options, workers=None, seed=None):
+    """
+    allocate() run separately per constituency across a process pool.
+
+    Seniors are sharded by constituency_name and volunteers go to the nearest
+    shard, so no volunteer is matched across constituency lines. Persisted
+    centroids (or the given seed) are loaded once and split between shards as
+    warm-start seeds, and keep their ids; the merged response numbers clusters
+    0..K-1 across all shards, fitted ones first. Returns (response, centroids,
+    radius_km, seeds) as allocate() does.
+    """
+    names, seniors_by_shard, volunteers_by_shard = _shard(seniors, volunteers, load_constituency_centres())
+    if not options.get("incremental", True):
+        seed = None
+    elif seed is None:
+        try:
+            seed = load_centroids()
+        except Exception as e:
+            logger.warning(f"Could not load persisted centroids, running full fits: {str(e)}")
+    jobs = list(zip(seniors_by_shard, volunteers_by_shard, [options] * len(names),
+                    _shard_seeds(seed, seniors_by_shard)))
+
+    workers = min(workers or os.cpu_count() or 1, len(jobs))
+    pooled = [i for i, job in enumerate(jobs) if len(job[0]) >= MIN_SHARD_FOR_POOL] if workers > 1 else []
+    results = [None] * len(jobs)
+    if pooled:
+        with ProcessPoolExecutor(max_workers=min(workers, len(pooled))) as pool:
+            futures = {i: pool.submit(_allocate_shard, jobs[i]) for i in pooled}
+            for i, job in enumerate(jobs):
+                if i not in futures:
+                    results[i] = _allocate_shard(job)
+            for i, future in futures.items():
+                results[i] = future.result()
+    else:
+        results = [_allocate_shard(job) for job in jobs]
+    logger.info(f"Allocated {len(seniors)} seniors in {len(jobs)} constituency shards "
+                f"({len(pooled)} on {min(workers, max(1, len(pooled)))} workers)")
+
+    shard_ids = _global_ids([(len(r[4]), len(r[0]["clusters"])) for r in results], [job[3] for job in jobs])
+    total = sum(len(ids) for ids in shard_ids)
+    merged = {"assignments": [], "clusters": [None] * total, "cluster_density": {}, "cluster_radius": {}}
+    centroids = np.zeros((total, 2))
+    radius = np.zeros(total)
+    seeds = np.zeros((sum(len(r[4]) for r in results), 2))
+    for name, shard_seniors, (result, shard_centroids, shard_radius, labels, shard_seeds), ids in zip(
+            names, seniors_by_shard, results, shard_ids):
+        for assignment in result["assignments"]:
+            merged["assignments"].append({**assignment, "cluster": int(ids[assignment["cluster"]])})
+        members = [[] for _ in ids]
+        for senior, label in zip(shard_seniors, labels.tolist()):
+            senior["cluster"] = int(ids[label])
+            members[label].append(senior)
+        for cluster in result["clusters"]:
+            cluster_id = int(ids[cluster["id"]])
+            merged["clusters"][cluster_id] = {**cluster, "id": cluster_id, "seniors": members[cluster["id"]],
+                                              "constituency": name}
+        for key in ("cluster_density", "cluster_radius"):
+            merged[key].update({int(ids[local]): value for local, value in result[key].items()})
+        centroids[ids] = shard_centroids
+        radius[ids] = shard_radius
+        seeds[ids[:len(shard_seeds)]] = shard_seeds
+    return merged, centroids, radius, seeds
+
+
+allocation_cache = (PersistentLRUCache(ALLOCATION_CACHE_DIR, maxsize=ALLOCATION_CACHE_SIZE, ttl=ALLOCATION_CACHE_TTL)
+                    if ALLOCATION_CACHE_DIR else
+                    LRUCache(maxsize=ALLOCATION_CACHE_SIZE, ttl=ALLOCATION_CACHE_TTL))
+
+
+def allocation_key(seniors, volunteers, options):
+    """
+    sha256 over the request inputs allocate() reads, in request order: each
+    senior's uid, coords, constituency and wellbeing, each volunteer's vid,
+    coords, skill and prefers_outside, and the ALLOCATION_OPTIONS. Other senior
+    fields only ride along in the response, so requests differing in those share
+    an entry. The warm-start seed is left out: it is persisted state, and each
+    computed result replaces it.
+    """
+    def coords(item):
+        c = item.get("coords") or {}
+        return [c.get("lat"), c.get("lng")]
+
+    canonical = {
+        "seniors": [[s.get("uid"), coords(s), s.get("constituency_name"), s.get("overall_wellbeing")] for s in seniors],
+        "volunteers": [[v.get("vid"), coords(v), v.get("skill"), bool(v.get("prefers_outside", False))]
+                       for v in volunteers],
+        "options": {name: options.get(name) for name in ALLOCATION_OPTIONS},
+    }
+    payload = json.dumps(canonical, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def compact_result(result, seniors, centroids, radius):
+    """Cache entry for an allocation: the response minus senior dicts, plus each senior's label"""
+    return {
+        **result,
+        "clusters": [{key: value for key, value in c.items() if key != "seniors"} for c in result["clusters"]],
+        "labels": np.array([senior["cluster"] for senior in seniors], dtype=np.int64),
+        "centroids": centroids,
+        "radius": radius,
+    }
+
+
+def expand_result(entry, seniors):
+    """(response, centroids, radius) from a cache entry, with the request's own senior dicts regrouped"""
+    members = [[] for _ in entry["clusters"]]
+    for senior, label in zip(seniors, entry["labels"].tolist()):
+        senior["cluster"] = label
+        members[label].append(senior)
+    result = {key: value for key, value in entry.items() if key not in ("labels", "centroids", "radius")}
+    result["clusters"] = [{**c, "seniors": members[i]} for i, c in enumerate(entry["clusters"])]
+    return result, entry["centroids"], entry["radius"]
+
+
+def compact_response(result, seniors, centroids, radius):
+    """
+    Columnar form of an allocation: senior uids with their cluster labels and
+    one array per cluster field, instead of every senior dict nested in its
+    cluster. Cluster i is row i of every per-cluster array.
+    """
+    clusters = result["clusters"]
+    response = {
+        "format": "compact",
+        "uids": [senior.get("uid") for senior in seniors],
+        "labels": np.array([senior["cluster"] for senior in seniors], dtype=np.int64),
+        "centroids": np.ascontiguousarray(centroids, dtype=np.float64),
+        "radius": np.ascontiguousarray(radius, dtype=np.float64),
+        "density": np.array([result["cluster_density"][c["id"]] for c in clusters], dtype=np.float64),
+        "capacity": np.array([c["capacity"] for c in clusters], dtype=np.int64),
+        "volunteer_count": np.array([c["volunteer_count"] for c in clusters], dtype=np.int64),
+        "assignments": {
+            "volunteers": [a["volunteer"] for a in result["assignments"]],
+            "clusters": np.array([a["cluster"] for a in result["assignments"]], dtype=np.int64),
+            "weighted_distance": np.array([a["weighted_distance"] for a in result["assignments"]], dtype=np.float64),
+        },
+    }
+    if clusters and "constituency" in clusters[0]:
+        response["constituency"] = [c["constituency"] for c in clusters]
+    return response
@@ -1,14 +1,116 @@
-import os
-import joblib
-import pandas as pd
+import json
+import hashlib
+
 from config.settings import supabase, logger
+from services.model_registry import risk_model_registry
+from services.spatial_index import senior_index
+from services.registry import senior_registry
+from seniorModel.encoding import FEATURES
+
+# Rows per bulk upsert; keeps request bodies well under PostgREST limits
+WRITE_CHUNK_SIZE = 500
+
+# Above this batch size sklearn's compiled tree walk beats the NumPy flat forest
+# (see benchmarks/forest_inference.py); below it the flat forest avoids sklearn's per-call overhead
+FLAT_FOREST_MAX_ROWS = 500
+
+# Added by supabase/migrations/20261016000000_senior_feature_fingerprint.sql
+FINGERPRINT_COLUMNS = ("feature_fingerprint", "model_version")
+# Postgres function (supabase/migrations) writing a chunk of scores as one update
+SCORES_RPC = "update_senior_scores"
+# Flipped off the first time the function or the fingerprint columns turn out to be missing
+_store_fingerprints = True
+
+# uids per in_() filter when scores are written without the function; keeps the query string short
+UID_FILTER_CHUNK = 100
+
+def feature_fingerprint(senior: dict) -> str:
+    """Stable short hash of the eight model features of a senior row"""
+    payload = json.dumps([senior.get(f) for f in FEATURES], separators=(',', ':'), default=str)
+    return hashlib.blake2b(payload.encode(), digest_size=8).hexdigest()
+
+def _missing_columns(error):
+    """Whether PostgREST rejected the write because the fingerprint columns haven't been added"""
+    text = str(error)
+    return ("PGRST204" in text or "42703" in text
+            or any(f"'{column}' column" in text for column in FINGERPRINT_COLUMNS))
+
+def _missing_function(error):
+    """Whether PostgREST rejected the RPC because the function isn't deployed"""
+    text = str(error)
+    return "PGRST202" in text or "Could not find the function" in text
+
+def _disable_fingerprints():
+    global _store_fingerprints
+    _store_fingerprints = False
+    logger.warning(f"{SCORES_RPC} or the feature_fingerprint/model_version columns are missing "
+                   "(see supabase/migrations); writing changed scores only, so every senior is rescored")
+
+def update_clearing_fingerprint(uid, values):
+    """
+    update() a senior with `values` and a cleared feature_fingerprint, so the next
+    /assess rescores it; just `values` while the table lacks the column
+    """
+    if _store_fingerprints:
+        try:
+            return supabase.table("seniors").update({**values, "feature_fingerprint": None}).eq("uid", uid).execute()
+        except Exception as e:
+            if not _missing_columns(e):
+                raise
+            _disable_fingerprints()
+    return supabase.table("seniors").update(values).eq("uid", uid).execute()
 
-def classify_seniors(data: dict):
+def _update_scores(scored, model_version):
+    """
+    Write (senior, new wellbeing, fingerprint) scores onto existing seniors; never
+    inserts. Uses update_senior_scores, which stores the fingerprints too; without
+    it only changed wellbeings are written, one update per value. Returns the
+    rows written.
+    """
+    if _store_fingerprints:
+        # Only the scored columns, so edits made to other columns while scoring ran aren't overwritten
+        rows = [{"uid": senior["uid"], "overall_wellbeing": new_value,
+                 "feature_fingerprint": fingerprint, "model_version": model_version}
+                for senior, new_value, fingerprint in scored]
+        try:
+            response = supabase.rpc(SCORES_RPC, {"p_rows": rows}).execute()
+            updated = {row["uid"] for row in response.data or []}
+            return [row for row in rows if str(row["uid"]) in updated]
+        except Exception as e:
+            if not (_missing_function(e) or _missing_columns(e)):
+                raise
+            _disable_fingerprints()
+
+    uids_by_value = {}
+    for senior, new_value, _ in scored:
+        if senior.get("overall_wellbeing") != new_value:
+            uids_by_value.setdefault(new_value, []).append(senior["uid"])
+    written = []
+    for new_value, uids in uids_by_value.items():
+        for start in range(0, len(uids), UID_FILTER_CHUNK):
+            response = (supabase.table("seniors").update({"overall_wellbeing": new_value})
+                        .in_("uid", uids[start:start + UID_FILTER_CHUNK]).execute())
+            written += [{"uid": row["uid"], "overall_wellbeing": new_value} for row in response.data or []]
+    return written
+
+def classify_seniors(data: dict, stats: dict = None):
+    """
+    Re-predict overall_wellbeing for the given senior rows and write back changes.
+
+    Each row's feature fingerprint and the model version are persisted next to
+    the prediction (seniors.feature_fingerprint / seniors.model_version); rows
+    whose fingerprint and model version both still match are skipped (none are
+    while the table lacks those columns). Scores only ever update existing rows.
+    If `stats` is given it is filled with the number of rows rescored, skipped,
+    written and failed (chunks whose write raised).
+    """
     try:
-        # Load the model
-        current_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-        model_data = joblib.load(os.path.join(current_dir, 'seniorModel', 'training', 'senior_risk_model.pkl'))
-        model = model_data["model"]
+        # Model is loaded once per process and reloaded only when the artifact changes
+        model_data = risk_model_registry.get()
+        forest = model_data["forest"]
+        model = model_data.get("model")
+        encoder = model_data["encoder"]
+        model_version = risk_model_registry.version
 
         # Get seniors data and prepare features
         seniors = data.get("seniors", [])
@@ -16,52 +118,66 @@ def classify_seniors(data: dict):
         if not seniors:
             return {}
 
-        # Create DataFrame with required features
-        df = pd.DataFrame(seniors)
-        features = ['age', 'physical', 'mental', 'dl_intervention', 'rece_gov_sup', 
-                   'community', 'making_ends_meet', 'living_situation']
-        X = df[features]
+        # Only rescore rows whose features or model changed since their last prediction
+        to_score = []
+        fingerprints = []
+        for senior in seniors:
+            fingerprint = feature_fingerprint(senior)
+            if (senior.get("feature_fingerprint") == fingerprint
+                    and senior.get("model_version") == model_version
+                    and senior.get("overall_wellbeing") is not None):
+                continue
+            to_score.append(senior)
+            fingerprints.append(fingerprint)
+
+        if stats is not None:
+            stats.update({"rescored": len(to_score), "skipped": len(seniors) - len(to_score),
+                          "written": 0, "failed": 0})
+
+        if not to_score:
+            logger.info(f"All {len(seniors)} seniors up to date for model {model_version}, nothing to rescore")
+            return {}
+
+        # Encode straight from the row dicts into the model's float32 matrix
+        X = encoder.transform(to_score)
+
+        # Get predictions; both paths give identical output
+        if model is not None and len(X) > FLAT_FOREST_MAX_ROWS:
+            predictions = model.predict(X)
+        else:
+            predictions = forest.predict(X)
 
-        # Get predictions
-        predictions = model.predict(X)
+        # With fingerprints stored, rescored rows are written even when the wellbeing is
+        # unchanged so the new fingerprint is persisted; the changes dict is diffed against
+        # the rows we were given
+        scored = [(senior, int(prediction), fingerprint)
+                  for senior, prediction, fingerprint in zip(to_score, predictions, fingerprints)]
 
         changes = {}
-        # Update wellbeing scores in database
-        for i, senior in enumerate(seniors):
+        # Write the rescored rows in chunked bulk updates
+        for start in range(0, len(scored), WRITE_CHUNK_SIZE):
+            chunk = scored[start:start + WRITE_CHUNK_SIZE]
             try:
-                # get old wellbeing
-                old_row = supabase.table("seniors") \
-                    .select("overall_wellbeing") \
-                    .eq("uid", senior["uid"]) \
-                    .single() \
-                    .execute()
-                if (old_row.data is None) or (len(old_row.data) == 0):
-                    old_value = None
-                else:
-                    old_value = old_row.data["overall_wellbeing"]
-
-                (supabase.table("seniors")
-                .update({"overall_wellbeing": int(predictions[i])})
-                .eq("uid", senior['uid'])
-                .execute())
-
-                new_row = supabase.table("seniors") \
-                  .select("name, uid, overall_wellbeing") \
-                  .eq("uid", senior['uid']) \
-                  .single() \
-                  .execute()
-                new_value = new_row.data["overall_wellbeing"]
-                name = new_row.data["name"]
-
-                if old_value != new_value:
-                    changes[name] = [old_value, new_value, new_row.data["uid"]]
-
+                rows = _update_scores(chunk, model_version)
             except Exception as e:
-                logger.error(f"Failed to update wellbeing for senior {senior['uid']}: {str(e)}")
+                logger.error(f"Failed to update wellbeing for {len(chunk)} seniors: {str(e)}")
+                if stats is not None:
+                    stats["failed"] += len(chunk)
+                continue
+            senior_index.upsert(rows)
+            senior_registry.upsert(rows)
+
+            if stats is not None:
+                stats["written"] += len(rows)
+            written = {str(row["uid"]) for row in rows}
+            for senior, new_value, _ in chunk:
+                if senior.get("overall_wellbeing") != new_value and str(senior["uid"]) in written:
+                    changes[senior["name"]] = [senior.get("overall_wellbeing"), new_value, senior["uid"]]
 
-        logger.info(f"Wellbeing updates completed. Total changes: {len(changes)}")
+        logger.info(f"Wellbeing updates completed. Rescored: {len(to_score)}, "
+                    f"skipped: {len(seniors) - len(to_score)}, total changes: {len(changes)}")
         return changes
 
     except Exception as e:
         logger.error(f"Error in classify_seniors: {str(e)}", exc_info=True)
-        return {}
\ No newline at end of file
+        return {}
@@ -0,0 +1,198 @@
+import threading
+import time
+
+import numpy as np
+
+from config.settings import supabase, logger
+from services.spatial_index import INDEX_MAX_AGE_SECONDS
+
+BUCKET_MINUTES = 15
+BUCKETS_PER_DAY = 24 * 60 // BUCKET_MINUTES
+# One volunteer-day packed into this many bytes, a bit per bucket
+DAY_BYTES = BUCKETS_PER_DAY // 8
+
+
+def clock_seconds(clock):
+    """Seconds since midnight of an "HH:MM[:SS]" time column"""
+    parts = [int(float(p)) for p in str(clock).split(":")[:3]]
+    parts += [0] * (3 - len(parts))
+    return parts[0] * 3600 + parts[1] * 60 + parts[2]
+
+
+def _bucket_range(start, end, inner):
+    """Buckets of [start, end) seconds: only those it fully covers (inner) or every one it touches"""
+    size = BUCKET_MINUTES * 60
+    if end <= start:
+        end = 24 * 3600  # an end at or before the start runs to midnight
+    first = -(-start // size) if inner else start // size
+    last = end // size if inner else -(-end // size)
+    return max(0, first), min(BUCKETS_PER_DAY, last)
+
+
+def window_bits(windows):
+    """
+    Packed bitset of a day's availability windows ((start, end) clock strings).
+    A bucket is set only if some window covers all of it, so "free" answers never overstate.
+    """
+    buckets = np.zeros(BUCKETS_PER_DAY, dtype=bool)
+    for start, end in windows:
+        first, last = _bucket_range(clock_seconds(start), clock_seconds(end), inner=True)
+        buckets[first:last] = True
+    return np.packbits(buckets)
+
+
+def interval_mask(start, end):
+    """Packed bitset of every bucket the interval (clock strings) touches"""
+    buckets = np.zeros(BUCKETS_PER_DAY, dtype=bool)
+    first, last = _bucket_range(clock_seconds(start), clock_seconds(end), inner=False)
+    buckets[first:last] = True
+    return np.packbits(buckets)
+
+
+class AvailabilityIndex:
+    """
+    The availabilities table as one DAY_BYTES bitset per volunteer-day, for interval queries.
+
+    Loaded on first use and reloaded after INDEX_MAX_AGE_SECONDS, like the spatial
+    indexes. upload_slots replaces the volunteer-days it rewrote with set_day(); new
+    volunteer-days are appended to the arrays, which grow by doubling. Queries AND
+    (free throughout) or OR (overlap) a packed interval mask against every row of a
+    day at once. `generation` changes whenever the index is rebuilt or invalidated;
+    subscribers see every set_day in between.
+    """
+
+    def __init__(self, table="availabilities"):
+        self.table = table
+        self._lock = threading.RLock()
+        self._pos = None
+        self._loaded_at = 0.0
+        self._listeners = []
+        self.generation = 0
+        self.updates = 0
+
+    # -- building --
+
+    def reset(self, rows):
+        """Replace the index with availability rows (volunteer_email, date, start_t, end_t)"""
+        windows = {}
+        for row in rows:
+            if row.get("volunteer_email") and row.get("date") and row.get("start_t") and row.get("end_t"):
+                windows.setdefault((row["volunteer_email"], str(row["date"])[:10]), []).append(
+                    (row["start_t"], row["end_t"]))
+        with self._lock:
+            n = len(windows)
+            self._pos = {}
+            self._emails = []
+            self._days = np.empty(max(n, 16), dtype="datetime64[D]")
+            self._bits = np.zeros((max(n, 16), DAY_BYTES), dtype=np.uint8)
+            self._size = 0
+            for (email, day), day_windows in windows.items():
+                self._append(email, day, window_bits(day_windows))
+            self._loaded_at = time.monotonic()
+            self.generation += 1
+
+    def _append(self, email, day, bits):
+        if self._size == len(self._bits):
+            grow = len(self._bits)
+            self._bits = np.concatenate([self._bits, np.zeros((grow, DAY_BYTES), dtype=np.uint8)])
+            self._days = np.concatenate([self._days, np.empty(grow, dtype="datetime64[D]")])
+        i = self._size
+        self._pos[(email, day)] = i
+        self._emails.append(email)
+        self._days[i] = np.datetime64(day, "D")
+        self._bits[i] = bits
+        self._size += 1
+
+    def _ensure_fresh(self):
+        if self._pos is None or time.monotonic() - self._loaded_at > INDEX_MAX_AGE_SECONDS:
+            response = supabase.table(self.table).select("volunteer_email, date, start_t, end_t").execute()
+            self.reset(response.data or [])
+            logger.info(f"Indexed {self._size} volunteer-days of {self.table}")
+
+    def invalidate(self):
+        """Force a reload from the table on the next query"""
+        with self._lock:
+            self._pos = None
+            self.generation += 1
+
+    def subscribe(self, listener):
+        """
+        Call listener(email, day, old bits, new bits) after every set_day, with the
+        index lock held and `updates` already counting it; listeners must not block
+        """
+        with self._lock:
+            self._listeners.append(listener)
+
+    def set_day(self, email, day, windows):
+        """Replace a volunteer's availability on `day` (YYYY-MM-DD) with windows ((start, end) clock strings)"""
+        with self._lock:
+            if self._pos is None:
+                return
+            bits = window_bits(windows)
+            i = self._pos.get((email, day))
+            if i is None:
+                old = np.zeros(DAY_BYTES, dtype=np.uint8)
+                self._append(email, day, bits)
+            else:
+                old = self._bits[i].copy()
+                self._bits[i] = bits
+            self.updates += 1
+            for listener in self._listeners:
+                listener(email, day, old, bits)
+
+    def snapshot(self):
+        """
+        (emails, days, bits) of every volunteer-day, as copies, and the generation
+        and update count they reflect
+        """
+        with self._lock:
+            self._ensure_fresh()
+            return (list(self._emails), self._days[:self._size].copy(), self._bits[:self._size].copy(),
+                    self.generation, self.updates)
+
+    # -- queries --
+
+    def _day_rows(self, day, emails=None):
+        """Row positions for `day`, all of them or those of the given emails"""
+        self._ensure_fresh()
+        if emails is None:
+            return np.flatnonzero(self._days[:self._size] == np.datetime64(day, "D"))
+        rows = [self._pos.get((email, day)) for email in emails]
+        return np.array([i for i in rows if i is not None], dtype=np.intp)
+
+    def free(self, day, start, end, emails=None):
+        """Emails of volunteers available for the whole of [start, end) on day (optionally among `emails`)"""
+        with self._lock:
+            rows = self._day_rows(day, emails)
+            mask = interval_mask(start, end)
+            hit = ((self._bits[rows] & mask) == mask).all(axis=1)
+            return [self._emails[i] for i in rows[hit].tolist()]
+
+    def overlap(self, day, start, end, emails=None):
+        """{email: minutes available within [start, end)} for volunteers available for any of it"""
+        with self._lock:
+            rows = self._day_rows(day, emails)
+            buckets = np.unpackbits(self._bits[rows] & interval_mask(start, end), axis=1).sum(axis=1)
+            return {self._emails[i]: int(b) * BUCKET_MINUTES
+                    for i, b in zip(rows.tolist(), buckets.tolist()) if b}
+
+    def coverage(self, day, emails=None):
+        """Volunteers available in each BUCKET_MINUTES bucket of day, as a BUCKETS_PER_DAY int array"""
+        with self._lock:
+            rows = self._day_rows(day, emails)
+            return np.unpackbits(self._bits[rows], axis=1).sum(axis=0, dtype=np.int64)
+
+    def stats(self):
+        with self._lock:
+            loaded = self._pos is not None
+            return {
+                "table": self.table,
+                "loaded": loaded,
+                "volunteer_days": self._size if loaded else 0,
+                "bytes": int(self._bits.nbytes + self._days.nbytes) if loaded else 0,
+                "age_seconds": round(time.monotonic() - self._loaded_at, 1) if loaded else None,
+                "updates": self.updates,
+            }
+
+
+availability_index = AvailabilityIndex()
@@ -0,0 +1,101 @@
+from collections import Counter
+
+from config.settings import supabase, logger
+from services.availability_index import clock_seconds
+from services.spatial_index import INDEX_MAX_AGE_SECONDS
+from utils.cache import LRUCache
+
+# Postgres function (supabase/migrations) applying a diff in one transaction
+REPLACE_RPC = "replace_availabilities"
+# Flipped off the first time the function turns out not to be deployed
+_rpc_available = True
+
+SLOTS_CACHE_SIZE = 5000
+SLOTS_CACHE_TTL = INDEX_MAX_AGE_SECONDS
+# Rendered /get_slots bodies keyed on the ETag, a hash of the stored rows they were
+# rendered from, so an entry is never stale: changed rows hash to a new key
+slots_cache = LRUCache(maxsize=SLOTS_CACHE_SIZE, ttl=SLOTS_CACHE_TTL)
+
+
+def _slot_key(date_str, start, end):
+    """A slot's identity for diffing; times compare as seconds so "11:00" matches "11:00:00" """
+    return str(date_str)[:10], clock_seconds(start), clock_seconds(end)
+
+
+def diff_slots(existing, wanted):
+    """
+    (ids of existing rows to delete, wanted rows to insert) turning `existing`
+    availabilities rows into `wanted` ones ({"date", "start_t", "end_t"}).
+    Rows present in both are left alone; duplicates are matched one for one.
+    """
+    keep = Counter(_slot_key(r["date"], r["start_t"], r["end_t"]) for r in wanted)
+    delete_ids = []
+    for row in existing:
+        key = _slot_key(row["date"], row["start_t"], row["end_t"])
+        if keep[key] > 0:
+            keep[key] -= 1
+        else:
+            delete_ids.append(row["id"])
+    inserts = []
+    for row in wanted:
+        key = _slot_key(row["date"], row["start_t"], row["end_t"])
+        if keep[key] > 0:
+            keep[key] -= 1
+            inserts.append(row)
+    return delete_ids, inserts
+
+
+def _missing_function(error):
+    """Whether PostgREST rejected the RPC because the function isn't deployed"""
+    text = str(error)
+    return "PGRST202" in text or "Could not find the function" in text
+
+
+def _apply_bulk(email, delete_ids, inserts, deleted_rows):
+    """One bulk delete and one bulk insert; the deleted rows are put back if the insert fails"""
+    if delete_ids:
+        supabase.table("availabilities").delete().eq("volunteer_email", email).in_("id", delete_ids).execute()
+    try:
+        if inserts:
+            supabase.table("availabilities").insert(inserts).execute()
+    except Exception:
+        if deleted_rows:
+            restore = [{"volunteer_email": email, "date": row["date"], "start_t": row["start_t"],
+                        "end_t": row["end_t"]} for row in deleted_rows]
+            supabase.table("availabilities").insert(restore).execute()
+        raise
+
+
+def replace_slots(email, dates, slots):
+    """
+    Make the volunteer's availabilities on `dates` exactly `slots` ({"date", "start_t", "end_t"}).
+
+    Reads the existing rows once, diffs them against the slots and applies only
+    the changes: through the replace_availabilities function in one transaction,
+    or, where it isn't deployed, one bulk delete plus one bulk insert. The number
+    of round trips stays the same however many slots are submitted.
+    Returns {"deleted", "inserted", "unchanged"}.
+    """
+    global _rpc_available
+    existing = (supabase.table("availabilities").select("id, date, start_t, end_t")
+                .eq("volunteer_email", email).in_("date", sorted(dates)).execute()).data or []
+    wanted = [{"volunteer_email": email, "date": s["date"], "start_t": s["start_t"], "end_t": s["end_t"]}
+              for s in slots]
+    delete_ids, inserts = diff_slots(existing, wanted)
+    counts = {"deleted": len(delete_ids), "inserted": len(inserts), "unchanged": len(existing) - len(delete_ids)}
+    if not delete_ids and not inserts:
+        return counts
+
+    if _rpc_available:
+        try:
+            supabase.rpc(REPLACE_RPC, {"p_email": email, "p_delete_ids": delete_ids, "p_rows": inserts}).execute()
+            return counts
+        except Exception as e:
+            if not _missing_function(e):
+                raise
+            _rpc_available = False
+            logger.warning(f"{REPLACE_RPC} is not deployed, replacing availabilities with bulk delete and insert")
+
+    deleted_ids = set(delete_ids)
+    _apply_bulk(email, delete_ids, inserts, [row for row in existing if row["id"] in deleted_ids])
+    return counts
@@ -1,122 +1,295 @@
-# import numpy as np
-# from sklearn.cluster import KMeans
-# from utils.helpers import distance
-
-# def kmeans_clusters(coords_list, n_clusters):
-#     X = np.array([[c['lat'], c['lng']] for c in coords_list])
-#     kmeans = KMeans(n_clusters=n_clusters, 
-#                     n_init=10, 
-#                     random_state=42)
-#     kmeans.fit(X)
-#     return kmeans.labels_, kmeans.cluster_centers_
-
-# def cluster_density(cluster_seniors):
-#     if len(cluster_seniors) < 2:
-#         return 1.0
-#     lats = [s['coords']['lat'] for s in cluster_seniors]
-#     lngs = [s['coords']['lng'] for s in cluster_seniors]
-#     area = max((max(lats)-min(lats)) * (max(lngs)-min(lngs)), 0.001)
-#     return len(cluster_seniors) / area
-
-# def allocate_volunteers(data: dict):
-#     volunteers = data.get("volunteers", [])
-#     seniors = data.get("seniors", [])
-    
-#     if len(seniors) == 0:
-#         return {"assignments": [], "clusters": [], "cluster_density": {}, "seniors": []}
-    
-#     # Calculate optimal number of clusters
-#     target_ratio = 3
-#     recommended_clusters = max(1, len(seniors) // (target_ratio * max(1, len(volunteers))))
-#     min_clusters = max(1, len(seniors) // 6)
-#     max_clusters = len(seniors) // 2
-#     n_clusters = max(min_clusters, min(recommended_clusters, max_clusters))
-    
-#     # K-means clustering
-#     labels, centroids = kmeans_clusters([s['coords'] for s in seniors], n_clusters)
-    
-#     # Assign seniors to clusters
-#     clusters = {i: [] for i in range(n_clusters)}
-#     for idx, senior in enumerate(seniors):
-#         cluster_id = int(labels[idx])
-#         clusters[cluster_id].append(senior)
-#         senior['cluster'] = cluster_id
-    
-#     # Calculate cluster density and radius
-#     cluster_density_map = {}
-#     cluster_radius_map = {}
-#     volunteers_per_cluster = {i: 0 for i in range(n_clusters)}
-    
-#     for cluster_id, cluster_seniors in clusters.items():
-#         density = cluster_density(cluster_seniors)
-#         cluster_density_map[int(cluster_id)] = float(density)
-        
-#         if cluster_seniors:
-#             centroid_coords = {'lat': float(centroids[cluster_id][0]), 'lng': float(centroids[cluster_id][1])}
-#             max_distance = 0
-            
-#             for senior in cluster_seniors:
-#                 dist = distance(senior['coords'], centroid_coords)
-#                 max_distance = max(max_distance, dist)
-            
-#             radius = max(max_distance * 1.1, 0.2)
-#         else:
-#             radius = 0.2
-            
-#         cluster_radius_map[int(cluster_id)] = float(radius)
-    
-#     # Assign volunteers to clusters
-#     assignments = []
-#     for vol in volunteers:
-#         vol_coords = vol.get('coords')
-#         if not vol_coords:
-#             continue
-        
-#         best_cluster = None
-#         min_weighted_dist = float('inf')
-        
-#         for cluster_id, cluster_seniors in clusters.items():
-#             if not cluster_seniors:
-#                 continue
-                
-#             centroid = {'lat': float(centroids[cluster_id][0]), 'lng': float(centroids[cluster_id][1])}
-#             base_dist = distance(vol_coords, centroid)
-            
-#             workload_factor = 1 + (volunteers_per_cluster[cluster_id] / max(1, len(cluster_seniors)))
-#             density_factor = 1 / max(0.1, cluster_density_map[cluster_id])
-            
-#             weighted_dist = base_dist * workload_factor * density_factor
-            
-#             if vol.get('prefers_outside', False):
-#                 weighted_dist *= 0.8
-                
-#             if weighted_dist < min_weighted_dist:
-#                 min_weighted_dist = weighted_dist
-#                 best_cluster = cluster_id
-        
-#         if best_cluster is not None:
-#             volunteers_per_cluster[best_cluster] += 1
-#             assignments.append({
-#                 "volunteer": vol['vid'],
-#                 "cluster": best_cluster,
-#                 "weighted_distance": round(min_weighted_dist, 4)
-#             })
-    
-#     # Format clusters output
-#     clusters_output = []
-#     for cluster_id, cluster_seniors in clusters.items():
-#         clusters_output.append({
-#             "id": cluster_id,
-#             "center": {"lat": float(centroids[cluster_id][0]), "lng": float(centroids[cluster_id][1])},
-#             "radius": cluster_radius_map[cluster_id],
-#             "seniors": cluster_seniors,
-#             "senior_count": len(cluster_seniors),
-#             "volunteer_count": volunteers_per_cluster[cluster_id]
-#         })
-    
-#     return {
-#         "assignments": assignments,
-#         "clusters": clusters_output,
-#         "cluster_density": cluster_density_map,
-#         "cluster_radius": cluster_radius_map
-#     }
\ No newline at end of file
+import numpy as np
+from scipy.spatial import cKDTree
+
+from config.settings import supabase, logger
+from utils.helpers import kmeans_clusters
+from utils.geo import KM_PER_DEG, haversine_pairs_km
+from services.spatial_index import cluster_index
+from services.registry import cluster_registry
+
+# Warm start only while the cluster count is within this fraction of the persisted one;
+# beyond that the old centroids are a poor seed and a full fit is cheaper
+WARM_START_MAX_CHANGE = 0.25
+# ...and while at most this share of the seed centroids is no senior's nearest one;
+# more means the seed was fitted to other seniors (e.g. another district)
+SEED_MAX_UNUSED = 0.25
+
+# Splitting thresholds, as in the scheduler edge function: clusters above MAX_CLUSTER_SIZE
+# seniors are always split; clusters wider than RADIUS_MEDIAN_FACTOR x the median radius
+# (or than an explicit max radius) are split once they have more than MIN_SPLIT_SIZE seniors
+MAX_CLUSTER_SIZE = 8
+RADIUS_MEDIAN_FACTOR = 2.5
+MIN_SPLIT_SIZE = 4
+# 2-means passes when refitting a split cluster
+SPLIT_ITERATIONS = 10
+
+
+def _sq_dist(X, C):
+    return ((X[:, None, :] - C[None, :, :]) ** 2).sum(axis=2)
+
+
+def _nearest(X, C):
+    """Index of and squared distance to the nearest centroid for every point"""
+    if len(X) == 0:
+        return np.empty(0, dtype=np.intp), np.empty(0)
+    dist, labels = cKDTree(C).query(X)
+    return labels.astype(np.intp), dist ** 2
+
+
+def _resize_seed(X, C, n_clusters):
+    """
+    Adapt persisted centroids to a new cluster count, keeping as many ids as possible.
+    Surplus clusters go smallest first, their ids taken over by the last clusters;
+    missing ones are seeded at the points farthest from every existing centroid.
+    """
+    C = [c for c in np.asarray(C, dtype=np.float64)]
+    if len(C) > n_clusters:
+        labels, _ = _nearest(X, np.array(C))
+        counts = list(np.bincount(labels, minlength=len(C)))
+        while len(C) > n_clusters:
+            j = int(np.argmin(counts))
+            C[j], counts[j] = C[-1], counts[-1]
+            C.pop()
+            counts.pop()
+    elif len(C) < n_clusters:
+        _, dist = _nearest(X, np.array(C))
+        while len(C) < n_clusters:
+            far = int(np.argmax(dist))
+            C.append(X[far].copy())
+            dist = np.minimum(dist, _sq_dist(X, X[far][None, :])[:, 0])
+    return np.array(C)
+
+
+def warm_kmeans(X, seed_centroids, n_clusters, max_iter=100, tol=1e-12):
+    """
+    Lloyd iterations started from previous centroids, touching only clusters that move.
+
+    Each pass recomputes member means; only clusters whose mean moved by more than
+    tol get a new centroid, and only distances involving those centroids are
+    recomputed. When few seniors were added or removed, only their clusters (and
+    neighbours that exchange points with them) are updated, and every other
+    cluster keeps its id and centroid. Returns labels, centroids and run stats.
+    """
+    X = np.asarray(X, dtype=np.float64)
+    C = _resize_seed(X, seed_centroids, n_clusters)
+    labels, dist = _nearest(X, C)
+    updated = np.zeros(n_clusters, dtype=bool)
+
+    iterations = 0
+    for iterations in range(1, max_iter + 1):
+        counts = np.bincount(labels, minlength=n_clusters)
+        sums = np.stack([np.bincount(labels, weights=X[:, d], minlength=n_clusters) for d in range(2)], axis=1)
+        populated = counts > 0
+        means = C.copy()
+        means[populated] = sums[populated] / counts[populated, None]
+        moved = np.flatnonzero(((means - C) ** 2).sum(axis=1) > tol)
+        if len(moved) == 0:
+            break
+        C[moved] = means[moved]
+        updated[moved] = True
+
+        # Points of moved clusters may now be nearer any centroid: full search for them only
+        in_moved = np.isin(labels, moved)
+        if in_moved.any():
+            labels[in_moved], dist[in_moved] = _nearest(X[in_moved], C)
+        # Everyone else can only be pulled towards one of the moved centroids
+        rest = np.flatnonzero(~in_moved)
+        if len(rest):
+            near_moved, near_dist = _nearest(X[rest], C[moved])
+            closer = near_dist < dist[rest]
+            labels[rest[closer]] = moved[near_moved[closer]]
+            dist[rest[closer]] = near_dist[closer]
+
+    return labels, C, {"iterations": iterations, "updated_clusters": int(updated.sum())}
+
+
+def _sq_dist_rows(P, Q):
+    d = P - Q
+    return d[:, 0] ** 2 + d[:, 1] ** 2
+
+
+def _segment_argmax(values, starts, seg):
+    """Position of the largest value in each contiguous segment (first one on ties)"""
+    best = np.maximum.reduceat(values, starts)
+    pos = np.where(values == best[seg], np.arange(len(values)), len(values))
+    return np.minimum.reduceat(pos, starts)
+
+
+def _member_radius_km(X, labels, C, members):
+    dist = haversine_pairs_km(X[members], C[labels[members]])
+    radius = np.zeros(len(C))
+    np.maximum.at(radius, labels[members], dist)
+    return radius
+
+
+def split_clusters(X, labels, centroids, max_size=MAX_CLUSTER_SIZE, max_radius_km=None,
+                   radius_factor=RADIUS_MEDIAN_FACTOR):
+    """
+    Recursively split clusters that are too big or too wide.
+
+    A cluster is split when it has more than max_size seniors, or when it has more
+    than MIN_SPLIT_SIZE and its radius exceeds max_radius_km or radius_factor x the
+    median radius of the initial clustering (None disables either threshold). Each
+    split is seeded from the member farthest from the centroid and the member
+    farthest from that one, then refit with a 2-means over that cluster's members
+    only. All clusters over a threshold are split together in one vectorized round,
+    and rounds repeat on the halves until none is, so each round is linear in the
+    seniors being split. The larger half keeps the cluster's id and the other gets
+    the next free one. Clusters whose members all share one location can't be
+    split and are left as they are. Returns labels, centroids and split stats.
+    """
+    X = np.asarray(X, dtype=np.float64)
+    labels = np.asarray(labels, dtype=np.intp).copy()
+    C = np.asarray(centroids, dtype=np.float64).copy()
+    counts = np.bincount(labels, minlength=len(C))
+    radius = _member_radius_km(X, labels, C, np.arange(len(X)))
+
+    limit = np.inf if max_radius_km is None else float(max_radius_km)
+    if radius_factor is not None and (counts > 0).any():
+        limit = min(limit, radius_factor * float(np.median(radius[counts > 0])))
+    max_size = np.inf if max_size is None else max(1, int(max_size))
+
+    stuck = np.zeros(len(C), dtype=bool)
+    splits = rounds = 0
+    while True:
+        over = ((counts > max_size) | ((counts > MIN_SPLIT_SIZE) & (radius > limit))) & ~stuck
+        if not over.any():
+            break
+        rounds += 1
+        # Members of the clusters being split, grouped into one contiguous segment per cluster
+        members = np.flatnonzero(over[labels])
+        members = members[np.argsort(labels[members], kind="stable")]
+        P = X[members]
+        starts = np.flatnonzero(np.diff(labels[members], prepend=-1))
+        groups = labels[members][starts]
+        sizes = np.diff(np.append(starts, len(members)))
+        seg = np.repeat(np.arange(len(groups)), sizes)
+
+        # Seeds: farthest member from the centroid, then farthest member from that one
+        A = P[_segment_argmax(_sq_dist_rows(P, C[labels[members]]), starts, seg)]
+        B = P[_segment_argmax(_sq_dist_rows(P, A[seg]), starts, seg)]
+
+        # 2-means within every segment at once
+        side = None
+        for _ in range(SPLIT_ITERATIONS):
+            new_side = _sq_dist_rows(P, B[seg]) < _sq_dist_rows(P, A[seg])
+            if side is not None and (new_side == side).all():
+                break
+            side = new_side
+            n_b = np.add.reduceat(side.astype(np.float64), starts)
+            sum_b = np.add.reduceat(P * side[:, None], starts)
+            sum_all = np.add.reduceat(P, starts)
+            B = np.where(n_b[:, None] > 0, sum_b / np.maximum(n_b, 1)[:, None], B)
+            A = np.where(n_b[:, None] < sizes[:, None],
+                         (sum_all - sum_b) / np.maximum(sizes - n_b, 1)[:, None], A)
+
+        n_b = np.add.reduceat(side.astype(np.intp), starts)
+        split = (n_b > 0) & (n_b < sizes)
+        stuck[groups[~split]] = True
+        if not split.any():
+            break
+        # The larger half keeps the id, the other takes the next free one
+        side ^= (n_b > sizes - n_b)[seg]
+        new_ids = np.full(len(groups), -1, dtype=np.intp)
+        new_ids[split] = len(C) + np.arange(int(split.sum()))
+        moving = side & split[seg]
+        labels[members[moving]] = new_ids[seg[moving]]
+
+        n_new = int(split.sum())
+        touched = np.concatenate([groups[split], new_ids[split]])
+        C = np.vstack([C, np.zeros((n_new, 2))])
+        radius = np.append(radius, np.zeros(n_new))
+        stuck = np.append(stuck, np.zeros(n_new, dtype=bool))
+        counts = np.bincount(labels, minlength=len(C))
+        for d in range(2):
+            C[touched, d] = np.bincount(labels[members], weights=P[:, d],
+                                        minlength=len(C))[touched] / counts[touched]
+        radius[touched] = _member_radius_km(X, labels, C, members)[touched]
+        splits += n_new
+
+    return labels, C, {"splits": splits, "rounds": rounds, "radius_limit_km": float(limit)}
+
+
+def load_centroids():
+    """Warm-start centroids persisted in the cluster_seeds table, ordered by id (None if there are none)"""
+    response = supabase.table("cluster_seeds").select("id, centroid").order("id").execute()
+    rows = [r for r in response.data or [] if r.get("centroid")]
+    if not rows:
+        return None
+    return np.array([(r["centroid"]["lat"], r["centroid"]["lng"]) for r in rows], dtype=np.float64)
+
+
+def _cluster_rows(centroids, radius_km):
+    """Rows 0..k-1 with the radius in degrees, the unit the clusters table is read in"""
+    return [
+        {"id": i, "centroid": {"lat": float(c[0]), "lng": float(c[1])}, "radius": float(r / KM_PER_DEG)}
+        for i, (c, r) in enumerate(zip(centroids, radius_km))
+    ]
+
+
+def _replace(table, rows):
+    supabase.table(table).upsert(rows, on_conflict="id").execute()
+    supabase.table(table).delete().gte("id", len(rows)).execute()
+
+
+def save_seeds(seeds):
+    """
+    Persist fitted (pre-split) centroids as the next run's warm-start seed
+    (cluster_seeds 0..k-1, higher ids dropped). Leaves the clusters table alone.
+    """
+    _replace("cluster_seeds", [{"id": i, "centroid": {"lat": float(c[0]), "lng": float(c[1])}}
+                               for i, c in enumerate(seeds)])
+
+
+def save_clusters(centroids, radius_km, seeds=None):
+    """
+    Persist a schedule's clusters as clusters 0..k-1 (upsert), drop any higher
+    ids, and keep the centroids they were fitted as (`seeds`, before splitting;
+    the clusters themselves if not given) as the next run's warm-start seed.
+    """
+    rows = _cluster_rows(centroids, radius_km)
+    _replace("clusters", rows)
+    save_seeds(centroids if seeds is None else seeds)
+    cluster_index.reset(rows)
+    cluster_registry.reset(rows)
+
+
+def fit_clusters(X, n_clusters, incremental=True, seed=None):
+    """
+    KMeans labels and centroids for senior coordinates.
+
+    With incremental=True the persisted centroids (or the given seed centroids)
+    seed warm_kmeans, so cluster ids stay stable between runs and a repeat
+    allocation costs a few partial Lloyd passes. Falls back to a full
+    kmeans_clusters fit when nothing is persisted or the seed doesn't fit the
+    points: the cluster count changed too much, over SEED_MAX_UNUSED of the
+    seed is no point's nearest centroid, or the warm start leaves a cluster empty.
+    A full fit is finished with Lloyd passes to a fixed point, so warm-starting
+    unchanged points from its centroids gives back the same clustering.
+    """
+    if not incremental:
+        seed = None
+    elif seed is None:
+        try:
+            seed = load_centroids()
+        except Exception as e:
+            logger.warning(f"Could not load persisted centroids, running a full fit: {str(e)}")
+
+    if seed is not None and abs(len(seed) - n_clusters) <= WARM_START_MAX_CHANGE * n_clusters:
+        unused = 1 - len(np.unique(_nearest(np.asarray(X, dtype=np.float64), np.asarray(seed))[0])) / len(seed)
+        if unused > SEED_MAX_UNUSED:
+            logger.info(f"{unused:.0%} of the {len(seed)} persisted centroids are no senior's nearest, "
+                        f"running a full fit")
+        else:
+            labels, centroids, stats = warm_kmeans(X, seed, n_clusters)
+            empty = int((np.bincount(labels, minlength=n_clusters) == 0).sum())
+            if not empty:
+                logger.info(f"Warm-started {n_clusters} clusters from {len(seed)} persisted centroids: "
+                            f"{stats['updated_clusters']} updated in {stats['iterations']} passes")
+                return labels, centroids
+            logger.info(f"Warm start from {len(seed)} persisted centroids left {empty} clusters empty, "
+                        f"running a full fit")
+
+    labels, centroids = kmeans_clusters(X, n_clusters)
+    labels, centroids, _ = warm_kmeans(X, centroids, n_clusters)
+    return labels, centroids
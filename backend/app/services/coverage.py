@@ -0,0 +1,192 @@
+import threading
+import time
+from collections import deque
+from datetime import date
+
+import numpy as np
+from scipy.spatial import cKDTree
+
+from config.settings import logger
+from services.allocation import load_constituency_centres
+from services.availability_index import availability_index, BUCKETS_PER_DAY
+from services.registry import senior_registry, volunteer_registry
+from services.scheduling import eligible_seniors
+from services.spatial_index import INDEX_MAX_AGE_SECONDS
+from utils.geo import parse_coords, unit_vectors
+
+# set_day deltas held for the next query; past this many it rebuilds instead
+MAX_PENDING = 10000
+
+
+class CoverageGrid:
+    """
+    Volunteers available per (constituency, day, BUCKET_MINUTES bucket), next to the
+    seniors due a visit in each constituency.
+
+    Built from every row of the availability index at once: the bitsets are
+    unpacked and summed per (day, constituency) group into one array. A
+    volunteer belongs to the constituency whose centre is nearest, as in
+    allocate_by_constituency. upload_slots changes reach it through set_day as
+    the difference between a volunteer-day's old and new bits: queued without a
+    lock (set_day holds the index's) and applied, in order, by the next query.
+    Builds read an index snapshot and run outside the index lock. Rebuilt when
+    the availability index is, and after INDEX_MAX_AGE_SECONDS.
+    """
+
+    def __init__(self, index=availability_index):
+        self.index = index
+        self._lock = threading.RLock()
+        self._pending = deque(maxlen=MAX_PENDING)
+        self._counts = None
+        self._built_at = 0.0
+        self._generation = None
+        self._applied = 0
+        self._eligible_on = None
+        self.updates = 0
+        index.subscribe(self._queue)
+
+    # -- building --
+
+    def _constituencies(self):
+        """Constituency names, senior records by constituency and each volunteer email's constituency"""
+        seniors = senior_registry.records()
+        by_name = {}
+        for senior in seniors:
+            if senior.get("constituency_name"):
+                by_name.setdefault(senior.get("constituency_name"), []).append(senior)
+        centres = load_constituency_centres()
+        names = sorted(set(by_name) | set(centres))
+
+        centre_points = []
+        for name in names:
+            if name in centres:
+                centre_points.append(centres[name])
+            else:
+                coords = [c for c in (parse_coords(s.get("coords")) for s in by_name[name]) if c]
+                centre_points.append(np.mean([(c["lat"], c["lng"]) for c in coords], axis=0) if coords
+                                     else (np.nan, np.nan))
+        centre_points = np.array(centre_points, dtype=np.float64).reshape(-1, 2)
+        placed = np.flatnonzero(~np.isnan(centre_points).any(axis=1))
+
+        located = [(v.get("email"), parse_coords(v.get("coords"))) for v in volunteer_registry.records()]
+        located = [(email, c) for email, c in located if email and c]
+        constituency_of = {}
+        if located and len(placed):
+            _, nearest = cKDTree(unit_vectors(centre_points[placed])).query(
+                unit_vectors([(c["lat"], c["lng"]) for _, c in located]))
+            constituency_of = {email: int(placed[i]) for (email, _), i in zip(located, np.atleast_1d(nearest))}
+        return names, by_name, constituency_of
+
+    def _count_eligible(self, today):
+        eligible = eligible_seniors([s for name in self._names for s in self._seniors.get(name, [])], today)
+        index = {name: i for i, name in enumerate(self._names)}
+        self._eligible = np.bincount([index[s.get("constituency_name")] for s in eligible],
+                                     minlength=len(self._names))
+        self._eligible_on = today
+
+    def _build(self, today):
+        emails, days, bits, generation, applied = self.index.snapshot()
+        self._names, self._seniors, self._constituency_of = self._constituencies()
+        constituency = np.array([self._constituency_of.get(email, -1) for email in emails], dtype=np.intp)
+        keep = constituency >= 0
+        unique_days, day_of = np.unique(days[keep], return_inverse=True)
+
+        # Sum the unpacked rows of each (day, constituency) group: sort by group, reduce each run
+        group = day_of * len(self._names) + constituency[keep]
+        order = np.argsort(group, kind="stable")
+        group = group[order]
+        starts = np.flatnonzero(np.r_[True, group[1:] != group[:-1]]) if len(group) else np.empty(0, dtype=np.intp)
+        counts = np.zeros((len(unique_days) * len(self._names), BUCKETS_PER_DAY), dtype=np.int32)
+        if len(starts):
+            counts[group[starts]] = np.add.reduceat(np.unpackbits(bits[keep][order], axis=1), starts,
+                                                    axis=0, dtype=np.int32)
+        counts = counts.reshape(len(unique_days), len(self._names), BUCKETS_PER_DAY)
+        self._counts = {str(day): counts[i] for i, day in enumerate(unique_days)}
+        self._unplaced = int((~keep).sum())
+        self._count_eligible(today)
+        self._generation, self._applied = generation, applied
+        self._built_at = time.monotonic()
+        logger.info(f"Built coverage for {len(self._names)} constituencies over {len(unique_days)} days "
+                    f"({self._unplaced} volunteer-days without a constituency)")
+
+    def _ensure_fresh(self, today):
+        if (self._counts is None or self._generation != self.index.generation
+                or time.monotonic() - self._built_at > INDEX_MAX_AGE_SECONDS or not self._drain()):
+            self._build(today)
+            self._drain()
+        elif self._eligible_on != today:
+            self._count_eligible(today)
+
+    def invalidate(self):
+        with self._lock:
+            self._counts = None
+
+    def _queue(self, email, day, old, new):
+        """set_day listener, called under the index lock: only queue the delta"""
+        self._pending.append((self.index.generation, self.index.updates, email, day, old, new))
+
+    def _drain(self):
+        """
+        Apply queued deltas newer than the counts, moving each volunteer-day's
+        buckets from its old bits to its new ones. False if one was lost (the
+        queue overflowed), so the counts need a rebuild.
+        """
+        while self._pending:
+            generation, update, email, day, old, new = self._pending.popleft()
+            if generation != self._generation or update <= self._applied:
+                continue
+            if update != self._applied + 1:
+                return False
+            self._applied = update
+            c = self._constituency_of.get(email)
+            if c is None:
+                continue
+            counts = self._counts.setdefault(day, np.zeros((len(self._names), BUCKETS_PER_DAY), dtype=np.int32))
+            counts[c] += np.unpackbits(new).astype(np.int32) - np.unpackbits(old)
+            self.updates += 1
+        return True
+
+    # -- queries --
+
+    def coverage(self, days, names=None, today=None):
+        """
+        Per constituency (all, or those in `names`): its eligible seniors, and per day
+        the volunteers available in each bucket ("available") and that divided by
+        the eligible seniors ("per_senior", None where no senior is due).
+        """
+        with self._lock:
+            self._ensure_fresh(today or date.today())
+            wanted = [i for i, name in enumerate(self._names) if names is None or name in names]
+            empty = np.zeros((len(self._names), BUCKETS_PER_DAY), dtype=np.int32)
+            grid = np.stack([self._counts.get(day, empty)[wanted] for day in days], axis=1) if days else \
+                np.zeros((len(wanted), 0, BUCKETS_PER_DAY), dtype=np.int32)
+            eligible = self._eligible[wanted]
+            names = [self._names[i] for i in wanted]
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            per_senior = np.round(grid / eligible[:, None, None], 3)
+        return [
+            {
+                "constituency": name,
+                "eligible_seniors": int(eligible[k]),
+                "available": grid[k].tolist(),
+                "per_senior": per_senior[k].tolist() if eligible[k] else None,
+            }
+            for k, name in enumerate(names)
+        ]
+
+    def stats(self):
+        with self._lock:
+            built = self._counts is not None
+            return {
+                "built": built,
+                "constituencies": len(self._names) if built else 0,
+                "days": len(self._counts) if built else 0,
+                "unplaced_volunteer_days": self._unplaced if built else 0,
+                "age_seconds": round(time.monotonic() - self._built_at, 1) if built else None,
+                "updates": self.updates,
+                "pending": len(self._pending),
+            }
+
+
+coverage_grid = CoverageGrid()
@@ -0,0 +1,115 @@
+import os
+import threading
+
+import joblib
+import numpy as np
+from config.settings import logger
+from services.model_registry import risk_model_registry, EXPLAINER_PATH
+from utils.cache import LRUCache
+
+# Explanations keyed on (model version, top_n, encoded feature vector); a senior's explanation
+# only changes when their features or the model do
+explanation_cache = LRUCache(maxsize=50000)
+
+_explainer_lock = threading.Lock()
+_explainers = {}
+
+
+def _load_explainer(model_data):
+    """Explainer part of the artifact, or a TreeExplainer built from the model if it's missing/stale"""
+    if model_data.get("explainer") is not None:
+        # Artifacts saved before the predictor/explainer split
+        return model_data["explainer"]
+    if os.path.exists(EXPLAINER_PATH):
+        explainer_data = joblib.load(EXPLAINER_PATH)
+        if explainer_data.get("model_id") == model_data.get("model_id"):
+            return explainer_data["explainer"]
+        logger.warning(f"{EXPLAINER_PATH} belongs to a different model, building a new explainer")
+    import shap
+    return shap.TreeExplainer(model_data["model"])
+
+
+def _get_explainer(model_data, model_version):
+    """
+    TreeExplainer for the loaded model. shap (and numba/llvmlite) is only imported
+    here, on the first explanation request for a given model version.
+    """
+    with _explainer_lock:
+        if model_version not in _explainers:
+            _explainers.clear()
+            _explainers[model_version] = _load_explainer(model_data)
+        return _explainers[model_version]
+
+
+def _per_class_shap(shap_values, n_rows, n_features):
+    """Normalise shap output to (rows, features, classes) across shap versions"""
+    if isinstance(shap_values, list):
+        # shap < 0.45 returns one (rows, features) array per class
+        return np.stack(shap_values, axis=-1)
+    return np.asarray(shap_values).reshape(n_rows, n_features, -1)
+
+
+def _factors(names, values, contributions, top_n, reverse):
+    order = np.argsort(contributions)
+    if reverse:
+        order = order[::-1]
+    return [
+        {"feature": names[i], "value": float(values[i]), "shap": round(float(contributions[i]), 4)}
+        for i in order[:top_n]
+        if (contributions[i] > 0 if reverse else contributions[i] < 0)
+    ]
+
+
+def explain_seniors(seniors: list, top_n: int = 3):
+    """
+    Explain the wellbeing prediction of many seniors at once.
+
+    Cache misses are de-duplicated and sent through a single TreeExplainer call.
+    Each result holds the predicted class with its probability and the top_n
+    features pushing towards (pos_factors) and away from (neg_factors) it.
+    """
+    if not seniors:
+        return []
+
+    model_data = risk_model_registry.get()
+    model_version = risk_model_registry.version
+    encoder = model_data["encoder"]
+    forest = model_data["forest"]
+    names = encoder.feature_names
+
+    X = encoder.transform(seniors)
+    keys = [(model_version, top_n, row.tobytes()) for row in X]
+
+    results = [explanation_cache.get(key) for key in keys]
+    computed = {}
+    missing = {}
+    for i, (key, result) in enumerate(zip(keys, results)):
+        if result is None and key not in missing:
+            missing[key] = i
+
+    if missing:
+        rows = list(missing.values())
+        X_missing = X[rows]
+        proba = forest.predict_proba(X_missing)
+        shap_values = _get_explainer(model_data, model_version).shap_values(X_missing)
+        shap_values = _per_class_shap(shap_values, len(rows), len(names))
+
+        for j, (key, row) in enumerate(zip(missing, rows)):
+            class_idx = int(np.argmax(proba[j]))
+            contributions = shap_values[j, :, class_idx]
+            explanation = {
+                "predicted": int(forest.classes[class_idx]),
+                "confidence": round(float(proba[j, class_idx]), 4),
+                "pos_factors": _factors(names, X[row], contributions, top_n, reverse=True),
+                "neg_factors": _factors(names, X[row], contributions, top_n, reverse=False),
+            }
+            explanation_cache.put(key, explanation)
+            computed[key] = explanation
+
+        logger.info(f"Computed {len(rows)} SHAP explanations for model {model_version} "
+                    f"({len(seniors) - len(rows)} reused)")
+
+    return [
+        {"uid": senior.get("uid"), **(result if result is not None else computed[key])}
+        for senior, key, result in zip(seniors, keys, results)
+    ]
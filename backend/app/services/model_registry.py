@@ -0,0 +1,154 @@
+import os
+import time
+import hashlib
+import threading
+from datetime import datetime
+
+import joblib
+from config.settings import logger
+from seniorModel.encoding import FeatureEncoder
+from seniorModel.forest import FlatForest, verify_export
+from seniorModel.artifacts import explainer_path
+
+MODEL_PATH = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    'seniorModel', 'training', 'senior_risk_model.pkl'
+)
+# SHAP explainer part, loaded only by services.explanations on first use
+EXPLAINER_PATH = explainer_path(MODEL_PATH)
+
+
+def _file_digest(path, chunk_size=1 << 20):
+    """sha256 of a file, read in chunks so large artifacts don't need to fit in memory twice"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _rss_bytes():
+    """Current resident set size of this process, or None if it can't be read"""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        pass
+    try:
+        import resource
+        # ru_maxrss is a high-water mark (KiB on Linux, bytes on macOS), good enough as a fallback
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+    except (ImportError, OSError):
+        return None
+
+
+class ModelRegistry:
+    """
+    Loads a joblib artifact once per process and shares it across requests.
+
+    Every get() does a cheap stat() of the file. When mtime or size changed, the
+    file is hashed and only reloaded if the content actually differs, so a plain
+    `touch` doesn't trigger an unpickle. If a reload fails (e.g. the file is still
+    being written) the previously loaded artifact keeps being served.
+    """
+
+    def __init__(self, path, prepare=None):
+        self.path = path
+        # Optional hook run once per (re)load, e.g. to compile helpers stored in the artifact
+        self.prepare = prepare
+        self._lock = threading.Lock()
+        # (signature, digest, model_data) swapped as one tuple so readers never see a mix
+        self._entry = None
+        self._stats = {}
+        self._reloads = 0
+
+    def get(self):
+        """Return the loaded artifact, (re)loading it if the file on disk changed"""
+        signature = self._signature()
+        entry = self._entry
+        if entry is not None and entry[0] == signature:
+            return entry[2]
+
+        with self._lock:
+            signature = self._signature()
+            entry = self._entry
+            if entry is not None and entry[0] == signature:
+                return entry[2]
+
+            digest = _file_digest(self.path)
+            if entry is not None and entry[1] == digest:
+                # File was touched/rewritten with identical content
+                self._entry = (signature, digest, entry[2])
+                return entry[2]
+
+            try:
+                model_data = self._load(digest)
+            except Exception as e:
+                if entry is None:
+                    raise
+                logger.error(f"Failed to reload model from {self.path}, keeping version {entry[1][:12]}: {str(e)}")
+                return entry[2]
+
+            self._entry = (signature, digest, model_data)
+            return model_data
+
+    @property
+    def version(self):
+        """Short content hash of the currently loaded artifact (None before the first load)"""
+        entry = self._entry
+        return entry[1][:12] if entry is not None else None
+
+    def stats(self):
+        """Load time, memory footprint and version of the loaded artifact"""
+        return {
+            "path": self.path,
+            "loaded": self._entry is not None,
+            "version": self.version,
+            "reloads": self._reloads,
+            **self._stats
+        }
+
+    def _signature(self):
+        stat = os.stat(self.path)
+        return (stat.st_mtime_ns, stat.st_size)
+
+    def _load(self, digest):
+        rss_before = _rss_bytes()
+        start = time.perf_counter()
+        model_data = joblib.load(self.path)
+        if self.prepare is not None:
+            model_data = self.prepare(model_data)
+        load_seconds = time.perf_counter() - start
+        rss_after = _rss_bytes()
+
+        if self._entry is not None:
+            self._reloads += 1
+        self._stats = {
+            "loaded_at": datetime.now().isoformat(),
+            "load_seconds": round(load_seconds, 4),
+            "file_bytes": os.path.getsize(self.path),
+            "rss_delta_bytes": (rss_after - rss_before) if rss_before is not None and rss_after is not None else None,
+            "rss_bytes": rss_after,
+        }
+        logger.info(f"Loaded model {digest[:12]} from {self.path} in {load_seconds:.3f}s")
+        return model_data
+
+
+def prepare_risk_model(model_data):
+    """
+    Compile the artifact's feature encoder and flat forest. Older artifacts predate
+    them, so they get the default encoder and an export of the pickled model. The
+    flat forest is checked against the pickled model before it is served.
+    """
+    spec = model_data.get('feature_encoder')
+    model_data['encoder'] = FeatureEncoder.from_dict(spec) if spec else FeatureEncoder(model_data.get('feature_names'))
+    spec = model_data.get('forest')
+    model_data['forest'] = FlatForest.from_dict(spec) if spec else FlatForest.from_sklearn(model_data['model'])
+    if model_data.get('model') is not None:
+        # A load that fails this keeps the previous version (or fails loudly on the first load)
+        verify_export(model_data['forest'], model_data['model'])
+    return model_data
+
+
+# Shared by every request in this worker process
+risk_model_registry = ModelRegistry(MODEL_PATH, prepare=prepare_risk_model)
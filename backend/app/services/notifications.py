@@ -0,0 +1,256 @@
+import queue
+import smtplib
+import ssl
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from email.mime.multipart import MIMEMultipart
+from email.mime.text import MIMEText
+
+from config.settings import logger, SMTP_HOST, SMTP_PORT, SMTP_STARTTLS, SMTP_USER, SMTP_PASSWORD
+from services.registry import senior_registry, volunteer_registry
+
+MAIL_FROM = "noreply@helpersoftomorrow.org"
+SCHEDULE_SUBJECT = "Your Weekly Volunteer Schedule"
+# Open SMTP connections, which is also the number of batches sent at once
+SMTP_POOL_SIZE = 4
+# Messages per batch; each batch is sent over one connection and reported on its own
+SMTP_BATCH_SIZE = 50
+SMTP_TIMEOUT_SECONDS = 30
+# Sends retried after transient failures (dropped connection, 4xx reply), waiting
+# SMTP_BACKOFF_SECONDS, then twice that, and so on
+SMTP_MAX_RETRIES = 3
+SMTP_BACKOFF_SECONDS = 0.5
+# Connections are reopened after this many messages; servers cap messages per session
+MESSAGES_PER_CONNECTION = 100
+
+
+def render_schedule_emails(schedules, volunteers=None, seniors=None):
+    """
+    One (recipient, message text) per volunteer with visits, listing them in date and time order.
+    Schedules are {"volunteer", "senior", "cluster"} entries or assignments rows ({"vid", "sid", "cluster_id"}).
+    Volunteers and seniors are looked up in the entity registries unless given as lists.
+    """
+    volunteers_by_id = {v['vid']: v for v in volunteers} if volunteers is not None else volunteer_registry
+    seniors_by_id = {s['uid']: s for s in seniors} if seniors is not None else senior_registry
+    schedules_by_volunteer = defaultdict(list)
+    for s in schedules:
+        schedules_by_volunteer[s.get('volunteer', s.get('vid'))].append(s)
+
+    messages = []
+    for vol_id, vol_schedules in schedules_by_volunteer.items():
+        volunteer = volunteers_by_id.get(vol_id)
+        if not volunteer or not volunteer.get('email'):
+            continue
+        name = volunteer.get('name', f"Volunteer {vol_id}")
+
+        message_body = [f"Hello {name},\n\nHere is your schedule for the week:\n"]
+        for s in sorted(vol_schedules, key=lambda x: (x['date'], x['start_time'])):
+            senior_id = s.get('senior', s.get('sid'))
+            senior = seniors_by_id.get(senior_id)
+            senior_name = senior.get('name', f"Senior {senior_id}") if senior else f"Senior {senior_id}"
+            message_body.append(
+                f"- {s['date']} {s['start_time']}–{s['end_time']}: "
+                f"Visit {senior_name} (Cluster {s.get('cluster', s.get('cluster_id'))})"
+            )
+        message_body.append("\nThank you for volunteering!\nHelpers of Tomorrow Team")
+
+        msg = MIMEMultipart()
+        msg['From'] = MAIL_FROM
+        msg['To'] = volunteer.get('email')
+        msg['Subject'] = SCHEDULE_SUBJECT
+        msg.attach(MIMEText("\n".join(message_body), "plain"))
+        messages.append((volunteer.get('email'), msg.as_string()))
+    return messages
+
+
+def _transient(error):
+    """
+    Whether a failed send is worth retrying on a fresh connection: 4xx replies and
+    dropped, refused or timed-out connections. SMTP errors are checked before
+    OSError, which smtplib.SMTPException subclasses.
+    """
+    if isinstance(error, smtplib.SMTPServerDisconnected):
+        return True
+    if isinstance(error, smtplib.SMTPResponseException):
+        # Includes SMTPConnectError and SMTPAuthenticationError; 5xx is permanent
+        return 400 <= error.smtp_code < 500
+    if isinstance(error, smtplib.SMTPException):
+        # Refused recipients, missing extensions: a retry gets the same answer
+        return False
+    return isinstance(error, OSError)
+
+
+class _Connection:
+    __slots__ = ("smtp", "sent")
+
+    def __init__(self, smtp):
+        self.smtp = smtp
+        self.sent = 0
+
+
+class MailDispatcher:
+    """
+    Sends pre-rendered messages over a pool of persistent SMTP connections.
+
+    Messages are split into batches of `batch_size`; up to `pool_size` batches are
+    sent at once, each over a connection taken from the pool, which is opened
+    (EHLO, STARTTLS, login) on first use and reused by later batches. Transient
+    failures close the connection and retry the message on a new one with
+    exponential backoff. Use as a context manager, or call close().
+    """
+
+    def __init__(self, host=SMTP_HOST, port=SMTP_PORT, username=SMTP_USER, password=SMTP_PASSWORD,
+                 starttls=SMTP_STARTTLS, pool_size=SMTP_POOL_SIZE, batch_size=SMTP_BATCH_SIZE,
+                 max_retries=SMTP_MAX_RETRIES, backoff=SMTP_BACKOFF_SECONDS, timeout=SMTP_TIMEOUT_SECONDS):
+        self.host = host
+        self.port = port
+        self.username = username
+        self.password = password
+        self.starttls = starttls
+        self.pool_size = max(1, pool_size)
+        self.batch_size = max(1, batch_size)
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.timeout = timeout
+        self._pool = queue.Queue()
+        self._lock = threading.Lock()
+        # Set when the server rejects our credentials; every later send fails fast with it
+        self._fatal = None
+        self.connections_opened = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    # -- connections --
+
+    def _connect(self):
+        smtp = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+        try:
+            smtp.ehlo()
+            if self.starttls:
+                smtp.starttls(context=ssl.create_default_context())
+                smtp.ehlo()
+            if self.username:
+                smtp.login(self.username, self.password)
+        except Exception:
+            smtp.close()
+            raise
+        with self._lock:
+            self.connections_opened += 1
+        return _Connection(smtp)
+
+    def _discard(self, conn):
+        try:
+            conn.smtp.quit()
+        except Exception:
+            conn.smtp.close()
+
+    def _acquire(self):
+        try:
+            return self._pool.get_nowait()
+        except queue.Empty:
+            return None
+
+    def _release(self, conn):
+        if conn is not None:
+            self._pool.put(conn)
+
+    def close(self):
+        """Quit every pooled connection"""
+        while True:
+            conn = self._acquire()
+            if conn is None:
+                return
+            self._discard(conn)
+
+    # -- sending --
+
+    def _send_one(self, conn, to, text, batch):
+        """Send one message, reconnecting and retrying transient failures; returns (conn, error or None)"""
+        for attempt in range(self.max_retries + 1):
+            if self._fatal is not None:
+                return conn, self._fatal
+            try:
+                if conn is None or conn.sent >= MESSAGES_PER_CONNECTION:
+                    if conn is not None:
+                        self._discard(conn)
+                        conn = None
+                    conn = self._connect()
+                conn.smtp.sendmail(MAIL_FROM, [to], text)
+                conn.sent += 1
+                return conn, None
+            except Exception as e:
+                if isinstance(e, smtplib.SMTPAuthenticationError):
+                    self._fatal = e
+                if conn is not None and not isinstance(e, (smtplib.SMTPResponseException,
+                                                           smtplib.SMTPRecipientsRefused)):
+                    # Not a reply to this message (sendmail resets the session after those):
+                    # the connection is dead or in an unknown state, start over on a new one
+                    conn.smtp.close()
+                    conn = None
+                if attempt == self.max_retries or not _transient(e):
+                    return conn, e
+                batch["retries"] += 1
+                time.sleep(self.backoff * 2 ** attempt)
+
+    def _send_batch(self, index, messages):
+        started = time.perf_counter()
+        batch = {"batch": index, "messages": len(messages), "sent": 0, "failed": 0, "retries": 0}
+        failures = []
+        conn = self._acquire()
+        for to, text in messages:
+            conn, error = self._send_one(conn, to, text, batch)
+            if error is None:
+                batch["sent"] += 1
+            else:
+                batch["failed"] += 1
+                failures.append({"to": to, "error": str(error)})
+        self._release(conn)
+
+        seconds = time.perf_counter() - started
+        batch["seconds"] = round(seconds, 4)
+        batch["per_second"] = round(batch["sent"] / seconds, 1) if seconds > 0 else None
+        logger.info(f"Mail batch {index}: {batch['sent']} sent, {batch['failed']} failed, "
+                    f"{batch['retries']} retries in {seconds:.2f}s ({batch['per_second']}/s)")
+        return batch, failures
+
+    def send(self, messages):
+        """
+        Send (recipient, message text) pairs. Returns totals ("sent", "failed",
+        "retries", "seconds", "per_second", "connections"), the per-batch metrics
+        under "batches" and each failed recipient with its error under "failures".
+        """
+        started = time.perf_counter()
+        opened_before = self.connections_opened
+        chunks = [messages[i:i + self.batch_size] for i in range(0, len(messages), self.batch_size)]
+        with ThreadPoolExecutor(max_workers=self.pool_size) as pool:
+            results = list(pool.map(self._send_batch, range(len(chunks)), chunks))
+
+        batches = [batch for batch, _ in results]
+        seconds = time.perf_counter() - started
+        sent = sum(b["sent"] for b in batches)
+        stats = {
+            "sent": sent,
+            "failed": sum(b["failed"] for b in batches),
+            "retries": sum(b["retries"] for b in batches),
+            "seconds": round(seconds, 4),
+            "per_second": round(sent / seconds, 1) if seconds > 0 else None,
+            "connections": self.connections_opened - opened_before,
+            "batches": batches,
+            "failures": [f for _, failures in results for f in failures],
+        }
+        logger.info(f"Sent {stats['sent']} of {len(messages)} emails over {stats['connections']} connections "
+                    f"in {seconds:.2f}s ({stats['per_second']}/s), {stats['failed']} failed")
+        return stats
+
+
+def send_schedule_emails(schedules, volunteers=None, seniors=None, **dispatcher_options):
+    """Render every volunteer's schedule email and send them all through one MailDispatcher; returns its stats"""
+    messages = render_schedule_emails(schedules, volunteers, seniors)
+    with MailDispatcher(**dispatcher_options) as dispatcher:
+        return dispatcher.send(messages)
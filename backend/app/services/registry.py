@@ -0,0 +1,294 @@
+import threading
+import time
+
+from config.settings import supabase, logger
+from services.spatial_index import INDEX_MAX_AGE_SECONDS
+from seniorModel.encoding import FEATURES
+
+_MISSING = object()
+
+
+class Record:
+    """
+    One table row with its usual columns in __slots__ and anything else in `extra`.
+    Columns the row never had stay unset, so as_dict() gives back the row as read.
+    """
+
+    __slots__ = ("extra",)
+    FIELDS = ()
+    # Fields not read from the table, carried over when the registry reloads
+    DERIVED = ()
+    _field_set = frozenset()
+
+    def __init__(self, row):
+        self.extra = None
+        self.update(row)
+
+    def update(self, row):
+        for field, value in row.items():
+            if field in self._field_set:
+                setattr(self, field, value)
+            else:
+                if self.extra is None:
+                    self.extra = {}
+                self.extra[field] = value
+
+    def get(self, field, default=None):
+        if field in self._field_set:
+            return getattr(self, field, default)
+        return self.extra.get(field, default) if self.extra else default
+
+    def as_dict(self):
+        row = {}
+        for field in self.FIELDS:
+            value = getattr(self, field, _MISSING)
+            if value is not _MISSING:
+                row[field] = value
+        if self.extra:
+            row.update(self.extra)
+        return row
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        cls._field_set = frozenset(cls.FIELDS)
+
+
+class SeniorRecord(Record):
+    FIELDS = ("uid", "name", "coords", "constituency_name", *FEATURES, "overall_wellbeing", "has_dl_intervened",
+              "last_visit", "feature_fingerprint", "model_version", "cluster")
+    # Not a column: set from the clustering last persisted to the clusters table
+    DERIVED = ("cluster",)
+    __slots__ = FIELDS
+
+
+class VolunteerRecord(Record):
+    FIELDS = ("vid", "name", "email", "coords", "skill", "prefers_outside")
+    __slots__ = FIELDS
+
+
+class ClusterRecord(Record):
+    FIELDS = ("id", "centroid", "radius")
+    __slots__ = FIELDS
+
+
+class ConstituencyRecord(Record):
+    FIELDS = ("name", "centre_lat", "centre_long")
+    __slots__ = FIELDS
+
+
+class EntityRegistry:
+    """
+    In-memory copy of a Supabase table as Record objects, with O(1) lookups.
+
+    Records are hash-indexed by the table's key and by each `unique` field
+    (find), and grouped by each `groups` field (group). Loaded on first use and
+    reloaded after INDEX_MAX_AGE_SECONDS, like the spatial indexes; writes made
+    through the API are applied with upsert()/remove() so lookups see them
+    straight away. A reload fetches the table outside the lock: meanwhile
+    lookups are served from the old records, and writes are applied to them and
+    replayed onto the new ones.
+    """
+
+    def __init__(self, table, record, key, unique=(), groups=()):
+        self.table = table
+        self.record = record
+        self.key = key
+        self.unique = tuple(unique)
+        self.group_fields = tuple(groups)
+        self._lock = threading.RLock()
+        # Held by the one thread fetching the table
+        self._fetch_lock = threading.Lock()
+        self._records = None
+        self._loaded_at = 0.0
+        # Bumped by reset() and invalidate(), so a fetch that overlapped either is dropped
+        self._generation = 0
+        # Writes made while a fetch is in flight, as (method, args) to replay onto its rows
+        self._pending = None
+        self.updates = 0
+
+    # -- indexing --
+
+    def _index(self, record):
+        for field in self.unique:
+            value = record.get(field)
+            if value is not None:
+                self._unique[field][value] = record
+        for field in self.group_fields:
+            value = record.get(field)
+            if value is not None:
+                self._groups[field].setdefault(value, {})[record.get(self.key)] = record
+
+    def _unindex(self, record):
+        key = record.get(self.key)
+        for field in self.unique:
+            value = record.get(field)
+            if value is not None and self._unique[field].get(value) is record:
+                del self._unique[field][value]
+        for field in self.group_fields:
+            members = self._groups[field].get(record.get(field))
+            if members is not None:
+                members.pop(key, None)
+                if not members:
+                    del self._groups[field][record.get(field)]
+
+    def reset(self, rows):
+        """Replace the registry with rows (after a full reload or a full rewrite of the table)"""
+        with self._lock:
+            self._generation += 1
+            self._install(rows)
+
+    def _install(self, rows):
+        with self._lock:
+            previous = self._records or {}
+            self._records = {}
+            self._unique = {field: {} for field in self.unique}
+            self._groups = {field: {} for field in self.group_fields}
+            for row in rows:
+                if row.get(self.key) is None:
+                    continue
+                record = self.record(row)
+                old = previous.get(row[self.key])
+                if old is not None:
+                    record.update({field: old.get(field) for field in record.DERIVED if field not in row})
+                self._records[row[self.key]] = record
+                self._index(record)
+            self._loaded_at = time.monotonic()
+
+    def _stale(self):
+        return self._records is None or time.monotonic() - self._loaded_at > INDEX_MAX_AGE_SECONDS
+
+    def _ensure_fresh(self):
+        """
+        Reload from the table if the records are missing or stale. Called without
+        the lock held; while one thread fetches, others with records to serve
+        don't wait for it.
+        """
+        while True:
+            with self._lock:
+                if not self._stale():
+                    return
+                loaded = self._records is not None
+            if not self._fetch_lock.acquire(blocking=not loaded):
+                return
+            try:
+                with self._lock:
+                    if not self._stale():
+                        return
+                    generation = self._generation
+                    self._pending = []
+                response = supabase.table(self.table).select("*").execute()
+                with self._lock:
+                    pending, self._pending = self._pending, None
+                    if generation != self._generation:
+                        continue
+                    self._install(response.data or [])
+                    for method, args in pending:
+                        method(*args)
+                    logger.info(f"Registered {len(self._records)} {self.table}")
+                    return
+            finally:
+                self._fetch_lock.release()
+
+    def invalidate(self):
+        """Force a reload from the table on the next lookup"""
+        with self._lock:
+            self._generation += 1
+            self._loaded_at = time.monotonic() - INDEX_MAX_AGE_SECONDS - 1
+
+    # -- incremental updates --
+
+    def upsert(self, rows):
+        """Apply rows written through the API (new rows, or changed fields of existing ones)"""
+        with self._lock:
+            if self._records is None:
+                return
+            if self._pending is not None:
+                self._pending.append((self.upsert, (rows,)))
+            for row in rows:
+                key = row.get(self.key)
+                if key is None:
+                    continue
+                record = self._records.get(key)
+                if record is None:
+                    record = self._records[key] = self.record(row)
+                else:
+                    self._unindex(record)
+                    record.update(row)
+                self._index(record)
+                self.updates += 1
+
+    def assign(self, field, values):
+        """
+        Set `field` on every record from {key: value}, clearing it on records not
+        in values (e.g. cluster labels after a new clustering is persisted)
+        """
+        self._ensure_fresh()
+        with self._lock:
+            if self._pending is not None:
+                self._pending.append((self.assign, (field, values)))
+            for key, record in self._records.items():
+                value = values.get(key)
+                if record.get(field) == value:
+                    continue
+                self._unindex(record)
+                record.update({field: value})
+                self._index(record)
+            self.updates += 1
+
+    def remove(self, keys):
+        with self._lock:
+            if self._records is None:
+                return
+            if self._pending is not None:
+                self._pending.append((self.remove, (keys,)))
+            for key in keys:
+                record = self._records.pop(key, None)
+                if record is not None:
+                    self._unindex(record)
+
+    # -- lookups --
+
+    def get(self, key):
+        """Record with this key, or None"""
+        self._ensure_fresh()
+        with self._lock:
+            return self._records.get(key)
+
+    def find(self, field, value):
+        """Record whose unique `field` is value, or None"""
+        self._ensure_fresh()
+        with self._lock:
+            return self._unique[field].get(value)
+
+    def group(self, field, value):
+        """Records whose `field` is value"""
+        self._ensure_fresh()
+        with self._lock:
+            return list(self._groups[field].get(value, {}).values())
+
+    def records(self):
+        self._ensure_fresh()
+        with self._lock:
+            return list(self._records.values())
+
+    def rows(self):
+        """Every record as a row dict"""
+        return [record.as_dict() for record in self.records()]
+
+    def stats(self):
+        with self._lock:
+            loaded = self._records is not None
+            return {
+                "table": self.table,
+                "loaded": loaded,
+                "records": len(self._records) if loaded else 0,
+                "groups": {field: len(self._groups[field]) for field in self.group_fields} if loaded else {},
+                "age_seconds": round(time.monotonic() - self._loaded_at, 1) if loaded else None,
+                "updates": self.updates,
+            }
+
+
+senior_registry = EntityRegistry("seniors", SeniorRecord, "uid", groups=("constituency_name", "cluster"))
+volunteer_registry = EntityRegistry("volunteers", VolunteerRecord, "vid", unique=("email",))
+cluster_registry = EntityRegistry("clusters", ClusterRecord, "id")
+constituency_registry = EntityRegistry("constituency", ConstituencyRecord, "name")
@@ -0,0 +1,225 @@
+import calendar
+from datetime import date, timedelta
+
+import numpy as np
+
+from config.settings import supabase, logger
+from services.allocation import allocate
+from services.availability_index import clock_seconds
+from utils.geo import parse_coords
+
+# Seniors at this overall_wellbeing are due a visit every HIGH_RISK_VISIT_MONTHS,
+# everyone else once per calendar year
+HIGH_RISK_WELLBEING = 1
+HIGH_RISK_VISIT_MONTHS = 4
+# Seniors at or below this wellbeing are offered the most skilled volunteers first
+SKILLED_FIRST_WELLBEING = 2
+VISIT_SECONDS = 3600
+# Visits by one volunteer on one day start at least this far apart (2 hours between visits)
+VISIT_SPACING_SECONDS = VISIT_SECONDS + 2 * 3600
+# Assignment rows per bulk insert; keeps request bodies well under PostgREST limits
+WRITE_CHUNK_SIZE = 500
+
+
+def schedule_week(today):
+    """(Monday, Sunday) of the week to schedule: the current week, or the next one on Sundays"""
+    monday = today - timedelta(days=today.weekday())
+    if today.weekday() == 6:
+        monday += timedelta(days=7)
+    return monday, monday + timedelta(days=6)
+
+
+def months_before(day, months):
+    """The same day `months` calendar months earlier, clamped to the end of shorter months"""
+    month_index = day.year * 12 + day.month - 1 - months
+    year, month = divmod(month_index, 12)
+    return date(year, month + 1, min(day.day, calendar.monthrange(year, month + 1)[1]))
+
+
+def _visit_days(seniors):
+    """last_visit of every senior as datetime64[D], NaT where there is none"""
+    values = [str(s.get("last_visit") or "")[:10] for s in seniors]
+    try:
+        return np.array(values, dtype="datetime64[D]")
+    except ValueError:
+        # Parse row by row so one malformed date only makes that senior due
+        days = np.full(len(values), np.datetime64("NaT"), dtype="datetime64[D]")
+        for i, value in enumerate(values):
+            try:
+                days[i] = np.datetime64(value, "D")
+            except ValueError:
+                pass
+        return days
+
+
+def eligible_seniors(seniors, today):
+    """
+    Seniors due a visit on `today`: never visited, high-risk (wellbeing 1) ones
+    last visited HIGH_RISK_VISIT_MONTHS or more ago, and the rest last visited
+    before the start of the year. Same rules as the run-scheduler edge function,
+    evaluated over arrays built once per call rather than per senior.
+    """
+    if not seniors:
+        return []
+    last_visit = _visit_days(seniors)
+    high_risk = np.array([s.get("overall_wellbeing") == HIGH_RISK_WELLBEING for s in seniors])
+    cutoff = np.where(high_risk,
+                      np.datetime64(months_before(today, HIGH_RISK_VISIT_MONTHS) + timedelta(days=1), "D"),
+                      np.datetime64(date(today.year, 1, 1), "D"))
+    due = np.isnat(last_visit) | (last_visit < cutoff)
+    return [seniors[i] for i in np.flatnonzero(due).tolist()]
+
+
+def _clock(seconds):
+    return f"{seconds // 3600:02d}:{seconds % 3600 // 60:02d}:{seconds % 60:02d}"
+
+
+def visit_starts(availabilities):
+    """
+    {volunteer_email: [(date, start second), ...]}: every hour-long visit that
+    fits one of the volunteer's availability windows, stepping an hour from the
+    window's start, in time order.
+    """
+    starts = {}
+    for avail in availabilities:
+        email = avail.get("volunteer_email")
+        if not email or not avail.get("date") or not avail.get("start_t") or not avail.get("end_t"):
+            continue
+        try:
+            begin, end = clock_seconds(avail["start_t"]), clock_seconds(avail["end_t"])
+        except (ValueError, IndexError):
+            logger.warning(f"Skipping availability with unreadable times: {avail}")
+            continue
+        starts.setdefault(email, []).extend(
+            (avail["date"], t) for t in range(begin, end - VISIT_SECONDS + 1, VISIT_SECONDS))
+    for slots in starts.values():
+        slots.sort()
+    return starts
+
+
+class VolunteerSlots:
+    """
+    A volunteer's remaining visit starts. Starts are handed out earliest first,
+    so every start before the cursor is taken or too close to a taken one, and
+    taking a start only has to skip the later ones on the same day that fall
+    within VISIT_SPACING_SECONDS.
+    """
+
+    __slots__ = ("starts", "cursor")
+
+    def __init__(self, starts):
+        self.starts = starts
+        self.cursor = 0
+
+    def take(self):
+        """The earliest free (date, start second), or None once the week is full"""
+        if self.cursor >= len(self.starts):
+            return None
+        day, start = self.starts[self.cursor]
+        cursor = self.cursor + 1
+        while cursor < len(self.starts) and self.starts[cursor][0] == day \
+                and self.starts[cursor][1] < start + VISIT_SPACING_SECONDS:
+            cursor += 1
+        self.cursor = cursor
+        return day, start
+
+
+def match_visits(clusters, cluster_density, volunteers_by_cluster, slots):
+    """
+    One visit per senior, cluster by cluster in decreasing density and within a
+    cluster by increasing wellbeing, as the edge function does: each senior gets
+    the earliest free start of the first volunteer of the cluster who has one,
+    trying the most skilled volunteers first for seniors at or below
+    SKILLED_FIRST_WELLBEING and the least skilled first for the others.
+    Returns the assignment rows.
+    """
+    rows = []
+    order = sorted(clusters, key=lambda c: -cluster_density.get(c["id"], 0.0))
+    for cluster in order:
+        volunteers = [v for v in volunteers_by_cluster.get(cluster["id"], []) if v["email"] in slots]
+        open_volunteers = sum(1 for v in volunteers if slots[v["email"]].starts)
+        if not open_volunteers:
+            continue
+        skilled_first = sorted(volunteers, key=lambda v: -(v.get("skill") or 0))
+        skilled_last = sorted(skilled_first, key=lambda v: v.get("skill") or 0)
+        seniors = sorted(cluster["seniors"], key=lambda s: s.get("overall_wellbeing") or 0)
+        for senior in seniors:
+            wellbeing = senior.get("overall_wellbeing") or 0
+            for volunteer in skilled_first if wellbeing <= SKILLED_FIRST_WELLBEING else skilled_last:
+                volunteer_slots = slots[volunteer["email"]]
+                picked = volunteer_slots.take()
+                if picked is None:
+                    continue
+                if volunteer_slots.cursor >= len(volunteer_slots.starts):
+                    open_volunteers -= 1
+                day, start = picked
+                rows.append({
+                    "vid": volunteer["vid"],
+                    "sid": senior["uid"],
+                    "date": day,
+                    "start_time": _clock(start),
+                    "end_time": _clock(start + VISIT_SECONDS),
+                    "volunteer_email": volunteer["email"],
+                    "is_acknowledged": False,
+                    "cluster_id": cluster["id"],
+                })
+                break
+            if not open_volunteers:
+                break  # every volunteer of the cluster is fully booked
+    return rows
+
+
+def _located(rows):
+    """Shallow copies of the rows with usable coords, coords parsed to a {"lat", "lng"} dict"""
+    located = []
+    for row in rows:
+        coords = parse_coords(row.get("coords"))
+        if coords is not None:
+            located.append({**row, "coords": coords})
+    return located
+
+
+def build_schedule(seniors, volunteers, availabilities, options, today, stats=None):
+    """
+    The week's visits for every eligible senior (the /schedule body, without writes).
+
+    Eligible seniors are clustered and the volunteers with availability that
+    week assigned to clusters by services.allocation.allocate (options are its
+    request fields), then matched to the volunteers' free hours with
+    match_visits. If `stats` is a dict it is filled with counts for the
+    response. Returns (assignment rows, allocate result, centroids, radius_km,
+    fitted seeds).
+    """
+    due = _located(eligible_seniors(seniors, today))
+    slots = {email: VolunteerSlots(starts) for email, starts in visit_starts(availabilities).items()}
+    available = _located([v for v in volunteers if v.get("email") in slots])
+    logger.info(f"Eligibility filter: {len(seniors)} total seniors, {len(due)} eligible; "
+                f"{len(available)} volunteers with availability")
+
+    if stats is not None:
+        stats.update({"seniors": len(seniors), "eligible_seniors": len(due),
+                      "available_volunteers": len(available), "clusters": 0})
+    if not due or not available:
+        return [], None, None, None, None
+
+    result, centroids, radius, seeds = allocate(due, available, options)
+    by_vid = {v["vid"]: v for v in available}
+    volunteers_by_cluster = {}
+    for assignment in result["assignments"]:
+        volunteers_by_cluster.setdefault(assignment["cluster"], []).append(by_vid[assignment["volunteer"]])
+
+    rows = match_visits(result["clusters"], result["cluster_density"], volunteers_by_cluster, slots)
+    logger.info(f"Scheduled {len(rows)} of {len(due)} eligible seniors in {len(result['clusters'])} clusters")
+    if stats is not None:
+        stats["clusters"] = len(result["clusters"])
+    return rows, result, centroids, radius, seeds
+
+
+def insert_assignments(rows):
+    """Insert assignment rows in WRITE_CHUNK_SIZE bulk inserts; returns the number written"""
+    written = 0
+    for start in range(0, len(rows), WRITE_CHUNK_SIZE):
+        chunk = rows[start:start + WRITE_CHUNK_SIZE]
+        supabase.table("assignments").insert(chunk).execute()
+        written += len(chunk)
+    return written
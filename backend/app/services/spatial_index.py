@@ -0,0 +1,256 @@
+import threading
+import time
+
+import numpy as np
+from scipy.spatial import cKDTree
+
+from config.settings import supabase, logger
+from utils.geo import parse_coords, unit_vectors, chord_to_km, km_to_chord
+
+# Rows are reloaded from the table after this long, to pick up writes made outside the API
+# (the scheduler edge function, the frontend writing to Supabase directly)
+INDEX_MAX_AGE_SECONDS = 300
+# Changed points are kept in a small side buffer until it outgrows this share of the tree
+REBUILD_RATIO = 0.05
+MIN_REBUILD = 256
+
+
+class PointTree:
+    """KD-tree over [lat, lng] points, answering in great-circle km"""
+
+    def __init__(self, points):
+        self.size = len(points)
+        self.tree = cKDTree(unit_vectors(points)) if self.size else None
+
+    def within(self, point, radius_km):
+        """Indices of points within radius_km of point, with their distances, nearest first"""
+        if not self.size:
+            return np.empty(0, dtype=np.intp), np.empty(0)
+        vec = unit_vectors(point)[0]
+        idx = np.asarray(self.tree.query_ball_point(vec, km_to_chord(radius_km)), dtype=np.intp)
+        chord = np.linalg.norm(self.tree.data[idx] - vec, axis=1)
+        order = np.argsort(chord, kind="stable")
+        return idx[order], chord_to_km(chord[order])
+
+    def nearest(self, point, k):
+        """Indices and distances of the k points nearest to point, nearest first"""
+        k = min(k, self.size)
+        if k <= 0:
+            return np.empty(0, dtype=np.intp), np.empty(0)
+        chord, idx = self.tree.query(unit_vectors(point)[0], k=k)
+        return np.atleast_1d(idx).astype(np.intp), chord_to_km(np.atleast_1d(chord))
+
+    def nearest_weighted(self, point, weights, k=8, min_weight=None):
+        """
+        Index minimising distance_km * weights[i], and that weighted distance.
+
+        Grows a k-nearest query until the unseen points can't win or tie: every
+        point beyond the current ring is at least as far as the farthest seen one
+        and no lighter than min_weight, any lower bound on weights (their minimum
+        if None; callers querying the same weights many times pass it in).
+        """
+        weights = np.asarray(weights, dtype=np.float64)
+        if min_weight is None:
+            min_weight = float(np.min(weights)) if len(weights) else np.inf
+        while True:
+            idx, dist = self.nearest(point, k)
+            if not len(idx):
+                return None, np.inf
+            w = weights[idx]
+            # Infinite weight excludes a point even at distance 0
+            weighted = np.where(np.isinf(w), np.inf, dist * w)
+            best = int(np.argmin(weighted))
+            if k >= self.size or dist[-1] * min_weight > weighted[best]:
+                # Ties at the boundary go to the lowest index, as a linear scan would
+                ties = idx[weighted == weighted[best]]
+                return int(ties.min()), float(weighted[best])
+            k *= 4
+
+
+class SpatialIndex:
+    """
+    In-memory KD-tree over the coordinates of a Supabase table, for radius and k-nearest queries.
+
+    Loaded on first use and reloaded after INDEX_MAX_AGE_SECONDS. Writes made through
+    the API are applied with upsert()/remove() without touching the tree: moved or
+    new points go to a small side buffer that is scanned linearly, replaced ones are
+    masked out, and the tree is only rebuilt once the buffer outgrows REBUILD_RATIO.
+    """
+
+    def __init__(self, table, key, coords_field="coords", columns="*"):
+        self.table = table
+        self.key = key
+        self.coords_field = coords_field
+        self.columns = columns
+        self._lock = threading.RLock()
+        self._rows = None
+        self._loaded_at = 0.0
+        self.rebuilds = 0
+        self.updates = 0
+
+    # -- building --
+
+    def _point(self, row):
+        coords = parse_coords(row.get(self.coords_field))
+        return None if coords is None else (coords["lat"], coords["lng"])
+
+    def _rebuild(self):
+        keys, points = [], []
+        for key, row in self._rows.items():
+            point = self._point(row)
+            if point is not None:
+                keys.append(key)
+                points.append(point)
+        self._tree_points = np.array(points).reshape(-1, 2)
+        self._tree = PointTree(self._tree_points)
+        self._tree_keys = keys
+        self._stale = np.zeros(len(keys), dtype=bool)
+        self._tree_pos = {key: i for i, key in enumerate(keys)}
+        self._delta = {}
+        self.rebuilds += 1
+
+    def reset(self, rows):
+        """Replace the indexed rows wholesale (after a full reload or a full rewrite of the table)"""
+        with self._lock:
+            self._rows = {row[self.key]: row for row in rows}
+            self._rebuild()
+            self._loaded_at = time.monotonic()
+
+    def _ensure_fresh(self):
+        if self._rows is None or time.monotonic() - self._loaded_at > INDEX_MAX_AGE_SECONDS:
+            response = supabase.table(self.table).select(self.columns).execute()
+            self.reset(response.data or [])
+            logger.info(f"Indexed {len(self._tree_keys)} {self.table} by {self.coords_field}")
+
+    def invalidate(self):
+        """Force a reload from the table on the next query"""
+        with self._lock:
+            self._rows = None
+
+    # -- incremental updates --
+
+    def upsert(self, rows):
+        """Apply rows written through the API (new rows or changed fields, including coords)"""
+        with self._lock:
+            if self._rows is None:
+                return
+            for row in rows:
+                key = row.get(self.key)
+                if key is None:
+                    continue
+                merged = {**self._rows.get(key, {}), **row}
+                self._rows[key] = merged
+                pos = self._tree_pos.get(key)
+                point = self._point(merged)
+                if pos is not None and not self._stale[pos] and point == tuple(self._tree_points[pos]):
+                    continue  # coords unchanged, the tree entry is still right
+                if pos is not None:
+                    self._stale[pos] = True
+                if point is None:
+                    self._delta.pop(key, None)
+                else:
+                    self._delta[key] = point
+                self.updates += 1
+            self._maybe_rebuild()
+
+    def remove(self, keys):
+        with self._lock:
+            if self._rows is None:
+                return
+            for key in keys:
+                self._rows.pop(key, None)
+                self._delta.pop(key, None)
+                pos = self._tree_pos.get(key)
+                if pos is not None:
+                    self._stale[pos] = True
+            self._maybe_rebuild()
+
+    def _maybe_rebuild(self):
+        if len(self._delta) + int(self._stale.sum()) > max(MIN_REBUILD, REBUILD_RATIO * len(self._tree_keys)):
+            self._rebuild()
+
+    # -- queries --
+
+    def _snapshot(self):
+        with self._lock:
+            self._ensure_fresh()
+            delta_keys = list(self._delta)
+            delta_points = np.array([self._delta[k] for k in delta_keys]).reshape(-1, 2)
+            return self._tree, self._tree_keys, self._stale.copy(), delta_keys, delta_points
+
+    def _lookup(self, hit_keys, hit_dist):
+        """(row, distance) for the hits still present, read under the lock"""
+        with self._lock:
+            rows = self._rows or {}
+            return [(rows[k], d) for k, d in zip(hit_keys, hit_dist) if k in rows]
+
+    def _delta_distances(self, delta_points, point):
+        if not len(delta_points):
+            return np.empty(0)
+        chord = np.linalg.norm(unit_vectors(delta_points) - unit_vectors(point)[0], axis=1)
+        return chord_to_km(chord)
+
+    def get(self, key):
+        with self._lock:
+            self._ensure_fresh()
+            return self._rows.get(key)
+
+    def rows(self):
+        """
+        Every row of the table, including ones without usable coords. The list is
+        a copy taken under the lock; the row dicts are shared, don't modify them.
+        """
+        with self._lock:
+            self._ensure_fresh()
+            return list(self._rows.values())
+
+    def _merge(self, keys, stale, idx, dist, delta_keys, delta_dist, limit=None):
+        """Tree hits minus masked-out entries plus side-buffer hits, nearest first, as keys and distances"""
+        keep = ~stale[idx]
+        idx, dist = idx[keep], dist[keep]
+        hit_keys = [keys[i] for i in idx.tolist()]
+        if len(delta_keys):
+            hit_keys += delta_keys
+            dist = np.concatenate([dist, delta_dist])
+            order = np.argsort(dist, kind="stable")[:limit]
+            hit_keys = [hit_keys[i] for i in order.tolist()]
+            dist = dist[order]
+        return hit_keys[:limit], dist[:limit].tolist()
+
+    def within(self, lat, lng, radius_km):
+        """Rows within radius_km of (lat, lng) as (row, distance_km), nearest first"""
+        tree, keys, stale, delta_keys, delta_points = self._snapshot()
+        idx, dist = tree.within((lat, lng), radius_km)
+        delta_dist = self._delta_distances(delta_points, (lat, lng))
+        near = delta_dist <= radius_km
+        hit_keys, hit_dist = self._merge(keys, stale, idx, dist,
+                                         [k for k, n in zip(delta_keys, near) if n], delta_dist[near])
+        return self._lookup(hit_keys, hit_dist)
+
+    def nearest(self, lat, lng, k=5):
+        """The k rows nearest to (lat, lng) as (row, distance_km), nearest first"""
+        tree, keys, stale, delta_keys, delta_points = self._snapshot()
+        # Masked-out tree entries may take some of the k slots; over-fetch by that many
+        idx, dist = tree.nearest((lat, lng), k + int(stale.sum()))
+        hit_keys, hit_dist = self._merge(keys, stale, idx, dist, delta_keys,
+                                         self._delta_distances(delta_points, (lat, lng)), limit=k)
+        return self._lookup(hit_keys, hit_dist)
+
+    def stats(self):
+        with self._lock:
+            loaded = self._rows is not None
+            return {
+                "table": self.table,
+                "loaded": loaded,
+                "rows": len(self._rows) if loaded else 0,
+                "indexed": len(self._tree_keys) if loaded else 0,
+                "pending": (len(self._delta) + int(self._stale.sum())) if loaded else 0,
+                "age_seconds": round(time.monotonic() - self._loaded_at, 1) if loaded else None,
+                "rebuilds": self.rebuilds,
+                "updates": self.updates,
+            }
+
+
+senior_index = SpatialIndex("seniors", "uid")
+volunteer_index = SpatialIndex("volunteers", "vid")
+cluster_index = SpatialIndex("clusters", "id", coords_field="centroid")
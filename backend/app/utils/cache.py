@@ -0,0 +1,143 @@
+import os
+import pickle
+import threading
+import time
+from collections import OrderedDict
+
+_MISSING = object()
+
+
+class LRUCache:
+    """Thread-safe size-bounded LRU cache with hit/miss counters and an optional TTL (seconds)"""
+
+    def __init__(self, maxsize=10000, ttl=None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+
+    def _lookup(self, key):
+        """Value for key (refreshing its LRU position) or _MISSING; call with the lock held"""
+        entry = self._data.get(key, _MISSING)
+        if entry is _MISSING:
+            return _MISSING
+        value, expires_at = entry
+        if expires_at is not None and time.monotonic() > expires_at:
+            del self._data[key]
+            self.expired += 1
+            return _MISSING
+        self._data.move_to_end(key)
+        return value
+
+    def _store(self, key, value):
+        expires_at = time.monotonic() + self.ttl if self.ttl is not None else None
+        self._data[key] = (value, expires_at)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def get(self, key, default=None):
+        with self._lock:
+            value = self._lookup(key)
+            if value is _MISSING:
+                self.misses += 1
+                return default
+            self.hits += 1
+            return value
+
+    def put(self, key, value):
+        with self._lock:
+            self._store(key, value)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+    def stats(self):
+        return {"size": len(self._data), "maxsize": self.maxsize, "ttl": self.ttl,
+                "hits": self.hits, "misses": self.misses, "expired": self.expired}
+
+
+class PersistentLRUCache(LRUCache):
+    """
+    LRUCache that also pickles every entry to `path`, so entries survive restarts.
+
+    Keys must be usable as file names (e.g. hex digests). Memory misses fall
+    back to the file, which is expired by mtime against the TTL; the directory
+    is trimmed to the maxsize most recently used files on every put.
+    """
+
+    def __init__(self, path, maxsize=10000, ttl=None):
+        super().__init__(maxsize=maxsize, ttl=ttl)
+        self.path = path
+        self.disk_hits = 0
+        os.makedirs(path, exist_ok=True)
+
+    def _file(self, key):
+        return os.path.join(self.path, f"{key}.pkl")
+
+    def _read(self, key):
+        file = self._file(key)
+        try:
+            if self.ttl is not None and time.time() - os.path.getmtime(file) > self.ttl:
+                os.remove(file)
+                self.expired += 1
+                return _MISSING
+            with open(file, "rb") as f:
+                value = pickle.load(f)
+            os.utime(file)
+            return value
+        except (OSError, pickle.UnpicklingError, EOFError):
+            return _MISSING
+
+    def _write(self, key, value):
+        file = self._file(key)
+        tmp = f"{file}.{os.getpid()}.tmp"
+        with open(tmp, "wb") as f:
+            pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, file)
+        files = [os.path.join(self.path, name) for name in os.listdir(self.path) if name.endswith(".pkl")]
+        if len(files) > self.maxsize:
+            files.sort(key=os.path.getmtime)
+            for old in files[:len(files) - self.maxsize]:
+                try:
+                    os.remove(old)
+                except OSError:
+                    pass
+
+    def get(self, key, default=None):
+        with self._lock:
+            value = self._lookup(key)
+            if value is _MISSING:
+                value = self._read(key)
+                if value is _MISSING:
+                    self.misses += 1
+                    return default
+                self._store(key, value)
+                self.disk_hits += 1
+            self.hits += 1
+            return value
+
+    def put(self, key, value):
+        with self._lock:
+            self._store(key, value)
+            try:
+                self._write(key, value)
+            except OSError:
+                pass  # the disk copy is best effort; the entry is still cached in memory
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            for name in os.listdir(self.path):
+                if name.endswith(".pkl"):
+                    os.remove(os.path.join(self.path, name))
+
+    def stats(self):
+        return {**super().stats(), "disk_hits": self.disk_hits, "path": self.path}
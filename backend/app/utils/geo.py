@@ -0,0 +1,104 @@
+import json
+
+import numpy as np
+
+EARTH_RADIUS_KM = 6371.0088
+# Length of one degree of latitude (and of longitude at the equator) on that sphere
+KM_PER_DEG = np.pi * EARTH_RADIUS_KM / 180
+
+# Bounding boxes are never taken smaller than this many square degrees
+MIN_BBOX_AREA_DEG2 = 0.001
+
+
+def coords_array(items, key="coords"):
+    """(n, 2) float64 array of [lat, lng] from dicts like {"coords": {"lat": .., "lng": ..}}"""
+    if not items:
+        return np.empty((0, 2))
+    coords = [item[key] if key else item for item in items]
+    return np.array([(c["lat"], c["lng"]) for c in coords], dtype=np.float64)
+
+
+def haversine_km(a, b):
+    """Great-circle distance matrix in km between (n, 2) and (m, 2) [lat, lng] arrays"""
+    a = np.radians(np.asarray(a, dtype=np.float64))
+    b = np.radians(np.asarray(b, dtype=np.float64))
+    dlat = a[:, None, 0] - b[None, :, 0]
+    dlng = a[:, None, 1] - b[None, :, 1]
+    h = np.sin(dlat / 2) ** 2 + np.cos(a[:, None, 0]) * np.cos(b[None, :, 0]) * np.sin(dlng / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.minimum(h, 1.0)))
+
+
+def haversine_pairs_km(a, b):
+    """Row-wise great-circle distance in km between two (n, 2) [lat, lng] arrays"""
+    a = np.radians(np.asarray(a, dtype=np.float64))
+    b = np.radians(np.asarray(b, dtype=np.float64))
+    dlat = a[:, 0] - b[:, 0]
+    dlng = a[:, 1] - b[:, 1]
+    h = np.sin(dlat / 2) ** 2 + np.cos(a[:, 0]) * np.cos(b[:, 0]) * np.sin(dlng / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.minimum(h, 1.0)))
+
+
+def cluster_max_radius_km(points, labels, centroids):
+    """Per-cluster distance in km from the centroid to its farthest member (0 for empty clusters)"""
+    radius = np.zeros(len(centroids))
+    if len(points):
+        labels = np.asarray(labels, dtype=np.intp)
+        np.maximum.at(radius, labels, haversine_pairs_km(points, np.asarray(centroids)[labels]))
+    return radius
+
+
+def cluster_counts(labels, n_clusters):
+    return np.bincount(np.asarray(labels, dtype=np.intp), minlength=n_clusters)
+
+
+def cluster_bbox_density(points, labels, n_clusters):
+    """
+    Seniors per km² of each cluster's lat/lng bounding box.
+
+    The box is clamped to at least MIN_BBOX_AREA_DEG2 before conversion, and
+    clusters of fewer than two points count as one point per square degree,
+    so densities are the legacy per-square-degree values in km² units.
+    """
+    labels = np.asarray(labels, dtype=np.intp)
+    counts = cluster_counts(labels, n_clusters)
+    lo = np.full((n_clusters, 2), np.inf)
+    hi = np.full((n_clusters, 2), -np.inf)
+    if len(points):
+        np.minimum.at(lo, labels, points)
+        np.maximum.at(hi, labels, points)
+
+    populated = counts > 0
+    with np.errstate(invalid="ignore"):
+        # Empty clusters keep inf bounds; their values are masked out below
+        mid_lat = np.where(populated, (lo[:, 0] + hi[:, 0]) / 2, 0.0)
+        area_deg2 = np.maximum((hi[:, 0] - lo[:, 0]) * (hi[:, 1] - lo[:, 1]), MIN_BBOX_AREA_DEG2)
+    area_deg2 = np.where(counts >= 2, area_deg2, 1.0)
+    km2_per_deg2 = KM_PER_DEG ** 2 * np.cos(np.radians(mid_lat))
+    return np.where(counts >= 2, counts, 1) / (area_deg2 * km2_per_deg2)
+
+
+def parse_coords(value):
+    """{"lat", "lng"} dict from a coords column (stored as json or as a json string); None if unusable"""
+    if isinstance(value, str):
+        try:
+            value = json.loads(value)
+        except ValueError:
+            return None
+    if not isinstance(value, dict) or value.get("lat") is None or value.get("lng") is None:
+        return None
+    return {"lat": float(value["lat"]), "lng": float(value["lng"])}
+
+
+def unit_vectors(points):
+    """[lat, lng] degrees -> (n, 3) points on the unit sphere; chord length there ranks like haversine"""
+    lat, lng = np.radians(np.asarray(points, dtype=np.float64).reshape(-1, 2)).T
+    cos_lat = np.cos(lat)
+    return np.column_stack((cos_lat * np.cos(lng), cos_lat * np.sin(lng), np.sin(lat)))
+
+
+def chord_to_km(chord):
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.minimum(np.asarray(chord) / 2, 1.0))
+
+
+def km_to_chord(km):
+    return 2 * np.sin(np.minimum(np.asarray(km) / (2 * EARTH_RADIUS_KM), np.pi / 2))
@@ -4,6 +4,8 @@ from datetime import datetime, timedelta
 from sklearn.cluster import KMeans
 import numpy as np
 
+from services.registry import senior_registry, volunteer_registry
+
 def get_sg_coords():
     return {
         "lat": round(random.uniform(1.16, 1.47), 4),
@@ -19,7 +21,10 @@ def distance(coord1, coord2):
     return math.sqrt((coord1["lat"] - coord2["lat"])**2 + (coord1["lng"] - coord2["lng"])**2)
 
 def kmeans_clusters(coords_list, n_clusters):
-    X = np.array([[c['lat'], c['lng']] for c in coords_list])
+    if isinstance(coords_list, np.ndarray):
+        X = coords_list
+    else:
+        X = np.array([[c['lat'], c['lng']] for c in coords_list])
     kmeans = KMeans(n_clusters=n_clusters, 
                     n_init=10, 
                     random_state=42,)  # Let scikit-learn decide based on dataset size
@@ -38,12 +43,12 @@ def is_available(vol, slot):
     return slot in vol.get('available', [])
 
 # Add helper functions for name lookup
-def get_volunteer_name(vid, volunteers):
+def get_volunteer_name(vid):
     """Get volunteer name from ID"""
-    volunteer = next((v for v in volunteers if v['vid'] == vid), None)
-    return volunteer['name'] if volunteer else vid
+    volunteer = volunteer_registry.get(vid)
+    return volunteer.get('name') if volunteer else vid
 
-def get_senior_name(uid, seniors):
+def get_senior_name(uid):
     """Get senior name from UID"""
-    senior = next((s for s in seniors if s['uid'] == uid), None)
-    return senior['name'] if senior else uid
+    senior = senior_registry.get(uid)
+    return senior.get('name') if senior else uid
@@ -0,0 +1,481 @@
+"""
+Shared setup for the benchmark scripts.
+
+Puts backend/app on sys.path (the app imports its modules as top-level
+packages, the same way `fastapi run` does from inside app/) and provides an
+in-memory stand-in for the Supabase client that counts round-trips and can
+simulate network latency.
+"""
+import os
+import sys
+import time
+import copy
+
+APP_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'app')
+if APP_DIR not in sys.path:
+    sys.path.insert(0, APP_DIR)
+
+# config.settings refuses to import without these; the benchmarks never talk to a real project
+os.environ.setdefault("SUPABASE_URL", "http://localhost:54321")
+os.environ.setdefault("SUPABASE_KEY", "benchmark.benchmark.benchmark")
+
+
+class FakeResponse:
+    def __init__(self, data, count=None):
+        self.data = data
+        self.count = count
+
+
+class FakeQuery:
+    """Chainable subset of the postgrest query builder used by the app"""
+
+    def __init__(self, client, table):
+        self.client = client
+        self.table_name = table
+        self.action = "select"
+        self.payload = None
+        self.on_conflict = None
+        self.filters = []
+        self.is_single = False
+        self.limit_n = None
+        self.order_by = None
+
+    # actions
+    def select(self, *columns, **kwargs):
+        self.action = "select"
+        return self
+
+    def insert(self, rows, **kwargs):
+        self.action, self.payload = "insert", rows
+        return self
+
+    def update(self, values, **kwargs):
+        self.action, self.payload = "update", values
+        return self
+
+    def upsert(self, rows, on_conflict="", **kwargs):
+        self.action, self.payload, self.on_conflict = "upsert", rows, on_conflict
+        return self
+
+    def delete(self, **kwargs):
+        self.action = "delete"
+        return self
+
+    # filters
+    def eq(self, col, value):
+        self.filters.append(lambda r: r.get(col) == value)
+        return self
+
+    def neq(self, col, value):
+        self.filters.append(lambda r: r.get(col) != value)
+        return self
+
+    def in_(self, col, values):
+        values = set(values)
+        self.filters.append(lambda r: r.get(col) in values)
+        return self
+
+    def gte(self, col, value):
+        self.filters.append(lambda r: r.get(col) is not None and r.get(col) >= value)
+        return self
+
+    def lte(self, col, value):
+        self.filters.append(lambda r: r.get(col) is not None and r.get(col) <= value)
+        return self
+
+    def gt(self, col, value):
+        self.filters.append(lambda r: r.get(col) is not None and r.get(col) > value)
+        return self
+
+    def lt(self, col, value):
+        self.filters.append(lambda r: r.get(col) is not None and r.get(col) < value)
+        return self
+
+    # modifiers
+    def single(self):
+        self.is_single = True
+        return self
+
+    def limit(self, n):
+        self.limit_n = n
+        return self
+
+    def order(self, col, desc=False):
+        self.order_by = (col, desc)
+        return self
+
+    def _matches(self, row):
+        return all(f(row) for f in self.filters)
+
+    def execute(self):
+        self.client.round_trips += 1
+        if self.client.latency:
+            time.sleep(self.client.latency)
+
+        rows = self.client.tables.setdefault(self.table_name, [])
+        if self.action == "select":
+            data = [copy.deepcopy(r) for r in rows if self._matches(r)]
+            if self.order_by:
+                col, desc = self.order_by
+                data.sort(key=lambda r: r.get(col), reverse=desc)
+            if self.limit_n is not None:
+                data = data[:self.limit_n]
+            if self.is_single:
+                return FakeResponse(data[0] if data else None)
+            return FakeResponse(data)
+
+        if self.action == "insert":
+            new_rows = self.payload if isinstance(self.payload, list) else [self.payload]
+            new_rows = [copy.deepcopy(r) for r in new_rows]
+            if self.table_name in self.client.identity:
+                for r in new_rows:
+                    r.setdefault("id", self.client.next_id())
+            rows.extend(new_rows)
+            return FakeResponse(new_rows)
+
+        if self.action == "update":
+            updated = []
+            for r in rows:
+                if self._matches(r):
+                    r.update(copy.deepcopy(self.payload))
+                    updated.append(copy.deepcopy(r))
+            return FakeResponse(updated)
+
+        if self.action == "upsert":
+            new_rows = self.payload if isinstance(self.payload, list) else [self.payload]
+            key = self.on_conflict or "id"
+            index = {r.get(key): r for r in rows}
+            written = []
+            for new in new_rows:
+                existing = index.get(new.get(key))
+                if existing is not None:
+                    existing.update(copy.deepcopy(new))
+                else:
+                    existing = copy.deepcopy(new)
+                    rows.append(existing)
+                    index[existing.get(key)] = existing
+                written.append(copy.deepcopy(existing))
+            return FakeResponse(written)
+
+        if self.action == "delete":
+            deleted = [r for r in rows if self._matches(r)]
+            rows[:] = [r for r in rows if not self._matches(r)]
+            return FakeResponse(deleted)
+
+        raise ValueError(f"Unsupported action {self.action}")
+
+
+class FakeRpc:
+    def __init__(self, client, fn, params):
+        self.client, self.fn, self.params = client, fn, params
+
+    def execute(self):
+        self.client.round_trips += 1
+        if self.client.latency:
+            time.sleep(self.client.latency)
+        return FakeResponse(self.fn(self.client, self.params))
+
+
+class FakeSupabase:
+    """
+    In-memory Supabase client; `round_trips` counts every execute().
+    Rows inserted into `identity` tables get a serial "id"; `functions` are
+    {name: fn(client, params)} stand-ins for Postgres functions called with rpc().
+    """
+
+    def __init__(self, tables=None, latency=0.0, identity=(), functions=None):
+        self.tables = {name: [dict(r) for r in rows] for name, rows in (tables or {}).items()}
+        self.latency = latency
+        self.round_trips = 0
+        self.identity = set(identity)
+        self.functions = dict(functions or {})
+        self._last_id = max((r["id"] for name in self.identity for r in self.tables.get(name, [])
+                             if isinstance(r.get("id"), int)), default=0)
+        for name in self.identity:
+            for r in self.tables.get(name, []):
+                r.setdefault("id", self.next_id())
+
+    def table(self, name):
+        return FakeQuery(self, name)
+
+    def next_id(self):
+        self._last_id += 1
+        return self._last_id
+
+    def rpc(self, name, params):
+        if name not in self.functions:
+            raise Exception(f"{{'code': 'PGRST202', 'message': 'Could not find the function public.{name}'}}")
+        return FakeRpc(self, self.functions[name], params)
+
+
+def replace_availabilities(client, params):
+    """Stand-in for the replace_availabilities Postgres function (supabase/migrations)"""
+    rows = client.tables.setdefault("availabilities", [])
+    delete_ids = set(params["p_delete_ids"])
+    kept = [r for r in rows if not (r.get("volunteer_email") == params["p_email"] and r.get("id") in delete_ids)]
+    inserted = [{"volunteer_email": params["p_email"], "date": r["date"], "start_t": r["start_t"],
+                 "end_t": r["end_t"], "id": client.next_id()} for r in params["p_rows"]]
+    deleted = len(rows) - len(kept)
+    rows[:] = kept + inserted
+    return {"deleted": deleted, "inserted": len(inserted)}
+
+
+def update_senior_scores(client, params):
+    """Stand-in for the update_senior_scores Postgres function (supabase/migrations)"""
+    by_uid = {r.get("uid"): r for r in client.tables.setdefault("seniors", [])}
+    updated = []
+    for row in params["p_rows"]:
+        senior = by_uid.get(row["uid"])
+        if senior is not None:
+            senior.update(copy.deepcopy(row))
+            updated.append({"uid": str(row["uid"])})
+    return updated
+
+
+def timed(fn, *args, **kwargs):
+    """Run fn once and return (result, seconds)"""
+    start = time.perf_counter()
+    result = fn(*args, **kwargs)
+    return result, time.perf_counter() - start
+
+
+def build_model_artifact(path, n_estimators=100, random_state=42):
+    """
+    Train a RandomForest on the bundled v3 dataset without the grid search and
+    save it with SeniorRiskAssessment.save_model, so benchmarks run against an
+    artifact in the same format production uses.
+    """
+    import pandas as pd
+    from sklearn.ensemble import RandomForestClassifier
+    from seniorModel.training.training import SeniorRiskAssessment
+
+    df = pd.read_csv(os.path.join(APP_DIR, 'seniorModel', 'data', 'v3_seniors_wellbeing_dataset.csv'))
+    risk_model = SeniorRiskAssessment()
+    X, y = risk_model.prepare_features(df)
+    risk_model.model = RandomForestClassifier(n_estimators=n_estimators, random_state=random_state).fit(X.to_numpy(), y)
+    risk_model.save_model(path)
+    return path
+
+
+def make_seniors(n, seed=0):
+    """Synthetic `seniors` rows with features encoded the way the table stores them"""
+    import random
+    rng = random.Random(seed)
+    return [
+        {
+            "uid": f"senior-{i}",
+            "name": f"Senior {i}",
+            "coords": {"lat": round(rng.uniform(1.28, 1.45), 6), "lng": round(rng.uniform(103.7, 103.95), 6)},
+            "constituency_name": "Bench",
+            "age": rng.randint(60, 100),
+            "physical": rng.randint(1, 5),
+            "mental": rng.randint(1, 5),
+            "dl_intervention": rng.randint(0, 1),
+            "rece_gov_sup": rng.randint(0, 1),
+            "community": rng.randint(1, 3),
+            "making_ends_meet": rng.randint(1, 3),
+            "living_situation": rng.randint(1, 4),
+            "overall_wellbeing": rng.randint(1, 3),
+            "has_dl_intervened": False,
+            "last_visit": None,
+        }
+        for i in range(n)
+    ]
+
+
+def make_volunteers(n, seed=1):
+    """Synthetic `volunteers` rows spread over the same area as make_seniors"""
+    import random
+    rng = random.Random(seed)
+    return [
+        {
+            "vid": f"volunteer-{i}",
+            "name": f"Volunteer {i}",
+            "email": f"volunteer{i}@example.com",
+            "coords": {"lat": round(rng.uniform(1.28, 1.45), 6), "lng": round(rng.uniform(103.7, 103.95), 6)},
+            "skill": rng.randint(1, 3),
+            "prefers_outside": rng.random() < 0.3,
+        }
+        for i in range(n)
+    ]
+
+
+def make_district_seniors(n, spread_km=0.8, seed=0):
+    """
+    make_seniors rows placed in Gaussian blobs (sd spread_km) around the
+    SINGAPORE_NEIGHBOURHOODS centres from add.py, with constituency_name set
+    to the neighbourhood, dealt round-robin so every district gets n / 20
+    """
+    import numpy as np
+    from add import SINGAPORE_NEIGHBOURHOODS
+    from utils.geo import KM_PER_DEG
+
+    names = list(SINGAPORE_NEIGHBOURHOODS)
+    rng = np.random.default_rng(seed)
+    offsets = rng.normal(scale=spread_km / KM_PER_DEG, size=(n, 2))
+    seniors = make_seniors(n, seed=seed)
+    for i, senior in enumerate(seniors):
+        name = names[i % len(names)]
+        lng, lat = SINGAPORE_NEIGHBOURHOODS[name]
+        senior["coords"] = {"lat": round(lat + offsets[i, 0], 6), "lng": round(lng + offsets[i, 1], 6)}
+        senior["constituency_name"] = name
+    return seniors
+
+
+def constituency_rows():
+    """The constituency table as add.populate_constituencies writes it"""
+    from add import SINGAPORE_NEIGHBOURHOODS
+    return [{"name": name, "centre_lat": lat, "centre_long": lng}
+            for name, (lng, lat) in SINGAPORE_NEIGHBOURHOODS.items()]
+
+
+def make_population(n_seniors, n_volunteers, seed=0):
+    """
+    Senior and volunteer rows clustered the way an island-wide run sees them.
+
+    Each SINGAPORE_NEIGHBOURHOODS district gets an uneven share of seniors
+    (Dirichlet weights) spread over housing blocks around its centre (sd 1 km);
+    seniors live in blocks with Zipf-like occupancy, 30 m apart at most, so many
+    share near-identical coords. Volunteers follow the same district mix more
+    loosely (sd 2 km), with 10% placed anywhere on the island. Vectorised, so
+    1M seniors take seconds.
+    """
+    import numpy as np
+    from add import SINGAPORE_NEIGHBOURHOODS
+    from utils.geo import KM_PER_DEG
+
+    rng = np.random.default_rng(seed)
+    names = list(SINGAPORE_NEIGHBOURHOODS)
+    centres = np.array([(lat, lng) for lng, lat in SINGAPORE_NEIGHBOURHOODS.values()])
+    weights = rng.dirichlet(np.full(len(names), 2.0))
+
+    district = rng.choice(len(names), size=n_seniors, p=weights)
+    n_blocks = max(1, n_seniors // 40)
+    block_district = rng.choice(len(names), size=n_blocks, p=weights)
+    block_coords = centres[block_district] + rng.normal(scale=1.0 / KM_PER_DEG, size=(n_blocks, 2))
+    # Zipf-like block occupancy within each district
+    block_weight = 1.0 / rng.integers(1, 20, size=n_blocks)
+    block = np.empty(n_seniors, dtype=np.int64)
+    for d in range(len(names)):
+        members = np.flatnonzero(district == d)
+        blocks = np.flatnonzero(block_district == d)
+        if not len(members):
+            continue
+        if not len(blocks):
+            blocks = np.array([int(np.argmin(((block_coords - centres[d]) ** 2).sum(axis=1)))])
+        p = block_weight[blocks] / block_weight[blocks].sum()
+        block[members] = rng.choice(blocks, size=len(members), p=p)
+    coords = block_coords[block] + rng.uniform(-0.015, 0.015, size=(n_seniors, 2)) / KM_PER_DEG
+
+    features = {
+        "age": rng.integers(60, 101, n_seniors), "physical": rng.integers(1, 6, n_seniors),
+        "mental": rng.integers(1, 6, n_seniors), "dl_intervention": rng.integers(0, 2, n_seniors),
+        "rece_gov_sup": rng.integers(0, 2, n_seniors), "community": rng.integers(1, 4, n_seniors),
+        "making_ends_meet": rng.integers(1, 4, n_seniors), "living_situation": rng.integers(1, 5, n_seniors),
+        "overall_wellbeing": rng.integers(1, 4, n_seniors),
+    }
+    columns = {name: values.tolist() for name, values in features.items()}
+    lat, lng = np.round(coords, 6).T.tolist()
+    district_names = [names[d] for d in district.tolist()]
+    seniors = [
+        {"uid": f"senior-{i}", "name": f"Senior {i}", "coords": {"lat": lat[i], "lng": lng[i]},
+         "constituency_name": district_names[i], **{name: columns[name][i] for name in columns},
+         "has_dl_intervened": False, "last_visit": None}
+        for i in range(n_seniors)
+    ]
+
+    vol_district = rng.choice(len(names), size=n_volunteers, p=weights)
+    vol_coords = centres[vol_district] + rng.normal(scale=2.0 / KM_PER_DEG, size=(n_volunteers, 2))
+    anywhere = rng.random(n_volunteers) < 0.1
+    vol_coords[anywhere] = np.column_stack([rng.uniform(1.28, 1.45, anywhere.sum()),
+                                            rng.uniform(103.65, 104.0, anywhere.sum())])
+    vlat, vlng = np.round(vol_coords, 6).T.tolist()
+    skills = rng.integers(1, 4, n_volunteers).tolist()
+    outside = (rng.random(n_volunteers) < 0.3).tolist()
+    volunteers = [
+        {"vid": f"volunteer-{i}", "name": f"Volunteer {i}", "email": f"volunteer{i}@example.com",
+         "coords": {"lat": vlat[i], "lng": vlng[i]}, "skill": skills[i], "prefers_outside": outside[i]}
+        for i in range(n_volunteers)
+    ]
+    return seniors, volunteers
+
+
+class LocalSMTPServer:
+    """
+    Minimal threaded SMTP stand-in on localhost (no TLS, no auth) that counts
+    connections and messages. connect_latency delays the greeting, standing in
+    for the TCP/STARTTLS/login round trips of a real server; message_latency
+    delays the reply to each message. drop_every=N closes the connection
+    instead of accepting every Nth message, to exercise retries.
+    """
+
+    def __init__(self, connect_latency=0.0, message_latency=0.0, drop_every=0):
+        import socketserver
+        import threading
+
+        server = self
+        self.connect_latency = connect_latency
+        self.message_latency = message_latency
+        self.drop_every = drop_every
+        self.connections = 0
+        self.attempts = 0
+        self.messages = []
+        self._lock = threading.Lock()
+
+        class Handler(socketserver.StreamRequestHandler):
+            def reply(self, line):
+                self.wfile.write(line.encode() + b"\r\n")
+
+            def handle(self):
+                with server._lock:
+                    server.connections += 1
+                time.sleep(server.connect_latency)
+                self.reply("220 localhost ready")
+                recipients = []
+                while True:
+                    line = self.rfile.readline()
+                    if not line:
+                        return
+                    command = line.decode(errors="replace").strip()
+                    verb = command[:4].upper()
+                    if verb == "EHLO":
+                        self.reply("250-localhost")
+                        self.reply("250 8BITMIME")
+                    elif verb == "HELO":
+                        self.reply("250 localhost")
+                    elif verb == "MAIL":
+                        recipients = []
+                        self.reply("250 OK")
+                    elif verb == "RCPT":
+                        recipients.append(command.split(":", 1)[1].strip(" <>"))
+                        self.reply("250 OK")
+                    elif verb == "DATA":
+                        self.reply("354 End data with <CR><LF>.<CR><LF>")
+                        while self.rfile.readline() not in (b".\r\n", b".\n", b""):
+                            pass
+                        time.sleep(server.message_latency)
+                        with server._lock:
+                            server.attempts += 1
+                            dropped = server.drop_every and server.attempts % server.drop_every == 0
+                            if not dropped:
+                                server.messages.extend(recipients)
+                        if dropped:
+                            return
+                        self.reply("250 OK")
+                    elif verb == "QUIT":
+                        self.reply("221 Bye")
+                        return
+                    else:  # RSET, NOOP
+                        self.reply("250 OK")
+
+        class Server(socketserver.ThreadingTCPServer):
+            daemon_threads = True
+            allow_reuse_address = True
+
+        self._server = Server(("127.0.0.1", 0), Handler)
+        self.port = self._server.server_address[1]
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+
+    def close(self):
+        self._server.shutdown()
+        self._server.server_close()
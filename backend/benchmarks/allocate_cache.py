@@ -0,0 +1,77 @@
+"""
+/allocate repeated with an identical payload: computed vs served from allocation_cache.
+
+Posts the same seniors and volunteers --repeats times through the router, once
+with an in-memory cache and once with a fresh PersistentLRUCache re-opened
+from disk (as after a worker restart). Reports the first (miss) and repeat
+(hit) latencies, the time spent hashing the payload, and checks that hits
+return the same assignments and cluster membership as the computed response.
+
+    python benchmarks/allocate_cache.py --seniors 20000 --volunteers 4000
+"""
+import argparse
+import copy
+import tempfile
+
+import numpy as np
+
+from _support import FakeSupabase, timed, make_seniors, make_volunteers
+
+from fastapi import Response # type: ignore
+
+import routers.assignment as assignment
+import services.allocation as allocation
+import services.clustering as clustering
+import services.registry as registry
+from utils.cache import PersistentLRUCache
+
+
+def membership(result):
+    return [(c["id"], [s["uid"] for s in c["seniors"]]) for c in result["clusters"]]
+
+
+def run(payload, repeats):
+    times, results, headers = [], [], []
+    for _ in range(repeats):
+        response = Response()
+        result, seconds = timed(assignment.allocate_volunteers, copy.deepcopy(payload), response)
+        times.append(seconds)
+        results.append(result)
+        headers.append(response.headers["X-Allocation-Cache"])
+    same = all(r["assignments"] == results[0]["assignments"] and membership(r) == membership(results[0])
+               for r in results[1:])
+    return times, headers, same
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--seniors", type=int, default=20000)
+    parser.add_argument("--volunteers", type=int, default=4000)
+    parser.add_argument("--repeats", type=int, default=5)
+    args = parser.parse_args()
+
+    # Nothing the router reads or writes leaves the process
+    assignment.supabase = allocation.supabase = clustering.supabase = registry.supabase = FakeSupabase(
+        {"clusters": [], "cluster_seeds": [], "constituency": []})
+    # The default payload: incremental, so a miss warm-starts from and replaces the persisted seed
+    payload = {"seniors": make_seniors(args.seniors), "volunteers": make_volunteers(args.volunteers)}
+    _, key_s = timed(allocation.allocation_key, payload["seniors"], payload["volunteers"], payload)
+
+    print(f"{args.seniors} seniors, {args.volunteers} volunteers; hashing the payload takes {key_s * 1000:.1f} ms")
+    times, headers, same = run(payload, args.repeats)
+    print(f"  memory  first ({headers[0]}) {times[0]:>8.3f} s   repeats ({headers[-1]}) "
+          f"median {np.median(times[1:]) * 1000:.1f} ms   identical={same}")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        assignment.allocation_cache = PersistentLRUCache(tmp, maxsize=8, ttl=3600)
+        run(payload, 1)
+        # A new process would start with an empty memory cache over the same directory
+        assignment.allocation_cache = PersistentLRUCache(tmp, maxsize=8, ttl=3600)
+        times, headers, same = run(payload, args.repeats)
+        print(f"  disk    after restart ({headers[0]}) {times[0] * 1000:>7.1f} ms   repeats ({headers[-1]}) "
+              f"median {np.median(times[1:]) * 1000:.1f} ms   identical={same}")
+        print(f"  {assignment.allocation_cache.stats()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+"""
+Island-wide /allocate in one piece vs sharded by constituency over a process pool.
+
+Seniors are placed around the 20 neighbourhood centres from add.py. The
+single run clusters and matches everyone at once; the sharded run
+(allocate_by_constituency) does each constituency separately in --workers
+processes. Reports wall time, cluster count, how many cluster ids are
+unique after the merge, and the mean weighted distance per assigned volunteer
+(sharding can only match volunteers within their nearest constituency).
+
+    python benchmarks/allocate_constituency.py --seniors 100000 --volunteers 20000 --workers 8
+"""
+import argparse
+import copy
+import os
+
+import numpy as np
+
+from _support import FakeSupabase, timed, make_volunteers, make_district_seniors, constituency_rows
+
+import services.allocation as allocation
+import services.clustering as clustering
+import services.registry as registry
+
+
+def summary(name, seconds, result):
+    ids = [c["id"] for c in result["clusters"]]
+    labelled = {s["uid"]: s["cluster"] for c in result["clusters"] for s in c["seniors"]}
+    consistent = all(labelled[s["uid"]] == c["id"] for c in result["clusters"] for s in c["seniors"])
+    distances = [a["weighted_distance"] for a in result["assignments"]]
+    print(f"  {name:<16} {seconds:>8.2f} s  clusters={len(ids):<6} unique ids={len(set(ids)) == len(ids)!s:<5} "
+          f"seniors labelled consistently={consistent!s:<5} assigned={len(distances):<6} "
+          f"mean weighted km={np.mean(distances) if distances else 0:.3f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--seniors", type=int, default=20000)
+    parser.add_argument("--volunteers", type=int, default=4000)
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    args = parser.parse_args()
+
+    registry.supabase = clustering.supabase = FakeSupabase({"constituency": constituency_rows(), "cluster_seeds": []})
+    seniors = make_district_seniors(args.seniors)
+    volunteers = make_volunteers(args.volunteers)
+    options = {"incremental": False}
+
+    print(f"{args.seniors} seniors, {args.volunteers} volunteers, {args.workers} workers")
+    (single, _, _, _), single_s = timed(allocation.allocate, copy.deepcopy(seniors), volunteers, options)
+    summary("single", single_s, single)
+    (sharded, _, _, _), sharded_s = timed(allocation.allocate_by_constituency, copy.deepcopy(seniors),
+                                       volunteers, options, workers=args.workers)
+    summary("by constituency", sharded_s, sharded)
+    print(f"  speedup {single_s / sharded_s:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
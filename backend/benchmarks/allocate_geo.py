@@ -0,0 +1,109 @@
+"""
+/allocate with the vectorized geo kernel vs the per-pair Python loops.
+
+KMeans runs once and its result is handed to both versions, so the timings
+cover only cluster radius/density and volunteer placement (steps 2-4). The legacy version
+measured planar degrees; the new one measures km, so radii and weighted
+distances change units. The chosen cluster per volunteer only differs on
+near-ties (weighted distances within ~0.01%), where haversine and planar
+degrees rank two clusters differently; the run fails if over 1% differ.
+
+    python benchmarks/allocate_geo.py --seniors 10000 --volunteers 1000
+"""
+import argparse
+import copy
+
+from _support import FakeSupabase, timed, make_seniors, make_volunteers
+
+from fastapi import Response # type: ignore
+
+import routers.assignment
+import services.allocation
+import services.clustering
+import services.registry
+from routers.assignment import allocate_volunteers
+from utils.helpers import kmeans_clusters, cluster_density, distance
+
+_kmeans_result = None
+
+
+def precomputed_kmeans(coords_list, n_clusters, incremental=True, seed=None):
+    return _kmeans_result
+
+
+def legacy_allocate(data):
+    """allocate_volunteers before utils.geo (degree distances, nested loops)"""
+    volunteers = data.get("volunteers", [])
+    seniors = data.get("seniors", [])
+    target_ratio = 3
+    recommended_clusters = max(1, len(seniors) // (target_ratio * max(1, len(volunteers))))
+    min_clusters = max(1, len(seniors) // 6)
+    max_clusters = len(seniors) // 2
+    n_clusters = max(min_clusters, min(recommended_clusters, max_clusters))
+    labels, centroids = precomputed_kmeans([s['coords'] for s in seniors], n_clusters)
+    clusters = {i: [] for i in range(n_clusters)}
+    for idx, senior in enumerate(seniors):
+        clusters[int(labels[idx])].append(senior)
+
+    cluster_density_map = {}
+    cluster_radius_map = {}
+    volunteers_per_cluster = {i: 0 for i in range(n_clusters)}
+    for cluster_id, cluster_seniors in clusters.items():
+        cluster_density_map[cluster_id] = float(cluster_density(cluster_seniors))
+        centroid = {'lat': float(centroids[cluster_id][0]), 'lng': float(centroids[cluster_id][1])}
+        max_distance = max((distance(s['coords'], centroid) for s in cluster_seniors), default=0)
+        cluster_radius_map[cluster_id] = max(max_distance * 1.1, 0.2)
+
+    assignments = []
+    for vol in volunteers:
+        best_cluster, min_weighted_dist = None, float('inf')
+        for cluster_id, cluster_seniors in clusters.items():
+            if not cluster_seniors:
+                continue
+            centroid = {'lat': float(centroids[cluster_id][0]), 'lng': float(centroids[cluster_id][1])}
+            weighted_dist = (distance(vol['coords'], centroid)
+                             * (1 + volunteers_per_cluster[cluster_id] / max(1, len(cluster_seniors)))
+                             / max(0.1, cluster_density_map[cluster_id]))
+            if vol.get('prefers_outside', False):
+                weighted_dist *= 0.8
+            if weighted_dist < min_weighted_dist:
+                min_weighted_dist, best_cluster = weighted_dist, cluster_id
+        if best_cluster is not None:
+            volunteers_per_cluster[best_cluster] += 1
+            assignments.append({"volunteer": vol['vid'], "cluster": best_cluster})
+    return {"assignments": assignments, "cluster_radius": cluster_radius_map}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--seniors", type=int, default=10000)
+    parser.add_argument("--volunteers", type=int, default=1000)
+    args = parser.parse_args()
+
+    seniors = make_seniors(args.seniors)
+    volunteers = make_volunteers(args.volunteers)
+    n_volunteers = max(1, len(volunteers))
+    n_clusters = max(max(1, len(seniors) // 6), min(max(1, len(seniors) // (3 * n_volunteers)), len(seniors) // 2))
+    global _kmeans_result
+    _kmeans_result, kmeans_s = timed(kmeans_clusters, [s['coords'] for s in seniors], n_clusters)
+    services.allocation.fit_clusters = precomputed_kmeans
+    # The router persists its seed and may read constituencies; keep both in memory
+    routers.assignment.supabase = services.allocation.supabase = services.clustering.supabase = \
+        services.registry.supabase = FakeSupabase({"cluster_seeds": [], "constituency": []})
+
+    legacy, legacy_s = timed(legacy_allocate, {"seniors": copy.deepcopy(seniors), "volunteers": volunteers})
+    new, new_s = timed(allocate_volunteers, {"seniors": copy.deepcopy(seniors), "volunteers": volunteers,
+                                           "solver": "greedy", "split": False, "cache": False}, Response())
+
+    same = sum(a["cluster"] == b["cluster"] for a, b in zip(legacy["assignments"], new["assignments"]))
+    print(f"{args.seniors} seniors, {args.volunteers} volunteers, {n_clusters} clusters "
+          f"(KMeans {kmeans_s:.2f}s, shared)")
+    print(f"  legacy {legacy_s * 1000:>9.1f} ms")
+    print(f"  geo    {new_s * 1000:>9.1f} ms ({legacy_s / new_s:.0f}x)")
+    print(f"  same cluster for {same}/{len(legacy['assignments'])} volunteers")
+    if len(legacy["assignments"]) - same > 0.01 * len(legacy["assignments"]):
+        raise SystemExit("assignments differ from the legacy allocation beyond near-ties")
+
+
+if __name__ == "__main__":
+    main()
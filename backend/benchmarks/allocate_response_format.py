@@ -0,0 +1,65 @@
+"""
+/allocate response size and serialization time: nested senior dicts vs "format": "compact".
+
+Runs one allocation, then serializes the result the way FastAPI does for the
+default shape (jsonable_encoder + json.dumps) and the compact columnar shape
+with utils.serialization.dumps (orjson when installed, stdlib json otherwise),
+and compresses each body with gzip and, when installed, brotli.
+
+    python benchmarks/allocate_response_format.py --seniors 20000 --volunteers 4000
+"""
+import argparse
+import gzip
+import json
+
+from _support import FakeSupabase, timed, make_seniors, make_volunteers
+
+from fastapi.encoders import jsonable_encoder # type: ignore
+
+import services.allocation as allocation
+import services.clustering as clustering
+from utils import serialization
+
+
+def fastapi_dumps(result):
+    # What fastapi's JSONResponse does with a returned dict
+    return json.dumps(jsonable_encoder(result), ensure_ascii=False, allow_nan=False,
+                      indent=None, separators=(",", ":")).encode()
+
+
+def report(name, body, seconds):
+    line = f"  {name:<22} {len(body) / 1e6:>8.2f} MB  {seconds * 1000:>8.1f} ms"
+    gz, gz_s = timed(gzip.compress, body, compresslevel=serialization.GZIP_LEVEL)
+    line += f"   gzip {len(gz) / 1e6:>6.2f} MB {gz_s * 1000:>7.1f} ms"
+    if serialization.brotli is not None:
+        br, br_s = timed(serialization.brotli.compress, body, quality=serialization.BROTLI_QUALITY)
+        line += f"   br {len(br) / 1e6:>6.2f} MB {br_s * 1000:>7.1f} ms"
+    print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--seniors", type=int, default=20000)
+    parser.add_argument("--volunteers", type=int, default=4000)
+    args = parser.parse_args()
+
+    clustering.supabase = FakeSupabase({"clusters": [], "cluster_seeds": []})
+    seniors = make_seniors(args.seniors)
+    result, centroids, radius, _ = allocation.allocate(seniors, make_volunteers(args.volunteers), {"incremental": False})
+
+    print(f"{args.seniors} seniors, {len(result['clusters'])} clusters, {len(result['assignments'])} assignments "
+          f"(encoder: {'orjson' if serialization.orjson is not None else 'json'}, "
+          f"brotli {'installed' if serialization.brotli is not None else 'not installed'})")
+    body, seconds = timed(fastapi_dumps, result)
+    report("nested (fastapi)", body, seconds)
+    compact, build_s = timed(allocation.compact_response, result, seniors, centroids, radius)
+    body, seconds = timed(serialization.dumps, compact)
+    report("compact", body, build_s + seconds)
+    orjson, serialization.orjson = serialization.orjson, None
+    body, seconds = timed(serialization.dumps, compact)
+    serialization.orjson = orjson
+    report("compact (stdlib json)", body, build_s + seconds)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""
+Capacity-aware min-cost volunteer assignment vs the greedy one-at-a-time pass.
+
+Clusters synthetic seniors once, then assigns volunteers both ways and
+reports latency and quality:
+  cost     - total solver cost (weighted km with capacity and skill terms)
+  km       - mean distance from a volunteer to their cluster centroid
+  over     - volunteers placed beyond a cluster's capacity
+  uncovered- populated clusters left without a volunteer
+  skill    - mean skill of volunteers in clusters that are >50% high-risk
+  order    - share of volunteers whose cluster changes when the input is shuffled
+
+    python benchmarks/allocation_solver.py --cases 3000:1000 10000:1000 6000:3000 1500:3000
+"""
+import argparse
+
+import numpy as np
+
+from _support import timed, make_seniors, make_volunteers
+
+from services.allocation import (cluster_capacity, greedy_assignments, solve_assignments,
+                                 OVERFLOW_PENALTY, SKILL_WEIGHT, PREFERS_OUTSIDE_DISCOUNT)
+from utils.geo import coords_array, cluster_counts, cluster_bbox_density, haversine_km, KM_PER_DEG
+from utils.helpers import kmeans_clusters
+
+
+def solver_cost(chosen, dist, sizes, capacity, density_factor, skills, prefers, high_risk_share):
+    """Objective of solve_assignments for any assignment (nearest volunteers fill the cheap slots)"""
+    total = 0.0
+    affinity = 1 - SKILL_WEIGHT * ((skills - 1) / 2)[:, None] * high_risk_share[None, :]
+    vol_factor = np.where(prefers, PREFERS_OUTSIDE_DISCOUNT, 1.0)
+    for c in np.unique(chosen[chosen >= 0]):
+        members = np.flatnonzero(chosen == c)
+        costs = np.sort(dist[members, c] * affinity[members, c] * vol_factor[members])[::-1]
+        rank = np.arange(len(members))
+        mult = (1 + rank / max(1, sizes[c])) * density_factor[c] * np.where(rank >= capacity[c], OVERFLOW_PENALTY, 1.0)
+        total += float((costs * mult).sum())
+    return total
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--cases", nargs="+", default=["3000:1000", "10000:1000", "6000:3000", "1500:3000"],
+                        help="seniors:volunteers pairs")
+    args = parser.parse_args()
+
+    print(f"{'case':>12} {'solver':>8} {'ms':>8} {'cost':>10} {'km':>6} {'over':>5} {'uncovered':>9} "
+          f"{'skill':>6} {'order':>6}")
+    for case in args.cases:
+        n_seniors, n_volunteers = map(int, case.split(":"))
+        seniors = make_seniors(n_seniors)
+        volunteers = make_volunteers(n_volunteers)
+        X = coords_array(seniors)
+        n_clusters = max(max(1, n_seniors // 6), min(max(1, n_seniors // (3 * n_volunteers)), n_seniors // 2))
+        labels, centroids = kmeans_clusters(X, n_clusters)
+
+        sizes = cluster_counts(labels, n_clusters)
+        density = cluster_bbox_density(X, labels, n_clusters)
+        density_factor = 1 / np.maximum(0.1 / KM_PER_DEG ** 2, density)
+        capacity = cluster_capacity(sizes, density)
+        high_risk_share = np.bincount(labels, weights=[s["overall_wellbeing"] == 1 for s in seniors],
+                                      minlength=n_clusters) / np.maximum(1, sizes)
+        V = coords_array(volunteers)
+        skills = np.array([v["skill"] for v in volunteers], dtype=np.float64)
+        prefers = np.array([v["prefers_outside"] for v in volunteers])
+        dist = haversine_km(V, centroids)
+        perm = np.random.default_rng(0).permutation(n_volunteers)
+
+        runs = {
+            "greedy": lambda V, s, p: greedy_assignments(V, centroids, sizes, density_factor, p),
+            "optimal": lambda V, s, p: solve_assignments(V, centroids, sizes, density_factor, capacity,
+                                                         skills=s, prefers_outside=p,
+                                                         high_risk_share=high_risk_share),
+        }
+        for name, run in runs.items():
+            (chosen, _), seconds = timed(run, V, skills, prefers)
+            shuffled, _ = run(V[perm], skills[perm], prefers[perm])
+            order_changed = float(np.mean(shuffled != chosen[perm]))
+
+            placed = np.bincount(chosen[chosen >= 0], minlength=n_clusters)
+            risky = np.isin(chosen, np.flatnonzero(high_risk_share > 0.5))
+            print(f"{case:>12} {name:>8} {seconds * 1000:>8.1f} "
+                  f"{solver_cost(chosen, dist, sizes, capacity, density_factor, skills, prefers, high_risk_share):>10.2f} "
+                  f"{dist[np.arange(n_volunteers), chosen].mean():>6.2f} "
+                  f"{int(np.maximum(placed - capacity, 0).sum()):>5} "
+                  f"{int(((placed == 0) & (sizes > 0)).sum()):>9} "
+                  f"{skills[risky].mean() if risky.any() else float('nan'):>6.2f} {order_changed:>6.1%}")
+
+
+if __name__ == "__main__":
+    main()
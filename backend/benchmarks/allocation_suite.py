@@ -0,0 +1,212 @@
+"""
+Allocation benchmark suite on synthetic island-wide populations.
+
+For every --sizes N, generates N seniors and N * --volunteer-ratio volunteers
+around the SINGAPORE_NEIGHBOURHOODS centres (make_population) and measures,
+with wall time and peak traced memory for each stage:
+
+  generate       building the senior/volunteer rows
+  kmeans         utils.helpers.kmeans_clusters at the /allocate cluster count
+  cluster_density  utils.helpers.cluster_density over every cluster
+  allocate       services.allocation.allocate, with its per-step timings
+                 (fit, split, group, density_radius, assign_volunteers, output)
+
+A full KMeans fit grows with N x clusters, so above --kmeans-limit seniors the
+kmeans stage is skipped, the clusters for cluster_density come from
+split_clusters alone, and allocate is warm-started from those centroids (the
+path a repeat allocation takes) instead of fitting from scratch. Likewise the
+optimal volunteer matching grows faster than linearly, so above
+--solver-limit volunteers the greedy pass is used. Each result records which
+fit and solver ran.
+
+Results go to --output as JSON along with the commit, library versions and
+arguments. --compare BASELINE prints the time ratio of every stage and step
+against an earlier results file and exits with 1 if any exceeds --tolerance.
+--profile DIR also writes a cProfile dump per size and stage.
+
+    python benchmarks/allocation_suite.py --sizes 1000 10000 100000 1000000 --output results.json
+    python benchmarks/allocation_suite.py --sizes 1000 10000 --compare results.json
+"""
+import argparse
+import cProfile
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+from _support import FakeSupabase, make_population
+
+import services.allocation as allocation
+import services.clustering as clustering
+from services.clustering import split_clusters
+from utils.geo import coords_array
+from utils.helpers import kmeans_clusters, cluster_density
+
+
+def measure(name, fn, profile_dir=None, size=None):
+    """Run fn once; returns (result, {"seconds", "peak_mb"})"""
+    profiler = cProfile.Profile() if profile_dir else None
+    tracemalloc.start()
+    start = time.perf_counter()
+    if profiler:
+        profiler.enable()
+    result = fn()
+    if profiler:
+        profiler.disable()
+    seconds = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    stats = {"seconds": round(seconds, 4), "peak_mb": round(peak / 2 ** 20, 1)}
+    if profiler:
+        path = os.path.join(profile_dir, f"{size}_{name}.prof")
+        profiler.dump_stats(path)
+        stats["profile"] = path
+    return result, stats
+
+
+def run_size(n, args):
+    n_volunteers = max(1, int(n * args.volunteer_ratio))
+    stages = {}
+    (seniors, volunteers), stages["generate"] = measure(
+        "generate", lambda: make_population(n, n_volunteers, seed=args.seed), args.profile, n)
+    X = coords_array(seniors)
+    n_clusters = allocation.cluster_count(n, n_volunteers)
+
+    cold = n <= args.kmeans_limit
+    if cold:
+        (labels, centroids), stages["kmeans"] = measure(
+            "kmeans", lambda: kmeans_clusters(X, n_clusters), args.profile, n)
+    else:
+        stages["kmeans"] = {"skipped": f"over --kmeans-limit {args.kmeans_limit}"}
+        # Clusters for the later stages straight from the splitter, starting from one cluster
+        (labels, centroids, _), stages["split_only"] = measure(
+            "split_only", lambda: split_clusters(X, np.zeros(n, dtype=np.intp), X.mean(axis=0, keepdims=True)),
+            args.profile, n)
+
+    members = [[] for _ in range(len(centroids))]
+    for senior, label in zip(seniors, labels.tolist()):
+        members[label].append(senior)
+    _, stages["cluster_density"] = measure(
+        "cluster_density", lambda: [cluster_density(m) for m in members], args.profile, n)
+
+    steps = {}
+    solver = args.solver if n_volunteers <= args.solver_limit else "greedy"
+    options = {"incremental": not cold, "solver": solver}
+    seed = None if cold else centroids
+    (result, _, _, _), stages["allocate"] = measure(
+        "allocate", lambda: allocation.allocate(seniors, volunteers, options, seed=seed, timings=steps),
+        args.profile, n)
+
+    return {
+        "seniors": n,
+        "volunteers": n_volunteers,
+        "initial_clusters": n_clusters,
+        "clusters": len(result["clusters"]),
+        "assigned": len(result["assignments"]),
+        "fit": "full" if cold else "warm start from split_clusters",
+        "solver": solver,
+        "stages": stages,
+        "allocate_steps": {step: round(seconds, 4) for step, seconds in steps.items()},
+        "max_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+    }
+
+
+def environment(args):
+    try:
+        commit = subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        commit = None
+    import scipy
+    import sklearn
+    return {
+        "commit": commit,
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "scipy": scipy.__version__,
+        "sklearn": sklearn.__version__,
+        "cpu_count": os.cpu_count(),
+        "args": vars(args),
+    }
+
+
+def timings_of(result):
+    """{(seniors, "stage" or "allocate.step"): seconds} for comparison"""
+    out = {}
+    for stage, stats in result["stages"].items():
+        if "seconds" in stats:
+            out[(result["seniors"], stage)] = stats["seconds"]
+    for step, seconds in result["allocate_steps"].items():
+        out[(result["seniors"], f"allocate.{step}")] = seconds
+    return out
+
+
+def compare(results, baseline_path, tolerance):
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+    before = {k: v for r in baseline["results"] for k, v in timings_of(r).items()}
+    regressions = 0
+    print(f"\nvs {baseline_path} (commit {baseline['environment'].get('commit')}):")
+    for r in results:
+        for key, seconds in timings_of(r).items():
+            if key not in before:
+                continue
+            # Sub-10 ms timings are mostly noise
+            ratio = seconds / max(before[key], 1e-2)
+            flag = ""
+            if ratio > tolerance and seconds > 0.01:
+                flag = "  REGRESSION"
+                regressions += 1
+            print(f"  {key[0]:>8} {key[1]:<30} {before[key]:>9.3f} s -> {seconds:>9.3f} s  x{ratio:.2f}{flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000, 1000000])
+    parser.add_argument("--volunteer-ratio", type=float, default=0.2, help="volunteers per senior")
+    parser.add_argument("--solver", choices=("optimal", "greedy"), default="optimal")
+    parser.add_argument("--kmeans-limit", type=int, default=20000,
+                        help="largest N that gets a full KMeans fit (cold allocation)")
+    parser.add_argument("--solver-limit", type=int, default=50000,
+                        help="most volunteers given to --solver; more use the greedy pass")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default="allocation_results.json")
+    parser.add_argument("--compare", metavar="BASELINE", help="earlier --output file to compare against")
+    parser.add_argument("--tolerance", type=float, default=1.25, help="slowdown ratio counted as a regression")
+    parser.add_argument("--profile", metavar="DIR", help="write a cProfile dump per size and stage")
+    args = parser.parse_args()
+
+    clustering.supabase = allocation.supabase = FakeSupabase({"clusters": [], "cluster_seeds": []})
+    if args.profile:
+        os.makedirs(args.profile, exist_ok=True)
+
+    results = []
+    for n in args.sizes:
+        result = run_size(n, args)
+        results.append(result)
+        stages = "  ".join(f"{name} {s['seconds']:.2f}s/{s['peak_mb']:.0f}MB"
+                           for name, s in result["stages"].items() if "seconds" in s)
+        steps = "  ".join(f"{step} {seconds:.2f}s" for step, seconds in result["allocate_steps"].items())
+        print(f"{n:>8} seniors, {result['volunteers']} volunteers, {result['clusters']} clusters "
+              f"({result['fit']}, {result['solver']} solver)")
+        print(f"           {stages}")
+        print(f"           allocate: {steps}")
+
+    with open(args.output, "w") as f:
+        json.dump({"environment": environment(args), "results": results}, f, indent=2)
+    print(f"wrote {args.output}")
+
+    if args.compare and compare(results, args.compare, args.tolerance):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
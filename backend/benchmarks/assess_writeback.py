@@ -0,0 +1,91 @@
+"""
+Round-trips and wall time of the /assess write-back, before and after batching.
+
+"before" replays the old per-senior loop (select old value, update, re-select);
+"after" calls services.assessments.classify_seniors; "repeat" calls it again
+on the rows as persisted by "after", where every feature fingerprint matches
+and nothing is rescored. "no fn" runs it where update_senior_scores isn't
+deployed: every senior is rescored but only changed scores are written, and a
+repeat writes nothing. All run against the in-memory Supabase stand-in with a
+simulated per-request latency.
+
+    python benchmarks/assess_writeback.py --sizes 100 1000 5000 --latency-ms 2
+"""
+import argparse
+import os
+import tempfile
+
+import pandas as pd
+
+from _support import FakeSupabase, build_model_artifact, make_seniors, timed, update_senior_scores
+
+from services import assessments
+from services.model_registry import ModelRegistry, prepare_risk_model
+
+
+def legacy_write_back(client, seniors, predictions):
+    """The write loop classify_seniors used before bulk upserts"""
+    changes = {}
+    for i, senior in enumerate(seniors):
+        old_row = client.table("seniors").select("overall_wellbeing").eq("uid", senior["uid"]).single().execute()
+        old_value = old_row.data["overall_wellbeing"] if old_row.data else None
+        client.table("seniors").update({"overall_wellbeing": int(predictions[i])}).eq("uid", senior['uid']).execute()
+        new_row = client.table("seniors").select("name, uid, overall_wellbeing").eq("uid", senior['uid']).single().execute()
+        new_value = new_row.data["overall_wellbeing"]
+        if old_value != new_value:
+            changes[new_row.data["name"]] = [old_value, new_value, new_row.data["uid"]]
+    return changes
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 1000, 5000])
+    parser.add_argument("--latency-ms", type=float, default=2.0, help="simulated latency per Supabase request")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        registry = ModelRegistry(build_model_artifact(os.path.join(tmp, "senior_risk_model.pkl")),
+                                 prepare=prepare_risk_model)
+        assessments.risk_model_registry = registry
+
+        print(f"{'seniors':>8} {'path':>7} {'round-trips':>12} {'seconds':>9} {'changes':>8}")
+        for n in args.sizes:
+            seniors = make_seniors(n)
+
+            client = FakeSupabase({"seniors": seniors}, latency=args.latency_ms / 1000)
+            model_data = registry.get()
+            predictions = model_data["model"].predict(pd.DataFrame(seniors)[model_data["feature_names"]].to_numpy())
+            before, before_s = timed(legacy_write_back, client, seniors, predictions)
+            print(f"{n:>8} {'before':>7} {client.round_trips:>12} {before_s:>9.3f} {len(before):>8}")
+
+            client = FakeSupabase({"seniors": seniors}, latency=args.latency_ms / 1000,
+                                  functions={"update_senior_scores": update_senior_scores})
+            assessments.supabase = client
+            assessments._store_fingerprints = True
+            after, after_s = timed(assessments.classify_seniors, {"seniors": seniors})
+            print(f"{n:>8} {'after':>7} {client.round_trips:>12} {after_s:>9.3f} {len(after):>8}")
+
+            if before != after:
+                raise SystemExit(f"changes differ for {n} seniors")
+
+            persisted = client.tables["seniors"]
+            client.round_trips = 0
+            stats = {}
+            repeat, repeat_s = timed(assessments.classify_seniors, {"seniors": persisted}, stats=stats)
+            print(f"{n:>8} {'repeat':>7} {client.round_trips:>12} {repeat_s:>9.3f} {len(repeat):>8}"
+                  f"  (rescored {stats['rescored']}, skipped {stats['skipped']})")
+
+            client = FakeSupabase({"seniors": seniors}, latency=args.latency_ms / 1000)
+            assessments.supabase = client
+            fallback, fallback_s = timed(assessments.classify_seniors, {"seniors": seniors})
+            if fallback != before:
+                raise SystemExit(f"changes differ for {n} seniors without {assessments.SCORES_RPC}")
+            fallback_trips, client.round_trips = client.round_trips, 0
+            stats = {}
+            timed(assessments.classify_seniors, {"seniors": client.tables["seniors"]}, stats=stats)
+            print(f"{n:>8} {'no fn':>7} {fallback_trips:>12} {fallback_s:>9.3f} {len(fallback):>8}"
+                  f"  (repeat: rescored {stats['rescored']}, wrote {stats['written']} in {client.round_trips} round trips)")
+
+
+if __name__ == "__main__":
+    main()
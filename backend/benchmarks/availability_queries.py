@@ -0,0 +1,88 @@
+"""
+"Who is free on this day from start to end" through AvailabilityIndex vs scanning every row.
+
+The scan is what answering from the availabilities table takes today: walk
+every row, parse its string times and check whether one of a volunteer's
+windows covers the interval. Times are generated on 15-minute boundaries, so
+both answer exactly the same; results are checked to match. Also times
+per-bucket coverage counts and single volunteer-day updates (as upload_slots
+applies them) against a full rebuild.
+
+    python benchmarks/availability_queries.py --volunteers 10000 --weeks 4 --queries 200
+"""
+import argparse
+from datetime import date, timedelta
+
+import numpy as np
+
+from _support import FakeSupabase, timed
+
+import services.availability_index as availability_index
+from services.availability_index import AvailabilityIndex, clock_seconds
+
+
+def make_rows(n_volunteers, weeks, rng):
+    """Windows on two to five days per volunteer per week, 08:00-22:00 on quarter hours, one per day"""
+    start = date(2026, 1, 5)
+    rows = []
+    for v in range(n_volunteers):
+        for offset in rng.choice(7 * weeks, size=int(rng.integers(2, 6)) * weeks, replace=False).tolist():
+            day = start + timedelta(days=offset)
+            begin = int(rng.integers(32, 80))
+            end = min(88, begin + int(rng.integers(4, 20)))
+            rows.append({"volunteer_email": f"volunteer{v}@example.com", "date": day.isoformat(),
+                         "start_t": f"{begin // 4:02d}:{begin % 4 * 15:02d}:00",
+                         "end_t": f"{end // 4:02d}:{end % 4 * 15:02d}:00"})
+    return rows
+
+
+def scan_free(rows, day, start, end):
+    s, e = clock_seconds(start), clock_seconds(end)
+    return sorted({row["volunteer_email"] for row in rows
+                   if row["date"] == day and clock_seconds(row["start_t"]) <= s and e <= clock_seconds(row["end_t"])})
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--volunteers", type=int, default=10000)
+    parser.add_argument("--weeks", type=int, default=4)
+    parser.add_argument("--queries", type=int, default=200)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    rows = make_rows(args.volunteers, args.weeks, rng)
+    availability_index.supabase = FakeSupabase({"availabilities": rows})
+    index = AvailabilityIndex()
+    _, build_s = timed(index.coverage, "2026-01-05")
+
+    days = [(date(2026, 1, 5) + timedelta(days=int(d))).isoformat() for d in rng.integers(0, 7 * args.weeks, args.queries)]
+    begins = rng.integers(32, 84, args.queries)
+    lengths = rng.integers(2, 9, args.queries)
+    queries = [(day, f"{b // 4:02d}:{b % 4 * 15:02d}", f"{(b + n) // 4:02d}:{(b + n) % 4 * 15:02d}")
+               for day, b, n in zip(days, begins.tolist(), lengths.tolist())]
+
+    for q in queries[:10]:
+        if scan_free(rows, *q) != sorted(index.free(*q)):
+            raise SystemExit("free volunteers differ from the scan")
+
+    _, scan_s = timed(lambda: [scan_free(rows, *q) for q in queries[:20]])
+    _, free_s = timed(lambda: [index.free(*q) for q in queries])
+    _, overlap_s = timed(lambda: [index.overlap(*q) for q in queries])
+    _, coverage_s = timed(lambda: [index.coverage(q[0]) for q in queries])
+    updates = [(f"volunteer{int(v)}@example.com", days[i], [("09:00:00", "12:00:00")])
+               for i, v in enumerate(rng.integers(0, args.volunteers, args.queries))]
+    _, update_s = timed(lambda: [index.set_day(*u) for u in updates])
+    _, rebuild_s = timed(index.reset, rows)
+
+    stats = index.stats()
+    print(f"{args.volunteers} volunteers, {len(rows)} availability rows, "
+          f"{stats['volunteer_days']} volunteer-days in {stats['bytes'] / 2 ** 20:.1f} MB (built in {build_s:.2f}s)")
+    print(f"  scan free      {scan_s / 20 * 1000:>9.3f} ms/query")
+    print(f"  index free     {free_s / args.queries * 1000:>9.3f} ms/query ({scan_s / 20 / (free_s / args.queries):.0f}x)")
+    print(f"  index overlap  {overlap_s / args.queries * 1000:>9.3f} ms/query")
+    print(f"  index coverage {coverage_s / args.queries * 1000:>9.3f} ms/query")
+    print(f"  set_day        {update_s / args.queries * 1000:>9.3f} ms/update vs {rebuild_s * 1000:.1f} ms rebuild")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""
+Automatic cluster count by farthest-point splitting vs a KMeans k sweep.
+
+The sweep refits KMeans at increasing k until no cluster has more than
+--max-size seniors (the classic way to pick k); the splitter fits once at the
+allocation formula's k and recursively splits only the clusters over the size
+or radius threshold. Reports wall time, final cluster count, largest cluster,
+widest radius and inertia for both.
+
+    python benchmarks/cluster_splitting.py --seniors 20000 --max-size 8
+"""
+import argparse
+
+import numpy as np
+
+from _support import timed, make_seniors
+
+from services.clustering import split_clusters, RADIUS_MEDIAN_FACTOR
+from utils.helpers import kmeans_clusters
+from utils.geo import coords_array, cluster_max_radius_km
+
+
+def inertia(X, labels, centroids):
+    return float(((X - centroids[labels]) ** 2).sum())
+
+
+def k_sweep(X, start, max_size, step):
+    k = start
+    while True:
+        labels, centroids = kmeans_clusters(X, k)
+        if np.bincount(labels).max() <= max_size or k >= len(X):
+            return labels, centroids, k
+        k = min(len(X), int(k * step))
+
+
+def report(name, seconds, X, labels, centroids):
+    sizes = np.bincount(labels, minlength=len(centroids))
+    radius = cluster_max_radius_km(X, labels, centroids)
+    print(f"  {name:<10} {seconds:>8.2f} s  k={len(centroids):<6} largest={sizes.max():<4} "
+          f"widest={radius.max():.2f} km  inertia={inertia(X, labels, centroids):.5f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--seniors", type=int, default=20000)
+    parser.add_argument("--max-size", type=int, default=8)
+    parser.add_argument("--step", type=float, default=1.25, help="k growth per sweep step")
+    parser.add_argument("--skip-sweep", action="store_true", help="only time the splitter (large N)")
+    args = parser.parse_args()
+
+    X = coords_array(make_seniors(args.seniors))
+    start = max(1, len(X) // 6)
+
+    (labels, centroids), fit_s = timed(kmeans_clusters, X, start)
+    (split_labels, split_centroids, stats), split_s = timed(
+        split_clusters, X, labels, centroids, max_size=args.max_size)
+    print(f"{args.seniors} seniors, max {args.max_size} per cluster, "
+          f"radius limit {stats['radius_limit_km']:.2f} km ({RADIUS_MEDIAN_FACTOR}x median)")
+    print(f"  initial fit at k={start}: {fit_s:.2f} s")
+    report("split", split_s, X, split_labels, split_centroids)
+    print(f"  ({stats['splits']} splits in {stats['rounds']} rounds, {fit_s + split_s:.2f} s with the initial fit)")
+
+    if not args.skip_sweep:
+        (sweep_labels, sweep_centroids, k), sweep_s = timed(k_sweep, X, start, args.max_size, args.step)
+        report("k sweep", sweep_s, X, sweep_labels, sweep_centroids)
+
+
+if __name__ == "__main__":
+    main()
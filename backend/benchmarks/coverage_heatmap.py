@@ -0,0 +1,118 @@
+"""
+/coverage heatmap: CoverageGrid vs aggregating every volunteer's slots one row at a time.
+
+The row-by-row version is what a DL page has to do today: take each
+volunteer's /get_slots rows, find their constituency and add every 15-minute
+bucket of every window to a per-constituency, per-day tally. CoverageGrid
+builds the same tally from the availability bitsets with array ops, answers
+the week's heatmap from memory, and applies upload_slots changes as deltas
+(queued by set_day, applied by the next query).
+After the updates the grid must equal a full rebuild, and the row-by-row tally
+must equal the first build.
+
+    python benchmarks/coverage_heatmap.py --seniors 100000 --volunteers 10000 --weeks 4
+"""
+import argparse
+from datetime import date, timedelta
+
+import numpy as np
+
+from _support import FakeSupabase, timed, make_population, constituency_rows
+
+import services.availability_index as availability_index
+import services.registry as registry
+from services.availability_index import AvailabilityIndex, BUCKET_MINUTES, clock_seconds
+from services.coverage import CoverageGrid
+
+START = date(2026, 10, 19)
+
+
+def make_rows(volunteers, weeks, rng):
+    """One window on two to five days per volunteer per week, 08:00-22:00 on quarter hours"""
+    rows = []
+    for v in volunteers:
+        for offset in rng.choice(7 * weeks, size=int(rng.integers(2, 6)) * weeks, replace=False).tolist():
+            begin = int(rng.integers(32, 80))
+            end = min(88, begin + int(rng.integers(4, 20)))
+            rows.append({"volunteer_email": v["email"], "date": (START + timedelta(days=offset)).isoformat(),
+                         "start_t": f"{begin // 4:02d}:{begin % 4 * 15:02d}:00",
+                         "end_t": f"{end // 4:02d}:{end % 4 * 15:02d}:00"})
+    return rows
+
+
+def row_by_row(rows, constituency_of, n_constituencies, days):
+    tally = {day: np.zeros((n_constituencies, 24 * 60 // BUCKET_MINUTES), dtype=np.int64) for day in days}
+    size = BUCKET_MINUTES * 60
+    for row in rows:
+        c = constituency_of.get(row["volunteer_email"])
+        if c is None or row["date"] not in tally:
+            continue
+        for bucket in range(-(-clock_seconds(row["start_t"]) // size), clock_seconds(row["end_t"]) // size):
+            tally[row["date"]][c, bucket] += 1
+    return tally
+
+
+def as_array(result):
+    return np.array([c["available"] for c in result])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--seniors", type=int, default=100000)
+    parser.add_argument("--volunteers", type=int, default=10000)
+    parser.add_argument("--weeks", type=int, default=4)
+    parser.add_argument("--updates", type=int, default=500)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    seniors, volunteers = make_population(args.seniors, args.volunteers)
+    # A third never visited, the rest visited this year or last
+    visited = rng.integers(-300, 290, len(seniors)).tolist()
+    for senior, days_ago in zip(seniors, visited):
+        senior["last_visit"] = (START - timedelta(days=days_ago)).isoformat() if days_ago >= 0 else None
+    rows = make_rows(volunteers, args.weeks, rng)
+    registry.supabase = FakeSupabase({"seniors": seniors, "volunteers": volunteers,
+                                      "constituency": constituency_rows()})
+    availability_index.supabase = FakeSupabase({"availabilities": rows})
+    index = AvailabilityIndex()
+    grid = CoverageGrid(index)
+    week = [(START + timedelta(days=i)).isoformat() for i in range(7)]
+    today = START
+
+    registry_s = timed(lambda: (registry.senior_registry.records(), registry.volunteer_registry.records()))[1]
+    index_s = timed(index.snapshot)[1]
+    first, build_s = timed(grid.coverage, week, None, today)
+    _, query_s = timed(lambda: [grid.coverage(week, None, today) for _ in range(20)])
+
+    tally, scan_s = timed(row_by_row, rows, grid._constituency_of, len(grid._names), week)
+    if not np.array_equal(np.stack([tally[day] for day in week], axis=1), as_array(first)):
+        raise SystemExit("grid differs from the row-by-row tally")
+
+    emails = [v["email"] for v in rng.choice(volunteers, args.updates)]
+    updates = [(email, week[int(d)], [(f"{h:02d}:00:00", f"{h + 3:02d}:00:00")])
+               for email, d, h in zip(emails, rng.integers(0, 7, args.updates), rng.integers(8, 18, args.updates))]
+    def apply_updates():
+        for update in updates:
+            index.set_day(*update)
+        # The grid applies the queued deltas on its next query
+        return grid.coverage(week, None, today)
+
+    updated, update_s = timed(apply_updates)
+    index.generation += 1  # force a full rebuild from the updated bitsets
+    rebuilt, rebuild_s = timed(grid.coverage, week, None, today)
+    if not np.array_equal(as_array(updated), as_array(rebuilt)):
+        raise SystemExit("incrementally updated grid differs from a rebuild")
+
+    stats = grid.stats()
+    due = sum(c["eligible_seniors"] for c in first)
+    print(f"{args.seniors} seniors ({due} due), {args.volunteers} volunteers, {len(rows)} availability rows "
+          f"over {args.weeks} weeks, {stats['constituencies']} constituencies")
+    print(f"  registries load    {registry_s:>8.3f} s, availability index {index_s:.3f} s")
+    print(f"  row by row (week)  {scan_s:>8.3f} s")
+    print(f"  grid build (all)   {build_s:>8.3f} s")
+    print(f"  week heatmap       {query_s / 20 * 1000:>8.2f} ms from the grid")
+    print(f"  set_day + delta    {update_s / args.updates * 1000:>8.3f} ms/update vs {rebuild_s:.3f} s rebuild")
+
+
+if __name__ == "__main__":
+    main()
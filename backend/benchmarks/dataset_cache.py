@@ -0,0 +1,58 @@
+"""
+Encoded dataset cache vs parsing and encoding the CSV on every run.
+
+Writes a synthetic training CSV of the requested size (rows resampled from
+the v3 dataset) to a temp dir, then times:
+  csv     - pd.read_csv + FeatureEncoder, what every training run used to do
+  build   - first open_dataset, which parses once and writes the cache
+  cached  - later open_dataset calls (memory-mapped, nothing parsed)
+and checks the cached arrays match a fresh encode.
+
+    python benchmarks/dataset_cache.py --rows 1000 100000 1000000
+"""
+import argparse
+import os
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+from _support import APP_DIR, timed
+
+from seniorModel.dataset import open_dataset
+from seniorModel.encoding import FeatureEncoder
+
+
+def csv_encode(path):
+    df = pd.read_csv(path)
+    encoder = FeatureEncoder()
+    return encoder.transform_frame(df), encoder.encode_target(df['overall_wellbeing'].tolist())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, nargs="+", default=[1000, 100000, 1000000])
+    args = parser.parse_args()
+
+    source = pd.read_csv(os.path.join(APP_DIR, 'seniorModel', 'data', 'v3_seniors_wellbeing_dataset.csv'))
+
+    print(f"{'rows':>9} {'csv ms':>9} {'build ms':>9} {'cached ms':>10} {'speedup':>8}")
+    with tempfile.TemporaryDirectory() as tmp:
+        cache_dir = os.path.join(tmp, 'cache')
+        for n in args.rows:
+            path = os.path.join(tmp, f'seniors_{n}.csv')
+            source.sample(n, replace=True, random_state=0).to_csv(path, index=False)
+
+            (X, y), csv_s = timed(csv_encode, path)
+            _, build_s = timed(open_dataset, path, cache_dir=cache_dir)
+            dataset, cached_s = min((timed(open_dataset, path, cache_dir=cache_dir) for _ in range(3)),
+                                    key=lambda result: result[1])
+
+            if not (np.array_equal(X, dataset.X, equal_nan=True) and np.array_equal(y, dataset.y)):
+                raise SystemExit(f"cached dataset differs from a fresh encode at {n} rows")
+            print(f"{n:>9} {csv_s * 1000:>9.1f} {build_s * 1000:>9.1f} {cached_s * 1000:>10.2f} "
+                  f"{csv_s / cached_s:>7.0f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+"""
+FeatureEncoder.transform vs the old DataFrame + per-column Series.map encoding.
+
+Records are sampled from the v3 training CSV (string labels), so both paths
+do real categorical lookups. Results are checked to be identical.
+
+    python benchmarks/feature_encoding.py --sizes 1 1000 100000
+"""
+import argparse
+import os
+
+import numpy as np
+import pandas as pd
+
+from _support import APP_DIR, timed
+
+from seniorModel.encoding import FEATURES, FeatureEncoder
+
+
+def legacy_encode(records):
+    """What _preprocess_input did: build a DataFrame, then map object columns one by one"""
+    df = pd.DataFrame(records)
+    low_high_mapping = {'Low': 1, 'Medium': 2, 'High': 3}
+    yes_mapping = {'Yes': 1, 'No': 0}
+    meeting_ends_mapping = {'Struggling': 1, 'Manageable': 2, 'Comfortable': 3}
+    living_situation_mapping = {'Alone': 1, 'With Spouse': 2, 'With Family': 3, 'Assisted Living': 4}
+    for col in df.select_dtypes(include=['object']).columns:
+        if col == 'making_ends_meet':
+            df[col] = df[col].map(meeting_ends_mapping)
+        elif col == 'living_situation':
+            df[col] = df[col].map(living_situation_mapping)
+        elif col == 'community':
+            df[col] = df[col].map(low_high_mapping)
+        elif col in ('dl_intervention', 'rece_gov_sup'):
+            df[col] = df[col].map(yes_mapping)
+    return df[FEATURES].to_numpy(dtype=np.float32)
+
+
+def best_of(repeat, fn, *args):
+    return min(timed(fn, *args)[1] for _ in range(repeat))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1, 1000, 100000])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    source = pd.read_csv(os.path.join(APP_DIR, 'seniorModel', 'data', 'v3_seniors_wellbeing_dataset.csv'))
+    source_records = source[FEATURES].to_dict('records')
+    encoder = FeatureEncoder()
+
+    print(f"{'rows':>8} {'legacy ms':>10} {'encoder ms':>11} {'speedup':>8}")
+    for n in args.sizes:
+        records = [source_records[i % len(source_records)] for i in range(n)]
+        if not np.array_equal(legacy_encode(records), encoder.transform(records)):
+            raise SystemExit(f"encodings differ for {n} rows")
+
+        legacy_s = best_of(args.repeat, legacy_encode, records)
+        encoder_s = best_of(args.repeat, encoder.transform, records)
+        print(f"{n:>8} {legacy_s * 1000:>10.3f} {encoder_s * 1000:>11.3f} {legacy_s / encoder_s:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
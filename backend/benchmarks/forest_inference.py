@@ -0,0 +1,70 @@
+"""
+FlatForest vs RandomForestClassifier: equivalence check and latency by batch size.
+
+Trains forests on the v3 dataset, checks that predict and predict_proba are
+identical to sklearn on the training rows and on random feature vectors, then
+times both on batches of increasing size. Exits non-zero on any mismatch.
+
+    python benchmarks/forest_inference.py --sizes 1 10 100 1000 10000
+"""
+import argparse
+import os
+
+import numpy as np
+import pandas as pd
+from sklearn.ensemble import RandomForestClassifier
+
+from _support import APP_DIR, timed
+
+from seniorModel.encoding import FeatureEncoder
+from seniorModel.forest import FlatForest
+
+CONFIGS = {
+    "deep (grid default)": dict(n_estimators=300),
+    "shallow": dict(n_estimators=100, max_depth=10, min_samples_leaf=4),
+}
+
+
+def random_features(n, seed=0):
+    rng = np.random.default_rng(seed)
+    columns = [rng.integers(55, 100, n)] + [rng.integers(0, 6, n) for _ in range(7)]
+    return np.column_stack(columns).astype(np.float32)
+
+
+def best_of(repeat, fn, *args):
+    return min(timed(fn, *args)[1] for _ in range(repeat))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1, 10, 100, 1000, 10000])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    df = pd.read_csv(os.path.join(APP_DIR, 'seniorModel', 'data', 'v3_seniors_wellbeing_dataset.csv'))
+    encoder = FeatureEncoder()
+    X = encoder.transform_frame(df)
+    y = encoder.encode_target(df['overall_wellbeing'].tolist())
+    X_random = random_features(max(args.sizes))
+
+    for name, params in CONFIGS.items():
+        model = RandomForestClassifier(random_state=42, **params).fit(X, y)
+        forest = FlatForest.from_sklearn(model)
+
+        for label, X_eval in (("training rows", X), ("random rows", X_random)):
+            if not (np.array_equal(model.predict(X_eval), forest.predict(X_eval))
+                    and np.array_equal(model.predict_proba(X_eval), forest.predict_proba(X_eval))):
+                raise SystemExit(f"{name}: FlatForest differs from sklearn on {label}")
+
+        print(f"\n{name}: {forest.n_trees} trees, max depth {forest.max_depth}, "
+              f"{len(forest.feature)} nodes - identical to sklearn")
+        print(f"{'batch':>8} {'sklearn ms':>11} {'flat ms':>9} {'speedup':>8}")
+        for n in args.sizes:
+            batch = X_random[:n]
+            sklearn_s = best_of(args.repeat, model.predict, batch)
+            flat_s = best_of(args.repeat, forest.predict, batch)
+            print(f"{n:>8} {sklearn_s * 1000:>11.3f} {flat_s * 1000:>9.3f} {sklearn_s / flat_s:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""
+GET /get_slots polling: the original full-history fetch vs range-filtered, cached and conditional responses.
+
+Each volunteer has --weeks of history. The legacy version reads every row the
+volunteer ever submitted and re-parses it on every call. The new one reads
+only the requested week, one round trip per call, and hashes the rows into the
+ETag: a matching If-None-Match gets an empty 304, and unchanged rows are served
+from the body slots_cache holds under their ETag. The ETag must survive an
+empty cache (another worker), and one upload_slots in between must change it.
+
+    python benchmarks/get_slots.py --volunteers 50 --weeks 52 --polls 10 --latency 0.02
+"""
+import argparse
+from datetime import date, datetime, timedelta
+
+from _support import FakeSupabase, replace_availabilities, timed
+
+import routers.availability as availability
+import services.availability_slots as availability_slots
+
+
+def make_rows(n_volunteers, weeks):
+    start = date(2026, 10, 19) - timedelta(weeks=weeks - 1)
+    return [{"volunteer_email": f"volunteer{v}@example.com", "date": (start + timedelta(days=d)).isoformat(),
+             "start_t": f"{9 + v % 8:02d}:00:00", "end_t": f"{11 + v % 8:02d}:00:00"}
+            for v in range(n_volunteers) for d in range(7 * weeks) if (d + v) % 3 == 0]
+
+
+def legacy_get_slots(client, email):
+    """get_slots before the cache: every row, parsed on every call"""
+    slots = []
+    for record in client.table("availabilities").select("*").eq("volunteer_email", email).execute().data:
+        start_dt = datetime.fromisoformat(f"{record['date']}T{record['start_t']}+08:00")
+        end_dt = datetime.fromisoformat(f"{record['date']}T{record['end_t']}+08:00")
+        slots.append({"date": record["date"], "start_time": start_dt.isoformat(), "end_time": end_dt.isoformat()})
+    return {"email": email, "slots": slots}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--volunteers", type=int, default=50)
+    parser.add_argument("--weeks", type=int, default=52)
+    parser.add_argument("--polls", type=int, default=10, help="calls per volunteer")
+    parser.add_argument("--latency", type=float, default=0.02, help="seconds per round trip")
+    args = parser.parse_args()
+
+    rows = make_rows(args.volunteers, args.weeks)
+    client = FakeSupabase({"availabilities": rows}, latency=args.latency, identity=("availabilities",),
+                          functions={"replace_availabilities": replace_availabilities})
+    availability.supabase = availability_slots.supabase = client
+    emails = [f"volunteer{v}@example.com" for v in range(args.volunteers)]
+    week = ("2026-10-19", "2026-10-25")
+    calls = args.volunteers * args.polls
+
+    legacy, legacy_s = timed(lambda: [legacy_get_slots(client, e) for e in emails for _ in range(args.polls)])
+    legacy_trips = client.round_trips
+
+    client.round_trips = 0
+    first, miss_s = timed(lambda: [availability.get_slots(e, *week, None) for e in emails])
+    miss_trips = client.round_trips
+    _, hit_s = timed(lambda: [availability.get_slots(e, *week, None) for e in emails for _ in range(args.polls - 1)])
+    etags = {e: r.headers["etag"] for e, r in zip(emails, first)}
+    not_modified, conditional_s = timed(lambda: [availability.get_slots(e, *week, etags[e])
+                                                 for e in emails for _ in range(args.polls)])
+    if any(r.status_code != 304 for r in not_modified):
+        raise SystemExit("unchanged slots were sent again")
+    if client.round_trips != 2 * calls:
+        raise SystemExit("a poll took more than one round trip")
+
+    availability_slots.slots_cache.clear()
+    if availability.get_slots(emails[0], *week, etags[emails[0]]).status_code != 304:
+        raise SystemExit("the ETag depends on this process's cache")
+    availability.upload_slots({"email": emails[0], "slots": [
+        {"start_time": "2026-10-21T14:00:00+08:00", "end_time": "2026-10-21T16:00:00+08:00"}]})
+    if availability.get_slots(emails[0], *week, etags[emails[0]]).status_code != 200:
+        raise SystemExit("upload_slots did not change the ETag")
+
+    print(f"{args.volunteers} volunteers with {args.weeks} weeks of history ({len(rows)} rows), "
+          f"{args.polls} polls each ({args.latency * 1000:.0f} ms per round trip)")
+    legacy_rows = sum(len(r["slots"]) for r in legacy) / calls
+    week_rows = sum(r.body.count(b'"date"') for r in first) / args.volunteers
+    print(f"  legacy        {legacy_s / calls * 1000:>8.3f} ms/call  {legacy_trips / calls:.0f} round trips/call, "
+          f"{legacy_rows:.0f} rows")
+    print(f"  week, miss    {miss_s / args.volunteers * 1000:>8.3f} ms/call  {miss_trips / args.volunteers:.0f} round trips/call, "
+          f"{week_rows:.0f} rows")
+    print(f"  week, cached  {hit_s / (calls - args.volunteers) * 1000:>8.3f} ms/call  1 round trip, body from cache")
+    print(f"  week, 304     {conditional_s / calls * 1000:>8.3f} ms/call  1 round trip, empty body")
+    print(f"  cache {availability_slots.slots_cache.stats()}")
+
+
+if __name__ == "__main__":
+    main()
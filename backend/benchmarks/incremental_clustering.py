@@ -0,0 +1,63 @@
+"""
+Warm-started clustering from persisted centroids vs a full KMeans refit.
+
+Clusters N seniors from scratch and persists the centroids (to an in-memory
+clusters table), then replaces --churn of them with new seniors and clusters
+again both ways. Reports wall time, how many clusters the warm start touched,
+how many unchanged seniors kept their cluster id, and inertia relative to
+the full refit.
+
+    python benchmarks/incremental_clustering.py --seniors 10000 --churn 20
+"""
+import argparse
+
+import numpy as np
+
+from _support import FakeSupabase, timed, make_seniors
+
+import services.clustering as clustering
+from utils.geo import coords_array, cluster_max_radius_km
+
+
+def inertia(X, labels, centroids):
+    return float(((X - centroids[labels]) ** 2).sum())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--seniors", type=int, default=10000)
+    parser.add_argument("--churn", type=int, default=20, help="seniors removed and added between runs")
+    args = parser.parse_args()
+
+    clustering.supabase = FakeSupabase({"clusters": [], "cluster_seeds": []})
+    seniors = make_seniors(args.seniors)
+    n_clusters = max(1, len(seniors) // 6)
+
+    X = coords_array(seniors)
+    (labels, centroids), first_s = timed(clustering.fit_clusters, X, n_clusters)
+    clustering.save_clusters(centroids, cluster_max_radius_km(X, labels, centroids))
+    before = dict(zip((s["uid"] for s in seniors), labels))
+
+    newcomers = make_seniors(args.churn, seed=99)
+    for i, s in enumerate(newcomers):
+        s["uid"] = f"new-{i}"
+    seniors = seniors[args.churn:] + newcomers
+    X = coords_array(seniors)
+
+    (full_labels, full_centroids), full_s = timed(clustering.fit_clusters, X, n_clusters, incremental=False)
+    (warm_labels, warm_centroids, stats), warm_s = timed(
+        clustering.warm_kmeans, X, clustering.load_centroids(), n_clusters
+    )
+
+    kept = [before[s["uid"]] == label for s, label in zip(seniors, warm_labels) if s["uid"] in before]
+    print(f"{args.seniors} seniors, {n_clusters} clusters, {args.churn} replaced")
+    print(f"  first full fit      {first_s:>7.2f} s")
+    print(f"  full refit          {full_s:>7.2f} s")
+    print(f"  warm start          {warm_s:>7.3f} s ({full_s / warm_s:.0f}x), "
+          f"{stats['updated_clusters']} clusters updated in {stats['iterations']} passes")
+    print(f"  unchanged seniors keeping their cluster id: {np.mean(kept):.2%}")
+    print(f"  inertia warm / full: {inertia(X, warm_labels, warm_centroids) / inertia(X, full_labels, full_centroids):.4f}")
+
+
+if __name__ == "__main__":
+    main()
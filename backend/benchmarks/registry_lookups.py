@@ -0,0 +1,73 @@
+"""
+Name and email lookups through the entity registry vs next() scans over row lists.
+
+The scans are what get_volunteer_name / get_senior_name and the by-email lookups
+did before: walk the list until the id matches, O(n) per lookup. The registry
+answers from a dict keyed by id (or by email), O(1). Also reports the memory of
+the slotted records against the plain row dicts and the time of a full load.
+
+    python benchmarks/registry_lookups.py --seniors 100000 --volunteers 10000 --lookups 2000
+"""
+import argparse
+import sys
+import tracemalloc
+
+import numpy as np
+
+from _support import FakeSupabase, timed, make_seniors, make_volunteers
+
+import services.registry as registry
+from services.registry import EntityRegistry, SeniorRecord, VolunteerRecord
+
+
+def traced(fn, *args):
+    tracemalloc.start()
+    result = fn(*args)
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, size
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--seniors", type=int, default=100000)
+    parser.add_argument("--volunteers", type=int, default=10000)
+    parser.add_argument("--lookups", type=int, default=2000)
+    args = parser.parse_args()
+
+    seniors = make_seniors(args.seniors)
+    volunteers = make_volunteers(args.volunteers)
+    registry.supabase = FakeSupabase({"seniors": seniors, "volunteers": volunteers})
+    senior_registry = EntityRegistry("seniors", SeniorRecord, "uid", groups=("constituency_name",))
+    volunteer_registry = EntityRegistry("volunteers", VolunteerRecord, "vid", unique=("email",))
+    _, load_s = timed(senior_registry.records)
+    volunteer_registry.records()
+
+    rng = np.random.default_rng(0)
+    uids = [seniors[i]["uid"] for i in rng.integers(0, len(seniors), args.lookups)]
+    emails = [volunteers[i]["email"] for i in rng.integers(0, len(volunteers), args.lookups)]
+    scanned = min(200, args.lookups)
+
+    scan_names, scan_s = timed(lambda: [next(s for s in seniors if s["uid"] == uid)["name"] for uid in uids[:scanned]])
+    names, get_s = timed(lambda: [senior_registry.get(uid).name for uid in uids])
+    if names[:scanned] != scan_names:
+        raise SystemExit("registry names differ from the scan")
+    _, email_scan_s = timed(lambda: [next(v for v in volunteers if v["email"] == e) for e in emails[:scanned]])
+    _, find_s = timed(lambda: [volunteer_registry.find("email", e) for e in emails])
+
+    _, dict_bytes = traced(lambda rows: [dict(row) for row in rows], seniors)
+    _, record_bytes = traced(lambda rows: [SeniorRecord(row) for row in rows], seniors)
+
+    print(f"{args.seniors} seniors, {args.volunteers} volunteers (senior registry loaded in {load_s:.2f}s)")
+    print(f"  scan senior name   {scan_s / scanned * 1000:>9.3f} ms/lookup")
+    print(f"  registry get       {get_s / args.lookups * 1000:>9.4f} ms/lookup "
+          f"({scan_s / scanned / (get_s / args.lookups):.0f}x)")
+    print(f"  scan email         {email_scan_s / scanned * 1000:>9.3f} ms/lookup")
+    print(f"  registry find      {find_s / args.lookups * 1000:>9.4f} ms/lookup "
+          f"({email_scan_s / scanned / (find_s / args.lookups):.0f}x)")
+    print(f"  row dicts {dict_bytes / 2 ** 20:.1f} MB, records {record_bytes / 2 ** 20:.1f} MB "
+          f"({sys.getsizeof(seniors[0])} vs {sys.getsizeof(SeniorRecord(seniors[0]))} bytes per senior shell)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+"""
+Schedule emails through the pooled MailDispatcher vs the original one-connection-per-volunteer loop.
+
+Both send to a LocalSMTPServer whose --connect-latency stands in for the
+connect/STARTTLS/login round trips every new connection costs against a real
+server, and whose --message-latency is the server's time to accept a message.
+The legacy version also finds each volunteer and senior with next() scans, so
+it is O(volunteers x visits) before any I/O. Every volunteer must receive
+exactly one email from each. A second dispatcher run against a server that
+drops every --drop-every'th message shows the retries.
+
+    python benchmarks/schedule_emails.py --volunteers 500 --visits-per-volunteer 5
+"""
+import argparse
+import smtplib
+from collections import defaultdict, Counter
+from email.mime.multipart import MIMEMultipart
+from email.mime.text import MIMEText
+
+from _support import LocalSMTPServer, timed, make_seniors, make_volunteers
+
+from services.notifications import MailDispatcher, render_schedule_emails
+
+
+def legacy_send(schedules, volunteers, seniors, port):
+    """send_schedule_notifications before the dispatcher, pointed at the local server"""
+    schedules_by_volunteer = defaultdict(list)
+    for s in schedules:
+        schedules_by_volunteer[s['volunteer']].append(s)
+    for vol_id, vol_schedules in schedules_by_volunteer.items():
+        volunteer = next((v for v in volunteers if v['vid'] == vol_id), None)
+        if not volunteer:
+            continue
+        email = volunteer['email']
+        message_body = [f"Hello {volunteer.get('name')},\n\nHere is your schedule for the week:\n"]
+        for s in sorted(vol_schedules, key=lambda x: (x['date'], x['start_time'])):
+            senior = next((sen for sen in seniors if sen['uid'] == s['senior']), {})
+            message_body.append(f"- {s['date']} {s['start_time']}–{s['end_time']}: "
+                                f"Visit {senior.get('name')} (Cluster {s['cluster']})")
+        msg = MIMEMultipart()
+        msg['From'] = "noreply@helpersoftomorrow.org"
+        msg['To'] = email
+        msg['Subject'] = "Your Weekly Volunteer Schedule"
+        msg.attach(MIMEText("\n".join(message_body), "plain"))
+        with smtplib.SMTP("127.0.0.1", port) as server:
+            server.sendmail(msg['From'], email, msg.as_string())
+
+
+def make_schedules(volunteers, seniors, per_volunteer):
+    return [
+        {"volunteer": v["vid"], "senior": seniors[(i * per_volunteer + k) % len(seniors)]["uid"],
+         "cluster": i % 97, "date": f"2026-10-{12 + k % 7:02d}", "start_time": "10:00:00", "end_time": "11:00:00"}
+        for i, v in enumerate(volunteers) for k in range(per_volunteer)
+    ]
+
+
+def check(server, volunteers, name):
+    received = Counter(server.messages)
+    if received != Counter(v["email"] for v in volunteers):
+        raise SystemExit(f"{name}: {sum(received.values())} emails for {len(volunteers)} volunteers")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--volunteers", type=int, default=500)
+    parser.add_argument("--seniors", type=int, default=5000)
+    parser.add_argument("--visits-per-volunteer", type=int, default=5)
+    parser.add_argument("--connect-latency", type=float, default=0.05, help="seconds per new connection")
+    parser.add_argument("--message-latency", type=float, default=0.005, help="seconds per message")
+    parser.add_argument("--pool-size", type=int, default=4)
+    parser.add_argument("--batch-size", type=int, default=50)
+    parser.add_argument("--drop-every", type=int, default=25)
+    args = parser.parse_args()
+
+    volunteers = make_volunteers(args.volunteers)
+    seniors = make_seniors(args.seniors)
+    schedules = make_schedules(volunteers, seniors, args.visits_per_volunteer)
+    latency = {"connect_latency": args.connect_latency, "message_latency": args.message_latency}
+    options = {"host": "127.0.0.1", "username": None, "starttls": False, "backoff": 0.01,
+               "pool_size": args.pool_size, "batch_size": args.batch_size}
+
+    server = LocalSMTPServer(**latency)
+    _, legacy_s = timed(legacy_send, schedules, volunteers, seniors, server.port)
+    check(server, volunteers, "legacy")
+    legacy_connections = server.connections
+    server.close()
+
+    messages, render_s = timed(render_schedule_emails, schedules, volunteers, seniors)
+    server = LocalSMTPServer(**latency)
+    with MailDispatcher(port=server.port, **options) as dispatcher:
+        stats, pooled_s = timed(dispatcher.send, messages)
+    check(server, volunteers, "pooled")
+    server.close()
+
+    server = LocalSMTPServer(drop_every=args.drop_every, **latency)
+    with MailDispatcher(port=server.port, **options) as dispatcher:
+        flaky, _ = timed(dispatcher.send, messages)
+    check(server, volunteers, "pooled with drops")
+    server.close()
+
+    print(f"{args.volunteers} volunteers, {len(schedules)} visits "
+          f"(connect {args.connect_latency * 1000:.0f} ms, message {args.message_latency * 1000:.0f} ms)")
+    print(f"  legacy  {legacy_s:>8.2f} s  {legacy_connections} connections")
+    print(f"  pooled  {render_s + pooled_s:>8.2f} s  {stats['connections']} connections, "
+          f"{stats['per_second']}/s ({legacy_s / (render_s + pooled_s):.0f}x; rendering {render_s * 1000:.0f} ms)")
+    rates = [b["per_second"] for b in stats["batches"]]
+    print(f"          {len(rates)} batches of {args.batch_size}, {min(rates)}-{max(rates)} emails/s each")
+    print(f"  dropping every {args.drop_every}th: {flaky['sent']} sent, {flaky['failed']} failed, "
+          f"{flaky['retries']} retries over {flaky['connections']} connections")
+
+
+if __name__ == "__main__":
+    main()
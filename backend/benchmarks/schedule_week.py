@@ -0,0 +1,139 @@
+"""
+/schedule engine on a synthetic island-wide week.
+
+Generates --seniors seniors (a mix of never visited, visited last year and
+visited this year, so part of them are due) and --volunteers volunteers with
+two to four availability windows each in the scheduled week, then times the
+eligibility filter, the whole schedule build (clustering, volunteer
+assignment, slot matching) and the bulk insert, and checks the result: only
+eligible seniors, at most one visit each, every visit inside one of its
+volunteer's windows and a volunteer's visits on a day at least
+VISIT_SPACING_SECONDS apart.
+
+Clustering warm-starts from last week's persisted clusters, as a weekly run
+does; they are seeded with split_clusters over the seniors due last week.
+--cold leaves the clusters table empty, so the eligible seniors get a full
+KMeans fit (slow beyond a few tens of thousands of seniors).
+
+    python benchmarks/schedule_week.py --seniors 100000 --volunteers 10000
+"""
+import argparse
+from datetime import date, timedelta
+
+import numpy as np
+
+from _support import FakeSupabase, timed, make_population
+
+import services.clustering as clustering
+import services.scheduling as scheduling
+from services.clustering import split_clusters, save_clusters
+from services.scheduling import (build_schedule, eligible_seniors, insert_assignments, schedule_week,
+                                 VISIT_SECONDS, VISIT_SPACING_SECONDS)
+from utils.geo import coords_array, cluster_max_radius_km
+
+
+def add_visits(seniors, today, seed):
+    """last_visit for every senior: 30% never, 30% last year, the rest at some point this year"""
+    rng = np.random.default_rng(seed)
+    kind = rng.random(len(seniors))
+    days_this_year = (today - date(today.year, 1, 1)).days
+    offsets = rng.integers(0, max(1, days_this_year), len(seniors)).tolist()
+    last_year = rng.integers(1, 365, len(seniors)).tolist()
+    start = date(today.year, 1, 1)
+    for i, senior in enumerate(seniors):
+        if kind[i] < 0.3:
+            senior["last_visit"] = None
+        elif kind[i] < 0.6:
+            senior["last_visit"] = (start - timedelta(days=last_year[i])).isoformat()
+        else:
+            senior["last_visit"] = (start + timedelta(days=offsets[i])).isoformat()
+
+
+def make_availabilities(volunteers, week_start, seed):
+    """Two to four windows of two to five hours per volunteer, starting 08:00-17:00 on the hour"""
+    rng = np.random.default_rng(seed)
+    rows = []
+    for volunteer in volunteers:
+        for _ in range(int(rng.integers(2, 5))):
+            day = week_start + timedelta(days=int(rng.integers(0, 7)))
+            start = int(rng.integers(8, 18))
+            end = min(23, start + int(rng.integers(2, 6)))
+            rows.append({"volunteer_email": volunteer["email"], "date": day.isoformat(),
+                         "start_t": f"{start:02d}:00:00", "end_t": f"{end:02d}:00:00"})
+    return rows
+
+
+def seed_clusters(seniors, today):
+    """Persist clusters for the seniors due a week earlier, as last week's run would have"""
+    due = eligible_seniors(seniors, today - timedelta(days=7))
+    X = coords_array(due)
+    labels, centroids, _ = split_clusters(X, np.zeros(len(X), dtype=np.intp), X.mean(axis=0, keepdims=True))
+    save_clusters(centroids, np.maximum(cluster_max_radius_km(X, labels, centroids) * 1.1, 0.2))
+    return len(centroids)
+
+
+def check(rows, seniors, availabilities, today):
+    due = {s["uid"] for s in eligible_seniors(seniors, today)}
+    sids = [row["sid"] for row in rows]
+    assert len(sids) == len(set(sids)), "a senior was scheduled twice"
+    assert set(sids) <= due, "a senior who isn't due was scheduled"
+
+    def seconds(clock):
+        h, m, s = map(int, clock.split(":"))
+        return h * 3600 + m * 60 + s
+
+    windows = {}
+    for avail in availabilities:
+        windows.setdefault((avail["volunteer_email"], avail["date"]), []).append(
+            (seconds(avail["start_t"]), seconds(avail["end_t"])))
+    starts = {}
+    for row in rows:
+        begin = seconds(row["start_time"])
+        assert any(a <= begin and begin + VISIT_SECONDS <= b
+                   for a, b in windows.get((row["volunteer_email"], row["date"]), [])), "visit outside availability"
+        starts.setdefault((row["volunteer_email"], row["date"]), []).append(begin)
+    for day_starts in starts.values():
+        day_starts.sort()
+        assert all(b - a >= VISIT_SPACING_SECONDS for a, b in zip(day_starts, day_starts[1:])), \
+            "visits too close together"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--seniors", type=int, default=100000)
+    parser.add_argument("--volunteers", type=int, default=10000)
+    parser.add_argument("--solver", choices=("optimal", "greedy"), default="optimal")
+    parser.add_argument("--date", default="2026-10-14", help="the day the scheduler runs (YYYY-MM-DD)")
+    parser.add_argument("--cold", action="store_true", help="no persisted clusters: full KMeans fit")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    today = date.fromisoformat(args.date)
+    week_start, week_end = schedule_week(today)
+    seniors, volunteers = make_population(args.seniors, args.volunteers, seed=args.seed)
+    add_visits(seniors, today, args.seed)
+    availabilities = make_availabilities(volunteers, week_start, args.seed)
+
+    fake = FakeSupabase({"clusters": [], "cluster_seeds": [], "assignments": []})
+    clustering.supabase = scheduling.supabase = fake
+    seeded = 0 if args.cold else seed_clusters(seniors, today)
+
+    due, eligible_s = timed(eligible_seniors, seniors, today)
+    stats = {}
+    (rows, result, _, _, _), build_s = timed(build_schedule, seniors, volunteers, availabilities,
+                                          {"solver": args.solver}, today, stats=stats)
+    round_trips = fake.round_trips
+    written, insert_s = timed(insert_assignments, rows)
+    check(rows, seniors, availabilities, today)
+
+    print(f"{args.seniors} seniors ({len(due)} due), {args.volunteers} volunteers, "
+          f"{len(availabilities)} availability windows, week {week_start} to {week_end}")
+    print(f"  clusters: {'full fit' if args.cold else f'warm start from {seeded} persisted'} -> {stats['clusters']}")
+    print(f"  eligibility   {eligible_s * 1000:>9.1f} ms")
+    print(f"  build         {build_s * 1000:>9.1f} ms ({args.solver} solver)")
+    print(f"  insert        {insert_s * 1000:>9.1f} ms, {fake.round_trips - round_trips} round trips for {written} rows")
+    print(f"  scheduled {len(rows)} of {len(due)} due seniors; all checks passed")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""
+Radius and k-nearest queries through SpatialIndex vs a linear scan over every row.
+
+The scan is what a client does today with /seniors: compute the distance to
+every senior and filter or sort. Results are checked to match. Also times
+applying single-row coordinate updates against rebuilding the tree.
+
+    python benchmarks/spatial_queries.py --sizes 10000 100000 --queries 200
+"""
+import argparse
+
+import numpy as np
+
+from _support import FakeSupabase, timed, make_seniors
+
+import services.spatial_index as spatial_index
+from utils.geo import coords_array, haversine_km
+
+
+def scan_within(points, q, radius_km):
+    d = haversine_km(np.array([q]), points)[0]
+    idx = np.flatnonzero(d <= radius_km)
+    return idx[np.argsort(d[idx], kind="stable")]
+
+
+def scan_nearest(points, q, k):
+    d = haversine_km(np.array([q]), points)[0]
+    return np.argsort(d, kind="stable")[:k]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000])
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--radius-km", type=float, default=1.0)
+    parser.add_argument("--k", type=int, default=10)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    print(f"{'seniors':>8} {'query':>7} {'scan ms':>8} {'index ms':>9} {'speedup':>8}")
+    for n in args.sizes:
+        seniors = make_seniors(n)
+        points = coords_array(seniors)
+        uids = [s["uid"] for s in seniors]
+        spatial_index.supabase = FakeSupabase({"seniors": seniors})
+        index = spatial_index.SpatialIndex("seniors", "uid")
+        _, build_s = timed(index.within, 1.35, 103.8, 0.1)
+
+        queries = np.column_stack([rng.uniform(1.28, 1.45, args.queries), rng.uniform(103.7, 103.95, args.queries)])
+        for name, scan, lookup in (
+            ("radius", lambda q: scan_within(points, q, args.radius_km),
+             lambda q: index.within(q[0], q[1], args.radius_km)),
+            ("knn", lambda q: scan_nearest(points, q, args.k),
+             lambda q: index.nearest(q[0], q[1], args.k)),
+        ):
+            for q in queries[:5]:
+                if [uids[i] for i in scan(q)] != [row["uid"] for row, _ in lookup(q)]:
+                    raise SystemExit(f"{name} query differs from the linear scan")
+            _, scan_s = timed(lambda: [scan(q) for q in queries])
+            _, index_s = timed(lambda: [lookup(q) for q in queries])
+            print(f"{n:>8} {name:>7} {scan_s / args.queries * 1000:>8.3f} "
+                  f"{index_s / args.queries * 1000:>9.3f} {scan_s / index_s:>7.0f}x")
+
+        moves = [{"uid": uids[i], "coords": {"lat": float(lat), "lng": float(lng)}}
+                 for i, lat, lng in zip(rng.integers(0, n, 100), rng.uniform(1.28, 1.45, 100),
+                                        rng.uniform(103.7, 103.95, 100))]
+        _, update_s = timed(lambda: [index.upsert([m]) for m in moves])
+        print(f"{n:>8} initial build {build_s * 1000:.1f} ms, "
+              f"single-row update {update_s / len(moves) * 1e6:.1f} µs, {index.stats()['rebuilds']} builds")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+"""
+Import time and RSS of an API worker at startup.
+
+Each scenario runs in a fresh interpreter: `import api` under -X importtime,
+then the risk model is loaded through the registry, as the startup hook does.
+"combined" is the pre-split artifact with the pickled TreeExplainer inside
+the model file; "split" is what save_model writes now. The report shows
+wall time, RSS, the slowest top-level imports and whether shap, numba and
+llvmlite ended up loaded.
+
+    python benchmarks/startup_report.py --top 10
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+import joblib
+
+from _support import APP_DIR, build_model_artifact
+
+CHILD = r"""
+import json, sys, time
+start = time.perf_counter()
+import api
+imported = time.perf_counter()
+from services.model_registry import risk_model_registry
+risk_model_registry.path = sys.argv[1]
+risk_model_registry.get()
+loaded = time.perf_counter()
+rss_kb = None
+with open('/proc/self/status') as f:
+    for line in f:
+        if line.startswith('VmRSS:'):
+            rss_kb = int(line.split()[1])
+print(json.dumps({
+    "import_api_s": imported - start,
+    "load_model_s": loaded - imported,
+    "rss_mb": rss_kb / 1024 if rss_kb else None,
+    "modules": {m: m in sys.modules for m in ("shap", "numba", "llvmlite", "pandas", "sklearn")},
+}))
+"""
+
+
+def top_imports(stderr, top):
+    """Top-level packages by cumulative import time from -X importtime output"""
+    totals = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        parts = [p.strip() for p in line[len("import time:"):].split("|")]
+        if len(parts) != 3 or not parts[1].isdigit():
+            continue
+        name = parts[2]
+        if name.startswith(" ") or "." in name.strip():
+            continue
+        totals[name.strip()] = max(totals.get(name.strip(), 0), int(parts[1]))
+    return sorted(totals.items(), key=lambda kv: kv[1], reverse=True)[:top]
+
+
+def run(artifact, top):
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", CHILD, artifact],
+        cwd=APP_DIR, env=os.environ.copy(), capture_output=True, text=True
+    )
+    if result.returncode != 0:
+        raise SystemExit(result.stderr[-2000:])
+    report = json.loads(result.stdout.strip().splitlines()[-1])
+    report["top_imports_ms"] = [(name, us / 1000) for name, us in top_imports(result.stderr, top)]
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--top", type=int, default=10, help="number of slowest imports to list")
+    parser.add_argument("--json", action="store_true", help="print the raw report as JSON")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        split = build_model_artifact(os.path.join(tmp, "senior_risk_model.pkl"))
+
+        import shap
+        combined = os.path.join(tmp, "combined.pkl")
+        model_data = joblib.load(split)
+        model_data["explainer"] = shap.TreeExplainer(model_data["model"])
+        joblib.dump(model_data, combined)
+
+        reports = {"combined": run(combined, args.top), "split": run(split, args.top)}
+
+    if args.json:
+        print(json.dumps(reports, indent=2))
+        return
+
+    for name, report in reports.items():
+        loaded = ", ".join(m for m, present in report["modules"].items() if present)
+        print(f"\n[{name}] import api {report['import_api_s']:.2f}s, load model {report['load_model_s']:.2f}s, "
+              f"RSS {report['rss_mb']:.0f} MB")
+        print(f"  loaded: {loaded}")
+        for module, ms in report["top_imports_ms"]:
+            print(f"  {module:<24} {ms:>9.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
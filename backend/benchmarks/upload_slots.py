@@ -0,0 +1,119 @@
+"""
+POST /upload_slots: diff-based replace vs the original delete-per-date, insert-per-slot loop.
+
+Every volunteer already has --weeks of availability and resubmits it with
+--changed of the slots moved. The legacy loop costs one round trip per date
+plus one per slot; the diff reads the volunteer's rows once and applies only
+the changes, through the replace_availabilities stand-in (one transaction) or,
+without it, one bulk delete and one bulk insert. A FakeSupabase with --latency
+per round trip stands in for the database; all three must leave the same rows.
+
+    python benchmarks/upload_slots.py --volunteers 50 --weeks 2 --latency 0.02
+"""
+import argparse
+from collections import Counter
+from datetime import date, datetime, timedelta
+
+import numpy as np
+
+from _support import FakeSupabase, replace_availabilities, timed
+
+import routers.availability as availability
+import services.availability_slots as availability_slots
+from services.availability_index import clock_seconds
+
+
+def make_slots(n_days, rng):
+    """Two to three non-overlapping windows on each day as /upload_slots slot objects"""
+    slots = []
+    for d in range(n_days):
+        day = date(2026, 10, 19) + timedelta(days=d)
+        begins = sorted(rng.choice(np.arange(8, 20, 2), size=int(rng.integers(2, 4)), replace=False).tolist())
+        for b in begins:
+            slots.append({"start_time": f"{day.isoformat()}T{b:02d}:00:00+08:00",
+                          "end_time": f"{day.isoformat()}T{b + 1:02d}:30:00+08:00"})
+    return slots
+
+
+def rows_of(email, slots):
+    rows = []
+    for slot in slots:
+        start = datetime.fromisoformat(slot["start_time"])
+        end = datetime.fromisoformat(slot["end_time"])
+        rows.append({"volunteer_email": email, "date": start.date().isoformat(),
+                     "start_t": start.time().isoformat(), "end_t": end.time().isoformat()})
+    return rows
+
+
+def legacy_upload(client, email, slots):
+    """upload_slots before the diff: delete each date, then insert each slot"""
+    rows = rows_of(email, slots)
+    for date_str in {r["date"] for r in rows}:
+        client.table("availabilities").delete().eq("volunteer_email", email).eq("date", date_str).execute()
+    for row in rows:
+        client.table("availabilities").insert(row).execute()
+
+
+def state(client):
+    return Counter((r["volunteer_email"], r["date"], clock_seconds(r["start_t"]), clock_seconds(r["end_t"]))
+                   for r in client.tables["availabilities"])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--volunteers", type=int, default=50)
+    parser.add_argument("--weeks", type=int, default=2)
+    parser.add_argument("--changed", type=float, default=0.25, help="share of slots moved on resubmission")
+    parser.add_argument("--latency", type=float, default=0.02, help="seconds per round trip")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    before, after = {}, {}
+    for v in range(args.volunteers):
+        email = f"volunteer{v}@example.com"
+        before[email] = make_slots(7 * args.weeks, rng)
+        moved = [dict(s) for s in before[email]]
+        for slot in moved:
+            if rng.random() < args.changed:
+                slot["end_time"] = slot["end_time"].replace(":30:00", ":45:00")
+        after[email] = moved
+    seeded = [row for email, slots in before.items() for row in rows_of(email, slots)]
+
+    def client(functions=None):
+        return FakeSupabase({"availabilities": seeded}, latency=args.latency, identity=("availabilities",),
+                            functions=functions)
+
+    legacy = client()
+    _, legacy_s = timed(lambda: [legacy_upload(legacy, e, s) for e, s in after.items()])
+
+    results = {}
+    for name, functions in (("diff + rpc", {"replace_availabilities": replace_availabilities}), ("diff + bulk", None)):
+        fake = availability_slots.supabase = client(functions)
+        availability_slots._rpc_available = True
+        responses, seconds = timed(lambda: [availability.upload_slots({"email": e, "slots": s})
+                                            for e, s in after.items()])
+        if any(not r.get("success") for r in responses):
+            raise SystemExit(f"{name}: {next(r for r in responses if not r.get('success'))}")
+        if state(fake) != state(legacy):
+            raise SystemExit(f"{name}: rows differ from the legacy upload")
+        changed = sum(r["deleted_slots"] + r["inserted_records"] for r in responses)
+        results[name] = (seconds, fake.round_trips, changed)
+
+    fake = availability_slots.supabase = client({"replace_availabilities": replace_availabilities})
+    _, same_s = timed(lambda: [availability.upload_slots({"email": e, "slots": s}) for e, s in before.items()])
+
+    slots = sum(len(s) for s in after.values())
+    print(f"{args.volunteers} volunteers resubmitting {args.weeks} weeks ({slots} slots, "
+          f"{args.changed:.0%} moved; {args.latency * 1000:.0f} ms per round trip)")
+    print(f"  legacy       {legacy_s / args.volunteers * 1000:>8.1f} ms/upload  "
+          f"{legacy.round_trips / args.volunteers:.0f} round trips")
+    for name, (seconds, trips, changed) in results.items():
+        print(f"  {name:<12} {seconds / args.volunteers * 1000:>8.1f} ms/upload  "
+              f"{trips / args.volunteers:.0f} round trips, {changed} rows written "
+              f"({legacy_s / seconds:.0f}x)")
+    print(f"  unchanged    {same_s / args.volunteers * 1000:>8.1f} ms/upload  "
+          f"{fake.round_trips / args.volunteers:.0f} round trips")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,4 @@
+-- Written by /assess next to each prediction, so seniors whose features and
+-- model are unchanged since their last score are skipped.
+alter table public.seniors add column if not exists feature_fingerprint text;
+alter table public.seniors add column if not exists model_version text;
@@ -0,0 +1,22 @@
+-- Applies a volunteer's availability diff from POST /upload_slots in one transaction:
+-- deletes the given rows of theirs and inserts the new ones.
+create or replace function public.replace_availabilities(p_email text, p_delete_ids bigint[], p_rows jsonb)
+returns json
+language plpgsql
+as $$
+declare
+  deleted integer;
+  inserted integer;
+begin
+  delete from public.availabilities
+  where volunteer_email = p_email and id = any(p_delete_ids);
+  get diagnostics deleted = row_count;
+
+  insert into public.availabilities (volunteer_email, date, start_t, end_t)
+  select p_email, r.date, r.start_t, r.end_t
+  from jsonb_to_recordset(p_rows) as r(date date, start_t time, end_t time);
+  get diagnostics inserted = row_count;
+
+  return json_build_object('deleted', deleted, 'inserted', inserted);
+end;
+$$;
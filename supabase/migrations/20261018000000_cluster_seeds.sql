@@ -0,0 +1,9 @@
+-- Warm-start centroids (fitted, before any splits) for the backend's /allocate and
+-- /schedule clustering. Kept apart from
+-- public.clusters, which the run-scheduler edge function owns and
+-- assignments.cluster_id points into.
+create table if not exists public.cluster_seeds (
+  id integer primary key,
+  centroid jsonb not null,
+  updated_at timestamptz not null default now()
+);
@@ -0,0 +1,15 @@
+-- Writes /assess scores in one statement. Only existing seniors are updated: one
+-- deleted while scoring ran is not re-inserted. Returns the uids it updated.
+create or replace function public.update_senior_scores(p_rows jsonb)
+returns table (uid text)
+language sql
+as $$
+  update public.seniors s
+  set overall_wellbeing = r.overall_wellbeing,
+      feature_fingerprint = r.feature_fingerprint,
+      model_version = r.model_version
+  from jsonb_to_recordset(p_rows)
+    as r(uid text, overall_wellbeing integer, feature_fingerprint text, model_version text)
+  where s.uid::text = r.uid
+  returning s.uid::text;
+$$;